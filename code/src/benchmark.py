@@ -0,0 +1,183 @@
+"""
+Offline benchmarks for the Aurora pipeline, runnable on a machine without cameras.
+
+Replay every configured camera's recorded source as fast as possible through
+run_detection and the fusion step, and report frames/s:
+
+    python benchmark.py replay
+    python benchmark.py replay --type video --path match.mp4 --cameras 0 1
+
+Time the object detection backends on recorded frames:
+
+    python benchmark.py inference --path match.mp4 --type video \
+        --backend ultralytics:best.pt onnxruntime:best.onnx onnxruntime:best_int8.onnx opencv:best.onnx
+"""
+from capture.camera import Camera
+from capture.camera_manager import open_stream
+from capture.frame_format import to_bgr
+from capture.frame_source import create_source
+from detection.inference_backends import load_backend
+from detection.inference_service import InferenceService
+from slam.fusion_engine import FusionEngine
+from utils.output_formats import data_format
+from utils import constants
+import numpy as np
+import argparse
+import time
+
+
+def benchmark_replay(camera_ids: list, source_settings: dict | None = None, max_frames: int = 0) -> dict:
+    """
+    Push recorded frames through run_detection -> data fusion without any pacing.
+
+    Args:
+        camera_ids (list): Cameras (indices in cameras_settings.json) to replay.
+        source_settings (dict | None): Source to use for every camera instead of its own "source" settings.
+        max_frames (int): Stop after this many frames in total (0 = until every recording ends).
+
+    Returns:
+        dict: Frame count, elapsed time and per-stage timings.
+    """
+    cameras = [Camera(camera_id) for camera_id in camera_ids]
+    active = []
+
+    for camera in cameras:
+        settings = dict(source_settings or camera.source_settings)
+        if settings.get("type", "device") == "device":
+            raise SystemExit(f"Camera {camera.id} has no recorded source, pass --type/--path or set its \"source\".")
+        settings["replay"] = "fast"
+        source = open_stream(camera.id, settings)
+        if source is None:
+            raise SystemExit(f"Camera {camera.id}: could not open {settings.get('path')}.")
+        active.append((camera, source))
+
+    fusion = FusionEngine(cameras)
+    frames = 0
+    detection_time = fusion_time = 0.0
+    start = time.perf_counter()
+
+    while active and (max_frames <= 0 or frames < max_frames):
+        for camera, source in list(active):
+            ret, frame = source.read()
+            if not ret:
+                source.release()
+                active.remove((camera, source))
+                continue
+
+            stage_start = time.perf_counter()
+            camera.begin_frame(frame, source.timestamp, camera.frame_seq + 1)
+            camera.run_detection()
+            detection_time += time.perf_counter() - stage_start
+            frames += 1
+
+        stage_start = time.perf_counter()
+        now = time.time()
+        fusion.step(now)
+        data_format(cameras, {}, fusion.pose_at(now))
+        fusion_time += time.perf_counter() - stage_start
+
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "elapsed": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "detection_ms": 1000 * detection_time / max(frames, 1),
+        "fusion_ms": 1000 * fusion_time / max(frames, 1),
+    }
+
+
+def load_frames(source_settings: dict, max_frames: int) -> list:
+    """
+    Read up to `max_frames` BGR frames from a recording.
+    """
+    source = create_source(0, {**source_settings, "replay": "fast"})
+    if not source.isOpened():
+        raise SystemExit(f"Could not open {source_settings.get('path')}.")
+
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(to_bgr(frame))
+    source.release()
+    return frames
+
+
+def benchmark_inference(backend_specs: list, frames: list, batch_size: int = 1, threads: int = 0) -> list:
+    """
+    Time every backend on the same frames, preprocessing included.
+
+    Args:
+        backend_specs (list): "backend:model" strings, e.g. "onnxruntime:best_int8.onnx".
+        frames (list): BGR frames, batched `batch_size` at a time like the cameras would.
+        batch_size (int): Frames per forward pass.
+        threads (int): Intra-op threads for the onnxruntime and OpenCV backends (0 = all cores).
+
+    Returns:
+        list: Per backend, a dict with mean/p50/p95 latency per batch and frames/s.
+    """
+    results = []
+    for spec in backend_specs:
+        backend_name, _, model = spec.partition(":")
+        settings = {**constants.DEFAULT_INFERENCE, "backend": backend_name, "threads": threads}
+        if model:
+            settings["model"] = model
+
+        # the service thread is left idle, infer() runs on this thread
+        service = InferenceService(load_backend(settings), settings["inputSize"])
+        latencies = []
+        for start in range(0, len(frames), batch_size):
+            batch_start = time.perf_counter()
+            service.infer(frames[start:start + batch_size])
+            latencies.append(time.perf_counter() - batch_start)
+        service.close()
+
+        latencies = np.array(latencies) * 1000
+        results.append({
+            "backend": spec,
+            "mean_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "fps": len(frames) / (latencies.sum() / 1000),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aurora offline benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help="replay recordings through the detection and fusion pipeline")
+    replay.add_argument("--cameras", type=int, nargs="+", default=[0], help="camera indices to replay")
+    replay.add_argument("--type", choices=["video", "images", "session"], help="override the source type")
+    replay.add_argument("--path", help="recording used with --type")
+    replay.add_argument("--frames", type=int, default=0, help="stop after this many frames")
+
+    inference = commands.add_parser("inference", help="time object detection backends on recorded frames")
+    inference.add_argument("--backend", nargs="+", default=[constants.DEFAULT_INFERENCE["backend"]],
+                           help="backends as name[:model], names: ultralytics, onnxruntime, opencv")
+    inference.add_argument("--type", choices=["video", "images", "session"], default="session", help="recording type")
+    inference.add_argument("--path", required=True, help="recording to read frames from")
+    inference.add_argument("--frames", type=int, default=200, help="frames to time")
+    inference.add_argument("--batch", type=int, default=1, help="frames per forward pass")
+    inference.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = all cores)")
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        source_settings = {"type": args.type, "path": args.path} if args.type else None
+        result = benchmark_replay(args.cameras, source_settings, args.frames)
+        print(f"{result['frames']} frames in {result['elapsed']:.2f} s -> {result['fps']:.1f} frames/s")
+        print(f"run_detection: {result['detection_ms']:.2f} ms/frame, fusion: {result['fusion_ms']:.2f} ms/frame")
+
+    elif args.command == "inference":
+        frames = load_frames({"type": args.type, "path": args.path}, args.frames)
+        print(f"{len(frames)} frames, batch size {args.batch}")
+        for result in benchmark_inference(args.backend, frames, args.batch, args.threads):
+            print(f"{result['backend']}: mean {result['mean_ms']:.1f} ms, p50 {result['p50_ms']:.1f} ms, "
+                  f"p95 {result['p95_ms']:.1f} ms per batch -> {result['fps']:.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
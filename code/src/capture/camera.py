@@ -1,9 +1,16 @@
 from scipy.spatial.transform import Rotation as R
 from utils import constants
-from queue import Queue
 import numpy as np
 from utils.pose3d import Pose3D
 from detection.apriltag_detector import AprilTagDetector
+from capture.frame_slot import FrameSlot
+from capture.frame_overlay import FrameOverlay
+from capture.capture_config import get_capture_settings
+from capture.frame_format import to_gray, to_bgr
+from capture.change_detector import FrameChangeDetector
+from slam.pose_buffer import PoseRingBuffer
+import threading
+import time
 import os
 import globals
 import json
@@ -14,31 +21,73 @@ class Camera:
     Represents a camera with intrinsic parameters, pose, and functionality for robot pose estimation.
 
     Attributes:
-        id (int): Identifier for the camera.
+        id (int): Identifier for the camera (index in cameras_settings.json).
+        device (int | str): Device index or /dev/video* path the camera is opened from.
         pose_on_robot (Pose3D): Pose of the camera relative to the robot.
         matrix (np.ndarray): Camera matrix containing intrinsic parameters.
         dist_coeffs (np.ndarray): Distortion coefficients for the camera.
+        undistorter (Undistorter): Undistortion cache built from matrix and dist_coeffs.
         field_pose (Pose3D | None): Pose of the camera in the field coordinate system.
+        field_transform (np.ndarray | None): 4x4 field-from-camera transform in OpenCV camera axes.
+        robot_pose_buffer (PoseRingBuffer): Timestamped history of the robot poses this camera measured.
         frame (np.ndarray | None): Current frame captured by the camera.s
+        frame_slot (FrameSlot): Latest-frame holder fed by the capture thread.
+        frame_timestamp (float): Capture time of the frame being processed.
+        frame_seq (int): Sequence number of the frame being processed.
+        overlay (FrameOverlay): Annotations recorded for the frame being processed.
+        stream_clients (int): Number of dashboard clients streaming this camera.
+        capture_settings (dict): Requested format, resolution, fps, buffering and exposure.
+        capture_state (dict): Values the driver actually applied.
+        object_detector (ObjectDetector | None): Set when object detection is enabled.
+        detected_objects (list): Tracked objects in field coordinates, updated every frame.
+        change_detector (FrameChangeDetector): Spots static frames whose detection result can be reused.
+        reused_frames (int): Frames that reused the previous detection result.
+        frame_reused (bool): Whether the current frame reused the previous detection result.
+        latency (float): Smoothed time in seconds from frame capture until its pose is recorded.
+        pose_source (object | None): Fused robot poses (`robot_pose_at(timestamp)`), set once fusion runs.
     """
 
     def __init__(
         self,
-        id: int
+        id: int,
+        device: int | str | None = None
     ):
         
         self.id = id
+        self.device = id if device is None else device
 
         self.pose_on_robot = Pose3D()
         self.field_pose: Pose3D | None = None
+        self.field_transform: np.ndarray | None = None
+        self.robot_pose: Pose3D | None = None
 
-        self.robot_pose_queue: Queue[Pose3D] = Queue(maxsize=constants.QUEUE_SIZE)
+        self.robot_pose_buffer = PoseRingBuffer(constants.QUEUE_SIZE)
         self.matrix = None
         self.dist_coeffs = None
         self.apriltag_detector = None
         self.frame: np.ndarray | None = None
         self.display_frame: np.ndarray | None = None
+        self.frame_slot = FrameSlot()
+        self.frame_timestamp = 0.0
+        self.frame_seq = 0
+        self.overlay = FrameOverlay()
+        self.display_seq = 0
+        self.stream_clients = 0
+        self.__display_source: tuple = (None, self.overlay)
+        self.__gray_frame: np.ndarray | None = None
+        self.__color_frame: np.ndarray | None = None
+        self.__stream_lock = threading.Lock()
         self.detected_apriltags: list = []
+        self.object_detector = None
+        self.detected_objects: list = []
+        self.reused_frames = 0
+        self.frame_reused = False
+        self.latency = 0.0
+        self.pose_source = None
+        self.__detection_polygons: list = []
+        self.capture_settings: dict = {}
+        self.capture_settings_version = 0
+        self.capture_state: dict = {}
         
         self.__update_camera()
 
@@ -60,8 +109,12 @@ class Camera:
         self.settings = camera_dict["settings"]
         self.lighting = camera_dict["lighting"]
         self.calibration = camera_dict["calibration"]
+        self.source_settings = camera_dict.get("source", constants.DEFAULT_SOURCE)
+        self.detector_settings = {**constants.DEFAULT_DETECTOR, **camera_dict.get("detector", {})}
         self.matrix = np.array(camera_dict["matrix"], dtype=np.float32)
         self.dist_coeffs = np.array(camera_dict["distortion"], dtype=np.float32)
+        self.capture_settings = get_capture_settings(self.settings, self.calibration)
+        self.capture_settings_version += 1
 
         try:
             self.pose_on_robot = Pose3D(
@@ -76,7 +129,96 @@ class Camera:
             # settings error for camera
             pass
 
-        self.apriltag_detector = AprilTagDetector(matrix=self.matrix, dist_coeffs=self.dist_coeffs, families='tag36h11', season=constants.REEFSCAPE)
+        if self.apriltag_detector is None:
+            self.apriltag_detector = AprilTagDetector(matrix=self.matrix, dist_coeffs=self.dist_coeffs, families='tag36h11', season=constants.REEFSCAPE, settings=self.detector_settings)
+        else:
+            self.apriltag_detector.configure(self.matrix, self.dist_coeffs, self.detector_settings)
+        self.undistorter = self.apriltag_detector.undistorter
+        self.change_detector = FrameChangeDetector(
+            threshold=self.detector_settings["changeThreshold"],
+            max_reuse_age=self.detector_settings["maxReuseAge"],
+        )
+
+    @property
+    def dropped_frames(self) -> int:
+        """
+        Number of captured frames that were replaced before being processed.
+        """
+        return self.frame_slot.dropped
+
+    def begin_frame(self, frame: np.ndarray, timestamp: float, seq: int) -> None:
+        """
+        Make `frame` the current frame and start a fresh overlay for it.
+
+        Args:
+            frame (np.ndarray): The captured frame, treated as read-only.
+            timestamp (float): Capture time of the frame.
+            seq (int): Sequence number of the frame.
+        """
+        self.frame = frame
+        self.frame_timestamp = timestamp
+        self.frame_seq = seq
+        self.overlay = FrameOverlay()
+        self.__gray_frame = None
+        self.__color_frame = None
+
+    def get_gray_frame(self) -> np.ndarray | None:
+        """
+        Grayscale version of the current frame, converted at most once per frame.
+
+        With grayscale capture the frame already is the luma plane and is returned as is.
+        """
+        if self.__gray_frame is None and self.frame is not None:
+            self.__gray_frame = to_gray(self.frame)
+        return self.__gray_frame
+
+    def get_color_frame(self) -> np.ndarray | None:
+        """
+        BGR version of the current frame, converted at most once per frame.
+
+        Only consumers that need color (object detection) should call this.
+        """
+        if self.__color_frame is None and self.frame is not None:
+            self.__color_frame = to_bgr(self.frame)
+        return self.__color_frame
+
+    def publish_display_frame(self) -> None:
+        """
+        Expose the current frame and its overlay to the dashboard.
+
+        In zero-copy mode only references are stored and rasterization is left to
+        `get_display_frame`. Otherwise the annotated copy is built right away.
+        """
+        if constants.ZERO_COPY_FRAMES:
+            self.__display_source = (self.frame, self.overlay)
+        else:
+            self.display_frame = self.overlay.render(self.frame)
+        self.display_seq = self.frame_seq
+
+    def get_display_frame(self) -> np.ndarray | None:
+        """
+        Get the latest annotated frame for the dashboard.
+
+        Returns:
+            np.ndarray | None: Annotated frame, or None if nothing was captured yet.
+        """
+        if not constants.ZERO_COPY_FRAMES:
+            display_frame = self.display_frame
+        else:
+            frame, overlay = self.__display_source
+            display_frame = None if frame is None else overlay.render(frame)
+        if display_frame is not None and self.settings.get("undistortStream", False):
+            # detection never needs the remapped image, only the dashboard does
+            display_frame = self.undistorter.remap(display_frame)
+        return display_frame
+
+    def add_stream_client(self) -> None:
+        with self.__stream_lock:
+            self.stream_clients += 1
+
+    def remove_stream_client(self) -> None:
+        with self.__stream_lock:
+            self.stream_clients = max(0, self.stream_clients - 1)
 
     def get_robot_pose(self) -> Pose3D | None:
         """
@@ -118,22 +260,73 @@ class Camera:
 
         return Pose3D(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw)
 
-    def add_pose_to_queue(self, pose: Pose3D) -> None:
+    def get_field_pose(self, robot_pose: Pose3D) -> Pose3D:
+        """
+        Pose of this camera in the field for a given robot pose, the inverse of `get_robot_pose`.
+
+        Args:
+            robot_pose (Pose3D): The robot pose in field coordinates.
+
+        Returns:
+            Pose3D: The camera pose in field coordinates, in the convention of `field_pose`.
+        """
+        T_field_to_robot = np.eye(4)
+        T_field_to_robot[:3, :3] = R.from_euler("zyx", [robot_pose.yaw, robot_pose.pitch, robot_pose.roll]).as_matrix()
+        T_field_to_robot[:3, 3] = [robot_pose.x, robot_pose.y, robot_pose.z]
+
+        T_robot_to_camera = np.eye(4)
+        T_robot_to_camera[:3, :3] = R.from_euler(
+            "zyx", [self.pose_on_robot.yaw, self.pose_on_robot.pitch, self.pose_on_robot.roll]
+        ).as_matrix()
+        T_robot_to_camera[:3, 3] = [self.pose_on_robot.x, self.pose_on_robot.y, self.pose_on_robot.z]
+
+        T_field_to_camera = T_field_to_robot @ T_robot_to_camera
+
+        x, y, z = T_field_to_camera[:3, 3]
+        yaw, pitch, roll = R.from_matrix(T_field_to_camera[:3, :3]).as_euler('zyx', degrees=False)
+        return Pose3D(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw)
+
+    def add_pose(self, pose: Pose3D | None, timestamp: float, static: bool = False) -> None:
         """
-        Add a new pose to the robot pose queue.
+        Record the robot pose of a frame in the pose history.
 
         Args:
-            pose (Pose3D): The pose to be added.
+            pose (Pose3D | None): The robot pose, None if the frame gave no pose.
+            timestamp (float): Capture time of the frame.
+            static (bool): The frame reused the previous result as the scene did not change:
+                no new pose measurement, but evidence that the robot stands still.
         """
-        if self.robot_pose_queue.full():
-            _ = self.robot_pose_queue.get()
-        self.robot_pose_queue.put(pose)
+        self.robot_pose_buffer.append(pose, timestamp, static)
+        if not static:
+            # reused frames skip detection, their latency is not the pipeline's
+            latency = time.time() - timestamp
+            if self.latency:
+                latency = self.latency + constants.LATENCY_SMOOTHING * (latency - self.latency)
+            self.latency = latency
+        if pose is not None:
+            globals.POSE_UPDATES.notify()
 
     def run_detection(self):
-        detected_apriltags, camera_position = self.apriltag_detector.get_detection_data(frame=self.display_frame)
-        self.detected_apriltags = detected_apriltags
-        self.field_pose = camera_position
-        self.add_pose_to_queue(self.get_robot_pose())
+        gray_frame = self.get_gray_frame()
+        if self.detector_settings["skipUnchanged"] and self.change_detector.is_unchanged(gray_frame, self.frame_timestamp):
+            # static scene: keep the previous tags and poses, only redraw them; fusion gets the
+            # frame as a standstill observation rather than as a repeated pose measurement
+            self.frame_reused = True
+            self.reused_frames += 1
+            self.overlay.polygons.extend(self.__detection_polygons)
+            self.add_pose(self.robot_pose, self.frame_timestamp, static=True)
+        else:
+            self.frame_reused = False
+            detected_apriltags, camera_position = self.apriltag_detector.get_detection_data(frame=gray_frame, overlay=self.overlay)
+            self.detected_apriltags = detected_apriltags
+            self.field_pose = camera_position
+            self.field_transform = self.apriltag_detector.world_from_camera
+            self.robot_pose = self.get_robot_pose()
+            self.__detection_polygons = list(self.overlay.polygons)
+            self.add_pose(self.robot_pose, self.frame_timestamp)
+        if self.object_detector is not None:
+            # the color conversion only happens on frames actually submitted for inference
+            self.detected_objects = self.object_detector.detect_objects(self.get_color_frame, overlay=self.overlay)
 
     def run_stream(self):
         pass
@@ -155,10 +348,9 @@ class Camera:
         rows = self.calibration["rows"] - 1
         columns = self.calibration["columns"] - 1
         chessboard_size = (columns, rows)
-        gray = cv2.cvtColor(self.display_frame, cv2.COLOR_BGR2GRAY)
-        found, corners = cv2.findChessboardCorners(gray, chessboard_size, None)
+        found, corners = cv2.findChessboardCorners(self.get_gray_frame(), chessboard_size, None)
         if found:
-            cv2.drawChessboardCorners(self.display_frame, chessboard_size, corners, found)
+            self.overlay.set_chessboard(chessboard_size, corners, found)
 
         try:
             with globals.SETTINGS_LOCK:
@@ -32,13 +32,11 @@ def calibrate_camera(image_dir, calibration_settings):
     print("Press SPACE to use a frame if corners are correctly detected. Press ESC to skip.")
 
     for fname in images:
-        frame = cv2.imread(fname)
-        if frame is None:
+        gray = cv2.imread(fname, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
             print(f"Skipping unreadable image: {fname}")
             continue
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
         found, corners = cv2.findChessboardCorners(gray, chessboard_size, None)
 
         if not found:
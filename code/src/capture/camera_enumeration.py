@@ -0,0 +1,150 @@
+from utils.json_utils import json_to_dict, dict_to_json
+from pathlib import Path
+import logging
+import struct
+import sys
+import os
+import cv2
+
+# struct v4l2_capability: driver[16], card[32], bus_info[32], version, capabilities, device_caps, reserved[3]
+V4L2_CAPABILITY = struct.Struct("16s32s32sIII3I")
+VIDIOC_QUERYCAP = (2 << 30) | (V4L2_CAPABILITY.size << 16) | (ord("V") << 8) | 0
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+V4L2_BY_ID = Path("/dev/v4l/by-id")
+V4L2_BY_PATH = Path("/dev/v4l/by-path")
+CACHE_PATH = Path(__file__).parent / "camera_cache.json"
+
+
+def query_v4l2_capability(device_path: str) -> dict | None:
+    """
+    Ask the V4L2 driver what a /dev/video* node is, without starting a stream.
+
+    Args:
+        device_path (str): Path of the device node.
+
+    Returns:
+        dict | None: Driver, card and bus info, or None if the node is not a video capture device.
+    """
+    import fcntl
+
+    try:
+        fd = os.open(device_path, os.O_RDONLY | os.O_NONBLOCK)
+    except OSError:
+        return None
+
+    try:
+        buffer = bytearray(V4L2_CAPABILITY.size)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buffer)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+    driver, card, bus_info, _, capabilities, device_caps, *_ = V4L2_CAPABILITY.unpack(buffer)
+    caps = device_caps if capabilities & V4L2_CAP_DEVICE_CAPS else capabilities
+    if not caps & V4L2_CAP_VIDEO_CAPTURE:
+        # metadata / output nodes that UVC cameras expose next to the capture node
+        return None
+
+    def decode(raw: bytes) -> str:
+        return raw.split(b"\0", 1)[0].decode(errors="replace")
+
+    return {"driver": decode(driver), "name": decode(card), "bus_info": decode(bus_info)}
+
+
+def _symlink_index(directory: Path) -> dict:
+    """
+    Map resolved device nodes to the udev symlinks pointing at them.
+    """
+    links = {}
+    if directory.is_dir():
+        for link in sorted(directory.iterdir()):
+            links.setdefault(str(link.resolve()), link.name)
+    return links
+
+
+def _node_signature(nodes: list) -> list:
+    """
+    Cheap fingerprint of the device nodes, used to validate the cache.
+    """
+    signature = []
+    for node in nodes:
+        try:
+            stat = os.stat(node)
+        except OSError:
+            continue
+        signature.append([node, stat.st_rdev, stat.st_ctime])
+    return signature
+
+
+def enumerate_v4l2_cameras() -> list:
+    """
+    List V4L2 capture devices by inspecting /dev/video* and querying their capabilities.
+
+    Every camera is keyed by a stable identifier: the udev by-id link (USB serial) when
+    present, otherwise the by-path link (USB port), otherwise the bus info.
+
+    Returns:
+        list: Camera dicts {"id", "device", "name", "bus_info"} sorted by device path.
+    """
+    nodes = sorted((str(node) for node in Path("/dev").glob("video*")), key=lambda p: (len(p), p))
+    signature = _node_signature(nodes)
+
+    if CACHE_PATH.exists():
+        try:
+            cache = json_to_dict(CACHE_PATH)
+            if cache.get("signature") == signature:
+                return cache["cameras"]
+        except (ValueError, KeyError):
+            pass
+
+    by_id = _symlink_index(V4L2_BY_ID)
+    by_path = _symlink_index(V4L2_BY_PATH)
+
+    cameras = []
+    for node in nodes:
+        capability = query_v4l2_capability(node)
+        if capability is None:
+            continue
+        stable_id = by_id.get(node) or by_path.get(node) or f"{capability['bus_info']}:{capability['name']}"
+        cameras.append({"id": stable_id, "device": node, "name": capability["name"], "bus_info": capability["bus_info"]})
+
+    try:
+        dict_to_json(CACHE_PATH, {"signature": signature, "cameras": cameras})
+    except OSError as e:
+        logging.warning(f"Could not write camera cache: {e}")
+
+    return cameras
+
+
+def probe_cameras(max_cameras: int = 25) -> list:
+    """
+    Fallback enumeration for platforms without V4L2: open indices until one fails.
+
+    Returns:
+        list: Camera dicts keyed by enumeration index.
+    """
+    cameras = []
+    for i in range(max_cameras):
+        cap = cv2.VideoCapture(i)
+        opened = cap is not None and cap.isOpened()
+        if cap is not None:
+            cap.release()
+        if not opened:
+            break
+        cameras.append({"id": f"index:{i}", "device": i, "name": f"Camera {i}", "bus_info": ""})
+    return cameras
+
+
+def enumerate_cameras() -> list:
+    """
+    List the connected cameras, as cheaply as the platform allows.
+
+    Returns:
+        list: Camera dicts {"id", "device", "name", "bus_info"}.
+    """
+    if sys.platform.startswith("linux") and Path("/dev").is_dir():
+        return enumerate_v4l2_cameras()
+    return probe_cameras()
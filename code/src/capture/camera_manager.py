@@ -1,67 +1,175 @@
 from concurrent.futures import ThreadPoolExecutor
+from capture.frame_source import FrameSource, create_source
+from capture.capture_config import apply_capture_settings
 import globals
 from threading import Thread
+from utils import constants
+import logging
+import time
 import cv2
 
 
-def open_stream(input_source: str | int) -> cv2.VideoCapture | None:
+def open_stream(input_source: str | int, source_settings: dict | None = None) -> FrameSource | None:
     """
     Open a video stream from an input source.
 
     Args:
-        input_source (str | int): Path to the video file or camera index.
+        input_source (str | int): Device path or camera index used for live cameras.
+        source_settings (dict | None): The camera's "source" settings (device, video file,
+            image directory or recorded session).
 
     Returns:
-        cv2.VideoCapture | None: Opened video capture object if successful, or None if failed.
+        FrameSource | None: Opened frame source if successful, or None if failed.
     """
-    cap = cv2.VideoCapture(input_source)
+    try:
+        cap = create_source(input_source, source_settings)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
     if not cap.isOpened():
         print(f"Error: Could not open the input source {input_source}.")
         return None
     return cap
 
 
+def grab_worker(camera, cap: FrameSource) -> None:
+    """
+    Continuously drain a capture device into the camera's latest-frame slot.
+
+    Runs on its own thread so the driver buffer never fills up while detection
+    is busy; frames nobody had time to process are simply overwritten. Lossless
+    replay sources wait for each frame to be taken instead. Capture settings are
+    (re)applied here, on the thread that owns the device, whenever they change.
+
+    Args:
+        camera (Camera): The camera whose frame slot is fed.
+        cap (FrameSource): The opened frame source.
+    """
+    applied_version = None
+
+    while True:
+        if applied_version != camera.capture_settings_version:
+            applied_version = camera.capture_settings_version
+            camera.capture_state = apply_capture_settings(cap, camera.capture_settings)
+            logging.info(f"Camera {camera.id} capture: {camera.capture_state}")
+
+        ret, frame = cap.read()
+        if not ret:
+            if cap.finished:
+                cap.release()
+                camera.frame_slot.close()
+                return
+            #logging.error(f"Error: Failed to capture image from camera {camera.id}.")
+            continue
+        camera.frame_slot.put(frame, cap.timestamp, wait=cap.lossless)
+
+
 def open_threads(data_fusion, camera_list, season):
     fusion_thread = Thread(target=data_fusion, args=(camera_list,))
     fusion_thread.start()
 
+    if constants.OBJECT_DETECTION_ENABLED:
+        # imported here so object detection and its model stack stay optional
+        from detection.object_detector import ObjectDetector
+        for camera in camera_list:
+            camera.object_detector = ObjectDetector(camera)
+
     def camera_worker(camera):
 
-        cap = open_stream(camera.id)
+        cap = open_stream(camera.device, camera.source_settings)
         if cap is None:
             # log that?
             return
-        
-        while True:
 
-            ret, frame = cap.read()
-            camera.frame = frame
-            camera.display_frame = frame.copy()
+        Thread(target=grab_worker, args=(camera, cap), daemon=True).start()
+        last_seq = 0
+        throughput = ThroughputMeter(f"Camera {camera.id} replay") if cap.lossless else None
 
-            if not ret:
-                #logging.error(f"Error: Failed to capture image from camera {camera.id}.")
+        while True:
+
+            frame, timestamp, seq = camera.frame_slot.get_latest(last_seq, timeout=constants.FRAME_TIMEOUT)
+            if frame is None:
+                if camera.frame_slot.closed:
+                    if throughput is not None:
+                        throughput.report()
+                    return
                 continue
+            last_seq = seq
+
+            camera.begin_frame(frame, timestamp, seq)
 
-            with globals.MODE_LOCK:
-                mode = globals.CURRENT_MODE["mode"]
-                target_id = globals.CURRENT_MODE["camera_id"]
+            mode, target_id = get_current_mode()
+            run_mode(camera, mode, target_id)
 
-            if mode == "Detection":
-                camera.run_detection()
+            camera.publish_display_frame()
 
-            elif mode in {"Calibration", "Lighting", "Settings"}:
-                if camera.id == target_id:
-                    select_mode(camera, mode)
-                else:
-                    camera.run_stream()
-            else:
-                camera.run_stream()
+            if throughput is not None:
+                throughput.tick()
 
     with ThreadPoolExecutor() as executor:
         executor.map(camera_worker, camera_list)
 
     fusion_thread.join()
 
+class ThroughputMeter:
+    """
+    Counts processed frames and periodically logs the achieved frame rate.
+    """
+
+    def __init__(self, name: str, interval: float = constants.THROUGHPUT_LOG_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.start = self.__last_report = time.perf_counter()
+        self.frames = self.__last_frames = 0
+
+    def tick(self) -> None:
+        self.frames += 1
+        now = time.perf_counter()
+        if now - self.__last_report >= self.interval:
+            fps = (self.frames - self.__last_frames) / (now - self.__last_report)
+            logging.info(f"{self.name}: {fps:.1f} frames/s")
+            self.__last_report, self.__last_frames = now, self.frames
+
+    def fps(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def report(self) -> None:
+        logging.info(f"{self.name}: {self.frames} frames, {self.fps():.1f} frames/s overall")
+
+
+def get_current_mode() -> tuple:
+    """
+    Read the dashboard-selected mode and target camera.
+
+    Returns:
+        tuple: (mode, target camera id).
+    """
+    with globals.MODE_LOCK:
+        return globals.CURRENT_MODE["mode"], globals.CURRENT_MODE["camera_id"]
+
+
+def run_mode(camera, mode: str, target_id: int) -> None:
+    """
+    Run the per-frame work for the current mode on one camera.
+
+    Args:
+        camera (Camera): The camera whose current frame is processed.
+        mode (str): One of constants.MODES.
+        target_id (int): Camera selected on the dashboard for non-detection modes.
+    """
+    if mode == "Detection":
+        camera.run_detection()
+
+    elif mode in {"Calibration", "Lighting", "Settings"}:
+        if camera.id == target_id:
+            select_mode(camera, mode)
+        else:
+            camera.run_stream()
+    else:
+        camera.run_stream()
+
+
 def select_mode(camera, mode):
     if mode == "Calibration":
         camera.run_calibration()
@@ -69,15 +177,3 @@ def select_mode(camera, mode):
         camera.run_lighting()
     elif mode == "Settings":
         camera.run_settings()
-
-def count_connected_cameras(max_cameras=25):
-    count = 0
-    for i in range(max_cameras):
-        cap = cv2.VideoCapture(i)
-        if cap is None or not cap.isOpened():
-            cap.release()
-            # Stop as soon as an index is out-of-bounds
-            break
-        count += 1
-        cap.release()
-    return count
\ No newline at end of file
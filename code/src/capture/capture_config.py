@@ -0,0 +1,101 @@
+from capture.frame_source import FrameSource
+from capture.frame_format import fourcc_to_str
+from utils import constants
+import logging
+import cv2
+
+# V4L2 values of CAP_PROP_AUTO_EXPOSURE
+V4L2_MANUAL_EXPOSURE = 1
+V4L2_AUTO_EXPOSURE = 3
+
+
+def get_capture_settings(settings: dict, calibration: dict) -> dict:
+    """
+    Collect the capture-related values of a camera's settings, filling in defaults.
+
+    Args:
+        settings (dict): The camera's "settings" block.
+        calibration (dict): The camera's "calibration" block (provides imageSize).
+
+    Returns:
+        dict: fourcc, width, height, fps, bufferSize, autoExposure, exposure, gain and grayscale.
+    """
+    capture = dict(constants.DEFAULT_CAPTURE)
+    capture.update({key: settings[key] for key in constants.DEFAULT_CAPTURE if key in settings})
+
+    image_size = calibration.get("imageSize") or {}
+    capture["width"] = image_size.get("width")
+    capture["height"] = image_size.get("height")
+    return capture
+
+
+def read_capture_state(cap: FrameSource) -> dict:
+    """
+    Read back what the driver actually negotiated.
+
+    Args:
+        cap (FrameSource): The opened frame source.
+
+    Returns:
+        dict: Achieved capture values.
+    """
+    auto_exposure = cap.get(cv2.CAP_PROP_AUTO_EXPOSURE)
+    return {
+        "fourcc": fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "bufferSize": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        "autoExposure": auto_exposure != V4L2_MANUAL_EXPOSURE,
+        "exposure": cap.get(cv2.CAP_PROP_EXPOSURE),
+        "gain": cap.get(cv2.CAP_PROP_GAIN),
+        "grayscale": cap.grayscale,
+    }
+
+
+def apply_capture_settings(cap: FrameSource, capture: dict) -> dict:
+    """
+    Negotiate format, resolution, frame rate, buffering and exposure with the driver.
+
+    The order matters for V4L2: the pixel format decides which resolutions exist,
+    and the resolution decides which frame rates exist.
+
+    Args:
+        cap (FrameSource): The opened frame source.
+        capture (dict): Requested values, see `get_capture_settings`. None leaves a value untouched.
+
+    Returns:
+        dict: The achieved values, see `read_capture_state`.
+    """
+    if not cap.live:
+        return read_capture_state(cap)
+
+    def request(prop_id: int, value, name: str) -> None:
+        if value is None:
+            return
+        if not cap.set(prop_id, value):
+            logging.warning(f"Capture property {name}={value} was rejected by the driver.")
+
+    if capture.get("fourcc"):
+        request(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*capture["fourcc"].ljust(4)[:4]), "fourcc")
+    request(cv2.CAP_PROP_FRAME_WIDTH, capture.get("width"), "width")
+    request(cv2.CAP_PROP_FRAME_HEIGHT, capture.get("height"), "height")
+    request(cv2.CAP_PROP_FPS, capture.get("fps"), "fps")
+    request(cv2.CAP_PROP_BUFFERSIZE, capture.get("bufferSize"), "bufferSize")
+
+    if capture.get("autoExposure", True):
+        request(cv2.CAP_PROP_AUTO_EXPOSURE, V4L2_AUTO_EXPOSURE, "autoExposure")
+    else:
+        request(cv2.CAP_PROP_AUTO_EXPOSURE, V4L2_MANUAL_EXPOSURE, "autoExposure")
+        request(cv2.CAP_PROP_EXPOSURE, capture.get("exposure"), "exposure")
+    request(cv2.CAP_PROP_GAIN, capture.get("gain"), "gain")
+
+    # after the fourcc, so the source knows which raw layout it will receive
+    if not cap.set_grayscale(capture.get("grayscale", False)) and capture.get("grayscale", False):
+        logging.warning("Grayscale capture is not supported by the driver, converting from BGR instead.")
+
+    achieved = read_capture_state(cap)
+    for key in ("fourcc", "width", "height", "fps"):
+        if capture.get(key) and achieved[key] != capture[key]:
+            logging.warning(f"Requested {key}={capture[key]}, driver gave {achieved[key]}.")
+    return achieved
@@ -0,0 +1,55 @@
+import numpy as np
+import cv2
+
+
+class FrameChangeDetector:
+    """
+    Cheap test for frames that show the same scene as the last processed one.
+
+    Frames are area-averaged down to a small thumbnail (which also averages out
+    sensor noise) and compared with the thumbnail of the last frame that went
+    through full detection by mean absolute difference. Results may be reused
+    for at most `max_reuse_age` seconds, so slow drifts are still picked up.
+
+    Attributes:
+        threshold (float): Mean absolute gray-level difference below which a frame counts as unchanged.
+        max_reuse_age (float): Longest time in seconds a detection result is reused.
+        thumbnail_size (tuple): (width, height) of the comparison thumbnail.
+    """
+
+    def __init__(self, threshold: float = 2.0, max_reuse_age: float = 0.5, thumbnail_size: tuple = (64, 48)):
+        self.threshold = threshold
+        self.max_reuse_age = max_reuse_age
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.__reference: np.ndarray | None = None
+        self.__reference_time = 0.0
+
+    def is_unchanged(self, gray_frame: np.ndarray, timestamp: float) -> bool:
+        """
+        Whether the previous detection result can be reused for this frame.
+
+        A changed (or too old) frame becomes the new reference, as the caller is
+        expected to run full detection on it.
+
+        Args:
+            gray_frame (np.ndarray): Grayscale frame.
+            timestamp (float): Capture time of the frame.
+
+        Returns:
+            bool: True if the scene has not meaningfully changed.
+        """
+        thumbnail = cv2.resize(gray_frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+
+        if (
+            self.__reference is not None
+            and timestamp - self.__reference_time <= self.max_reuse_age
+            and cv2.norm(thumbnail, self.__reference, cv2.NORM_L1) / thumbnail.size < self.threshold
+        ):
+            return True
+
+        self.__reference = thumbnail
+        self.__reference_time = timestamp
+        return False
+
+    def reset(self) -> None:
+        self.__reference = None
@@ -0,0 +1,58 @@
+import numpy as np
+import cv2
+
+# packed 4:2:2 formats and the channel holding luma in OpenCV's CV_8UC2 view
+PACKED_LUMA_CHANNEL = {"YUYV": 0, "YUY2": 0, "UYVY": 1}
+COMPRESSED_FOURCCS = ("MJPG", "JPEG")
+
+
+def fourcc_to_str(code: float) -> str:
+    code = int(code)
+    if code <= 0:
+        return ""
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\0")
+
+
+def luma_plane(raw: np.ndarray, fourcc: str) -> np.ndarray | None:
+    """
+    Grayscale image from an unconverted driver buffer (CAP_PROP_CONVERT_RGB off).
+
+    The Y channel of packed YUV is sliced out, GREY/Y800 is used as is and
+    MJPG is decoded straight to grayscale, so no BGR image is ever built.
+
+    Args:
+        raw (np.ndarray): Buffer returned by `cv2.VideoCapture.read`.
+        fourcc (str): Pixel format negotiated with the driver.
+
+    Returns:
+        np.ndarray | None: Contiguous (height, width) uint8 image, or None if the buffer can't be decoded.
+    """
+    if fourcc in PACKED_LUMA_CHANNEL and raw.ndim == 3 and raw.shape[2] == 2:
+        return np.ascontiguousarray(raw[:, :, PACKED_LUMA_CHANNEL[fourcc]])
+    if fourcc in COMPRESSED_FOURCCS:
+        return cv2.imdecode(raw.reshape(-1), cv2.IMREAD_GRAYSCALE)
+    return to_gray(raw)
+
+
+def to_gray(frame: np.ndarray) -> np.ndarray:
+    """
+    Grayscale view of a frame; grayscale frames are returned untouched.
+    """
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 1:
+        return frame[:, :, 0]
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def to_bgr(frame: np.ndarray) -> np.ndarray:
+    """
+    BGR version of a frame; BGR frames are returned untouched (not copied).
+    """
+    if frame.ndim == 2 or frame.shape[2] == 1:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
@@ -0,0 +1,96 @@
+from capture.frame_format import to_bgr
+import numpy as np
+import cv2
+
+
+class FrameOverlay:
+    """
+    Lightweight vector annotations for a single camera frame.
+
+    Detection code records what it would have drawn (tag outlines, chessboard
+    corners, object boxes) instead of painting on a copy of the frame. The
+    annotations are only rasterized when somebody actually looks at them.
+
+    Attributes:
+        polygons (list): (points, color, thickness) closed outlines.
+        boxes (list): (bbox, label, color, thickness) labelled rectangles.
+        chessboard (tuple | None): (pattern_size, corners, found) for calibration.
+    """
+
+    def __init__(self):
+        self.polygons: list = []
+        self.boxes: list = []
+        self.chessboard: tuple | None = None
+
+    def add_polygon(self, points: np.ndarray, color: tuple, thickness: int = 2) -> None:
+        """
+        Record a closed outline, e.g. the corners of a detected AprilTag.
+
+        Args:
+            points (np.ndarray): Polygon vertices in image coordinates.
+            color (tuple): BGR color.
+            thickness (int): Line thickness in pixels.
+        """
+        self.polygons.append((np.asarray(points, dtype=np.int32).reshape((-1, 1, 2)), color, thickness))
+
+    def add_box(self, bbox, label: str, color: tuple, thickness: int = 2) -> None:
+        """
+        Record a labelled bounding box.
+
+        Args:
+            bbox: Bounding box (x_min, y_min, x_max, y_max).
+            label (str): Text drawn above the box.
+            color (tuple): BGR color.
+            thickness (int): Line thickness in pixels.
+        """
+        self.boxes.append((tuple(int(v) for v in bbox[:4]), label, color, thickness))
+
+    def set_chessboard(self, pattern_size: tuple, corners: np.ndarray, found: bool) -> None:
+        """
+        Record the chessboard corners found during calibration.
+
+        Args:
+            pattern_size (tuple): Inner corner count (columns, rows).
+            corners (np.ndarray): Detected corners.
+            found (bool): Whether the full pattern was found.
+        """
+        self.chessboard = (pattern_size, corners, found)
+
+    def draw(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Draw the annotations onto `frame` in place.
+
+        Args:
+            frame (np.ndarray): BGR frame to draw on.
+
+        Returns:
+            np.ndarray: The same frame, annotated.
+        """
+        for points, color, thickness in self.polygons:
+            cv2.polylines(frame, [points], isClosed=True, color=color, thickness=thickness)
+
+        for (x_min, y_min, x_max, y_max), label, color, thickness in self.boxes:
+            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), color, thickness)
+            cv2.putText(frame, label, (x_min, y_min - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, thickness)
+
+        if self.chessboard is not None:
+            pattern_size, corners, found = self.chessboard
+            cv2.drawChessboardCorners(frame, pattern_size, corners, found)
+
+        return frame
+
+    def render(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Rasterize the annotations onto a copy of `frame`, leaving the original untouched.
+
+        Grayscale frames are expanded to BGR here, so color conversion is only
+        paid for when the dashboard is actually streaming.
+
+        Args:
+            frame (np.ndarray): Raw camera frame (BGR or grayscale).
+
+        Returns:
+            np.ndarray: Annotated BGR copy of the frame.
+        """
+        canvas = to_bgr(frame)
+        return self.draw(canvas.copy() if canvas is frame else canvas)
@@ -0,0 +1,94 @@
+from threading import Condition
+import numpy as np
+import time
+
+
+class FrameSlot:
+    """
+    Single-slot holder for the newest frame captured by a camera.
+
+    The grab thread overwrites the slot on every read, so consumers always get
+    the most recent frame instead of working through a backlog of stale ones.
+    Frames that were overwritten before anyone took them are counted as dropped.
+
+    Attributes:
+        frame (np.ndarray | None): Newest frame in the slot.
+        timestamp (float): Capture time of the newest frame (time.time()).
+        seq (int): Sequence number of the newest frame, starting at 1.
+        dropped (int): Number of frames overwritten before being taken.
+    """
+
+    def __init__(self):
+        self.__condition = Condition()
+        self.frame: np.ndarray | None = None
+        self.timestamp = 0.0
+        self.seq = 0
+        self.dropped = 0
+        self.__taken_seq = 0
+        self.__closed = False
+
+    def put(self, frame: np.ndarray, timestamp: float | None = None, wait: bool = False) -> int:
+        """
+        Store a new frame, replacing whatever is in the slot.
+
+        Args:
+            frame (np.ndarray): The captured frame.
+            timestamp (float | None): Capture time, defaults to now.
+            wait (bool): Block until the previous frame was taken instead of dropping it
+                (used for "as fast as possible" replay).
+
+        Returns:
+            int: Sequence number assigned to the frame.
+        """
+        with self.__condition:
+            if wait:
+                self.__condition.wait_for(lambda: self.__taken_seq >= self.seq or self.__closed)
+            if self.seq > self.__taken_seq:
+                self.dropped += 1
+            self.frame = frame
+            self.timestamp = time.time() if timestamp is None else timestamp
+            self.seq += 1
+            self.__condition.notify_all()
+            return self.seq
+
+    def get_latest(self, last_seq: int = 0, timeout: float | None = None) -> tuple:
+        """
+        Wait for a frame newer than `last_seq` and take it.
+
+        Args:
+            last_seq (int): Sequence number of the last frame the caller processed.
+            timeout (float | None): Maximum time to wait in seconds.
+
+        Returns:
+            tuple: (frame, timestamp, seq), or (None, 0.0, last_seq) on timeout or close.
+        """
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.seq > last_seq or self.__closed, timeout):
+                return None, 0.0, last_seq
+            if self.seq <= last_seq:
+                return None, 0.0, last_seq
+            self.__taken_seq = self.seq
+            self.__condition.notify_all()
+            return self.frame, self.timestamp, self.seq
+
+    def peek(self) -> tuple:
+        """
+        Read the newest frame without marking it as taken.
+
+        Returns:
+            tuple: (frame, timestamp, seq).
+        """
+        with self.__condition:
+            return self.frame, self.timestamp, self.seq
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def close(self) -> None:
+        """
+        Wake up every waiting consumer, e.g. when a recording has been fully replayed.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
@@ -0,0 +1,402 @@
+from utils.json_utils import json_to_dict, dict_to_json
+from utils import constants
+from capture.frame_format import luma_plane, fourcc_to_str
+from pathlib import Path
+from queue import Queue, Full
+from threading import Thread
+from abc import ABC, abstractmethod
+import numpy as np
+import logging
+import atexit
+import json
+import time
+import cv2
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+SESSION_FILE = "session.json"
+# one {"file", "timestamp"} line per frame, appended while recording
+SESSION_INDEX_FILE = "session.jsonl"
+
+REALTIME = "realtime"
+FIXED = "fixed"
+FAST = "fast"
+
+
+class ReplayPacer:
+    """
+    Decides when a recorded frame should be handed to the pipeline.
+
+    Modes:
+        realtime: keep the recorded frame spacing (or `fps` if nothing was recorded).
+        fixed: deliver frames at a fixed `fps`.
+        fast: deliver frames as fast as the pipeline consumes them.
+    """
+
+    def __init__(self, mode: str = REALTIME, fps: float = 30.0):
+        if mode not in {REALTIME, FIXED, FAST}:
+            raise ValueError(f"Unknown replay mode '{mode}'.")
+        self.mode = mode
+        self.period = 1.0 / fps if fps and fps > 0 else 0.0
+        self.__start_wall = None
+        self.__start_recorded = None
+        self.__next_wall = None
+
+    def wait(self, recorded_timestamp: float | None = None) -> None:
+        """
+        Sleep until the next frame is due.
+
+        Args:
+            recorded_timestamp (float | None): Original capture time of the frame, if known.
+        """
+        now = time.time()
+
+        if self.mode == FAST:
+            return
+
+        if self.mode == REALTIME and recorded_timestamp is not None:
+            if self.__start_wall is None:
+                self.__start_wall, self.__start_recorded = now, recorded_timestamp
+            due = self.__start_wall + (recorded_timestamp - self.__start_recorded)
+        else:
+            due = now if self.__next_wall is None else self.__next_wall
+            self.__next_wall = max(due, now) + self.period
+
+        if due > now:
+            time.sleep(due - now)
+
+    def reset(self) -> None:
+        """
+        Start pacing afresh, e.g. when a looped recording starts over and its timestamps jump back.
+        """
+        self.__start_wall = None
+        self.__start_recorded = None
+        self.__next_wall = None
+
+
+class FrameSource(ABC):
+    """
+    Base class for anything the capture thread can read frames from.
+
+    Mirrors the parts of `cv2.VideoCapture` the pipeline uses (`read`, `isOpened`,
+    `release`, `get`, `set`) so a live device and a recording are interchangeable.
+
+    Attributes:
+        live (bool): True for physical devices.
+        grayscale (bool): True if `read` returns single-channel luma frames.
+        lossless (bool): True if every frame must be processed (no latest-frame dropping).
+        finished (bool): True once a recording has been fully replayed.
+        timestamp (float): Capture time of the last frame (time.time() when it was grabbed).
+        recorded_timestamp (float | None): Original capture time of the last frame, if recorded.
+    """
+
+    live = False
+
+    def __init__(self):
+        self.grayscale = False
+        self.lossless = False
+        self.finished = False
+        self.timestamp = 0.0
+        self.recorded_timestamp: float | None = None
+
+    @abstractmethod
+    def read(self) -> tuple:
+        pass
+
+    @abstractmethod
+    def isOpened(self) -> bool:
+        pass
+
+    def release(self) -> None:
+        pass
+
+    def get(self, prop_id: int) -> float:
+        return 0.0
+
+    def set(self, prop_id: int, value: float) -> bool:
+        return False
+
+    def set_grayscale(self, enabled: bool) -> bool:
+        """
+        Ask the source to deliver luma frames. Returns whether it will.
+        """
+        return False
+
+
+class DeviceSource(FrameSource):
+    """
+    Live camera opened through `cv2.VideoCapture`.
+    """
+
+    live = True
+
+    def __init__(self, device: int | str, recorder: "SessionRecorder | None" = None):
+        super().__init__()
+        if isinstance(device, str):
+            self.cap = cv2.VideoCapture(device, cv2.CAP_V4L2)
+        else:
+            self.cap = cv2.VideoCapture(device)
+        self.recorder = recorder
+        self.__fourcc = ""
+
+    def read(self) -> tuple:
+        # stamp the frame when the driver hands it over, before it is decoded
+        if not self.cap.grab():
+            self.timestamp = time.time()
+            return False, None
+        self.timestamp = time.time()
+        ret, frame = self.cap.retrieve()
+        if ret and self.grayscale:
+            frame = luma_plane(frame, self.__fourcc)
+            ret = frame is not None
+        if ret and self.recorder is not None:
+            self.recorder.write(frame, self.timestamp)
+        return ret, frame
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self) -> None:
+        self.cap.release()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def get(self, prop_id: int) -> float:
+        return self.cap.get(prop_id)
+
+    def set(self, prop_id: int, value: float) -> bool:
+        return self.cap.set(prop_id, value)
+
+    def set_grayscale(self, enabled: bool) -> bool:
+        """
+        Toggle raw capture: with CAP_PROP_CONVERT_RGB off OpenCV hands over the
+        driver buffer, from which only the luma plane is kept.
+        """
+        self.__fourcc = fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC))
+        self.grayscale = bool(enabled) and self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        if not self.grayscale:
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        return self.grayscale
+
+
+class ReplaySource(FrameSource):
+    """
+    Base class for recorded sources, paced by a ReplayPacer.
+    """
+
+    def __init__(self, pacer: ReplayPacer, loop: bool = False):
+        super().__init__()
+        self.pacer = pacer
+        self.loop = loop
+        self.lossless = pacer.mode == FAST
+
+    @abstractmethod
+    def _next_frame(self) -> tuple:
+        """
+        Returns:
+            tuple: (frame | None, recorded timestamp | None); None frame at the end of the recording.
+        """
+
+    @abstractmethod
+    def _rewind(self) -> None:
+        pass
+
+    def read(self) -> tuple:
+        if self.finished:
+            return False, None
+
+        frame, recorded_timestamp = self._next_frame()
+        if frame is None and self.loop:
+            self._rewind()
+            self.pacer.reset()
+            frame, recorded_timestamp = self._next_frame()
+        if frame is None:
+            self.finished = True
+            return False, None
+
+        self.pacer.wait(recorded_timestamp)
+        self.timestamp = time.time()
+        self.recorded_timestamp = recorded_timestamp
+        return True, frame
+
+
+class VideoFileSource(ReplaySource):
+    """
+    Frames from a video file.
+    """
+
+    def __init__(self, path: str, pacer: ReplayPacer, loop: bool = False):
+        super().__init__(pacer, loop)
+        self.cap = cv2.VideoCapture(str(path))
+
+    def _next_frame(self) -> tuple:
+        ret, frame = self.cap.read()
+        if not ret:
+            return None, None
+        return frame, self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+    def _rewind(self) -> None:
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self) -> None:
+        self.cap.release()
+
+    def get(self, prop_id: int) -> float:
+        return self.cap.get(prop_id)
+
+
+class ImageDirectorySource(ReplaySource):
+    """
+    Frames from a directory of PNG/JPEG images, replayed in file name order.
+    """
+
+    def __init__(self, path: str, pacer: ReplayPacer, loop: bool = False):
+        super().__init__(pacer, loop)
+        directory = Path(path)
+        self.files = sorted(f for f in directory.iterdir() if f.suffix.lower() in IMAGE_EXTENSIONS) if directory.is_dir() else []
+        self.timestamps: list | None = None
+        self.index = 0
+
+    def _next_frame(self) -> tuple:
+        while self.index < len(self.files):
+            index = self.index
+            self.index += 1
+            frame = cv2.imread(str(self.files[index]), cv2.IMREAD_UNCHANGED)
+            if frame is None:
+                logging.warning(f"Skipping unreadable image: {self.files[index]}")
+                continue
+            return frame, None if self.timestamps is None else self.timestamps[index]
+        return None, None
+
+    def _rewind(self) -> None:
+        self.index = 0
+
+    def isOpened(self) -> bool:
+        return len(self.files) > 0
+
+
+class SessionSource(ImageDirectorySource):
+    """
+    Recorded session bundle written by SessionRecorder: a directory of frames
+    plus their original capture timestamps.
+    """
+
+    def __init__(self, path: str, pacer: ReplayPacer, loop: bool = False):
+        super().__init__(path, pacer, loop)
+        frames = read_session_index(Path(path))
+        self.files = [Path(path) / entry["file"] for entry in frames]
+        self.timestamps = [entry["timestamp"] for entry in frames]
+
+
+def read_session_index(path: Path) -> list:
+    """
+    Frame entries of a session bundle, [] if it has no index.
+
+    The session.jsonl index is preferred as it is always current; session.json
+    alone comes from bundles recorded before it existed.
+    """
+    if not (path / SESSION_INDEX_FILE).exists():
+        return json_to_dict(path / SESSION_FILE)["frames"] if (path / SESSION_FILE).exists() else []
+
+    frames = []
+    with open(path / SESSION_INDEX_FILE) as index_file:
+        for line in index_file:
+            try:
+                frames.append(json.loads(line))
+            except ValueError:
+                # last line of a recording cut off mid-write
+                break
+    return frames
+
+
+class SessionRecorder:
+    """
+    Writes captured frames into a session bundle that SessionSource can replay.
+
+    Frames are encoded on a writer thread behind a bounded queue, so recording
+    never stalls capture: when the disk falls behind, frames are dropped from
+    the recording. Each written frame is appended to the session.jsonl index
+    right away, so an interrupted recording stays replayable; `close` also
+    writes the whole index as session.json for older readers.
+
+    Attributes:
+        dropped (int): Frames left out of the recording because the queue was full.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dropped = 0
+        self.__count = 0
+        self.__closed = False
+        self.__queue = Queue(maxsize=constants.RECORDER_QUEUE_SIZE)
+        self.__index = open(self.path / SESSION_INDEX_FILE, "w")
+        self.__thread = Thread(target=self.__writer, daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+    def write(self, frame: np.ndarray, timestamp: float) -> None:
+        if self.__closed:
+            return
+        try:
+            self.__queue.put_nowait((f"frame_{self.__count:06d}.png", frame, timestamp))
+            self.__count += 1
+        except Full:
+            self.dropped += 1
+
+    def __writer(self) -> None:
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                return
+            file_name, frame, timestamp = item
+            if cv2.imwrite(str(self.path / file_name), frame):
+                self.__index.write(json.dumps({"file": file_name, "timestamp": timestamp}) + "\n")
+                self.__index.flush()
+
+    def close(self) -> None:
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__index.close()
+        dict_to_json(self.path / SESSION_FILE, {"frames": read_session_index(self.path)})
+        if self.dropped:
+            logging.warning(f"Recording {self.path}: {self.dropped} frames dropped, the disk could not keep up.")
+
+
+def create_source(device: int | str, source_settings: dict | None = None) -> FrameSource:
+    """
+    Build the frame source described by a camera's "source" settings.
+
+    Args:
+        device (int | str): Device index or path used for live cameras.
+        source_settings (dict | None): {"type": "device" | "video" | "images" | "session",
+            "path": ..., "replay": "realtime" | "fixed" | "fast", "fps": ..., "loop": ...,
+            "record": ...}. Defaults to the live device.
+
+    Returns:
+        FrameSource: The (possibly unopened) source.
+    """
+    source_settings = source_settings or {}
+    source_type = source_settings.get("type", "device")
+
+    if source_type == "device":
+        record_path = source_settings.get("record")
+        return DeviceSource(device, SessionRecorder(record_path) if record_path else None)
+
+    pacer = ReplayPacer(source_settings.get("replay", REALTIME), source_settings.get("fps", 30.0))
+    path = source_settings.get("path", "")
+    loop = source_settings.get("loop", False)
+
+    if source_type == "video":
+        return VideoFileSource(path, pacer, loop)
+    if source_type == "images":
+        return ImageDirectorySource(path, pacer, loop)
+    if source_type == "session":
+        return SessionSource(path, pacer, loop)
+
+    raise ValueError(f"Unknown frame source type '{source_type}'.")
@@ -0,0 +1,357 @@
+from multiprocessing import shared_memory, resource_tracker
+from capture.camera_manager import open_stream, grab_worker, run_mode, get_current_mode
+from capture.camera import Camera
+from slam.kalman_filter import STATE_DIM, extrapolate
+from slam.pose_buffer import array_to_pose
+from utils.pose3d import Pose3D
+from utils import constants
+from threading import Thread
+import multiprocessing as mp
+import numpy as np
+import logging
+import globals
+import queue
+
+
+class SharedFrameRing:
+    """
+    Ring of frame slots living in `multiprocessing.shared_memory`.
+
+    The camera process writes every captured frame into the next slot; the main
+    process reads the newest one without anything being pickled. A per-slot
+    sequence number lets the reader detect a slot being overwritten mid-copy.
+
+    Layout: int64 header [latest_seq, slot_seq_0 .. slot_seq_n-1],
+    float64 timestamps[n], then n frames of `shape` and `dtype`.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: tuple, dtype, slots: int):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+
+        header_size = 8 * (1 + slots)
+        frames_offset = header_size + 8 * slots
+        self.__header = np.ndarray((1 + slots,), dtype=np.int64, buffer=shm.buf)
+        self.__timestamps = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=header_size)
+        self.__frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=shm.buf, offset=frames_offset)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @staticmethod
+    def __size(shape: tuple, dtype, slots: int) -> int:
+        return 16 * slots + 8 + slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+    @classmethod
+    def create(cls, shape: tuple, dtype, slots: int = constants.SHARED_RING_SLOTS) -> "SharedFrameRing":
+        """
+        Allocate a new ring; the creating process owns (and unlinks) it.
+        """
+        shm = shared_memory.SharedMemory(create=True, size=cls.__size(shape, dtype, slots))
+        ring = cls(shm, shape, dtype, slots)
+        ring.__header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, shape: tuple, dtype, slots: int = constants.SHARED_RING_SLOTS) -> "SharedFrameRing":
+        """
+        Attach to a ring created by another process.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        # Only the creator should unlink the segment, keep the tracker out of it.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, shape, dtype, slots)
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.shape == self.shape and frame.dtype == self.dtype
+
+    def write(self, frame: np.ndarray, timestamp: float, seq: int) -> None:
+        """
+        Copy a frame into the slot for `seq`.
+        """
+        slot = seq % self.slots
+        self.__header[1 + slot] = -1
+        self.__frames[slot] = frame
+        self.__timestamps[slot] = timestamp
+        self.__header[1 + slot] = seq
+        self.__header[0] = seq
+
+    def read(self, seq: int | None = None) -> tuple:
+        """
+        Copy a frame out of the ring.
+
+        Args:
+            seq (int | None): Sequence number to read, defaults to the newest frame.
+
+        Returns:
+            tuple: (frame, timestamp, seq), or (None, 0.0, seq) if it was overwritten.
+        """
+        if seq is None:
+            seq = int(self.__header[0])
+        slot = seq % self.slots
+        if seq <= 0 or self.__header[1 + slot] != seq:
+            return None, 0.0, seq
+        frame = self.__frames[slot].copy()
+        timestamp = float(self.__timestamps[slot])
+        if self.__header[1 + slot] != seq:
+            return None, 0.0, seq
+        return frame, timestamp, seq
+
+    def close(self) -> None:
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.shm.unlink()
+
+
+class SharedFusedPose:
+    """
+    Newest fused robot state, published by the main process for a camera process.
+
+    Lets the object detector of a camera process place detections with the
+    fused robot pose, predicted to the frame time the way FusionEngine does.
+
+    Layout: float64 [timestamp (NaN before the first measurement), prediction horizon, state (12,)].
+    """
+
+    def __init__(self, ctx):
+        self.values = ctx.Array("d", 2 + STATE_DIM)
+        self.values[0] = np.nan
+
+    def publish(self, fusion) -> None:
+        state = fusion.state()
+        if state is None:
+            return
+        timestamp, x, horizon = state
+        with self.values.get_lock():
+            self.values[:] = [timestamp, horizon, *x]
+
+    def robot_pose_at(self, timestamp: float) -> Pose3D | None:
+        """
+        Fused robot pose extrapolated to `timestamp`, None beyond the prediction horizon.
+        """
+        with self.values.get_lock():
+            values = np.array(self.values[:])
+        state_timestamp, horizon = values[:2]
+        if not abs(timestamp - state_timestamp) <= horizon:
+            return None
+        return array_to_pose(extrapolate(values[2:], timestamp - state_timestamp))
+
+
+class CameraProcessControl:
+    """
+    Small shared state the main process uses to steer a camera process.
+
+    Attributes:
+        mode (mp.Value): Index of the current mode in constants.MODES.
+        target_id (mp.Value): Camera selected on the dashboard.
+        streaming (mp.Value): Whether a dashboard client is streaming this camera.
+        settings_changed (mp.Event): Set when the camera should reload its settings.
+        results (mp.Queue): Compact per-frame records sent back by the camera process, bounded
+            so a main process that falls behind gets fresh records instead of a growing backlog.
+        fused_pose (SharedFusedPose): Newest fused robot state, for placing detected objects.
+    """
+
+    def __init__(self, ctx):
+        self.mode = ctx.Value("i", 0, lock=False)
+        self.target_id = ctx.Value("i", -1, lock=False)
+        self.streaming = ctx.Value("b", False, lock=False)
+        self.settings_changed = ctx.Event()
+        self.results = ctx.Queue(maxsize=constants.PROCESS_RESULT_QUEUE_SIZE)
+        self.fused_pose = SharedFusedPose(ctx)
+
+
+def pose_to_tuple(pose: Pose3D | None) -> tuple | None:
+    if not isinstance(pose, Pose3D):
+        return None
+    return (float(pose.x), float(pose.y), float(pose.z), float(pose.roll), float(pose.pitch), float(pose.yaw))
+
+
+def tuple_to_pose(values: tuple | None) -> Pose3D | None:
+    if values is None:
+        return None
+    return Pose3D(*values)
+
+
+def camera_process(camera_id: int, device: int | str, control: CameraProcessControl) -> None:
+    """
+    Entry point of a camera process: capture, detection and pose math for one camera.
+
+    Frames are published through a SharedFrameRing, only while the main process
+    needs them (dashboard streaming or calibration), and only compact pose and
+    detection records go back to the main process. When the main process falls
+    behind, records of new frames are dropped rather than queued up.
+
+    Args:
+        camera_id (int): Index of the camera in cameras_settings.json.
+        device (int | str): Device index or path of the camera.
+        control (CameraProcessControl): Shared state with the main process.
+    """
+    camera = Camera(camera_id, device)
+    camera.pose_source = control.fused_pose
+    cap = open_stream(camera.device, camera.source_settings)
+    if cap is None:
+        control.results.put({"type": "closed"})
+        return
+
+    if constants.OBJECT_DETECTION_ENABLED:
+        # one model per process here; cross-camera batching needs the threads backend
+        from detection.object_detector import ObjectDetector
+        camera.object_detector = ObjectDetector(camera)
+
+    Thread(target=grab_worker, args=(camera, cap), daemon=True).start()
+    ring = None
+    last_seq = 0
+    dropped_records = 0
+
+    try:
+        while True:
+            frame, timestamp, seq = camera.frame_slot.get_latest(last_seq, timeout=constants.FRAME_TIMEOUT)
+            if frame is None:
+                if camera.frame_slot.closed:
+                    control.results.put({"type": "closed"})
+                    return
+                continue
+            last_seq = seq
+
+            camera.begin_frame(frame, timestamp, seq)
+
+            mode = constants.MODES[control.mode.value]
+            target_id = control.target_id.value
+            streaming = bool(control.streaming.value)
+
+            # the main process only reads frames to stream them or to calibrate with them
+            if streaming or (mode == "Calibration" and camera.id == target_id):
+                if ring is None or not ring.fits(frame):
+                    old_ring = ring
+                    ring = SharedFrameRing.create(frame.shape, frame.dtype)
+                    control.results.put({"type": "ring", "name": ring.name, "shape": frame.shape, "dtype": frame.dtype.str})
+                    if old_ring is not None:
+                        old_ring.close()
+                        old_ring.unlink()
+                ring.write(frame, timestamp, seq)
+
+            if control.settings_changed.is_set():
+                control.settings_changed.clear()
+                with globals.SETTINGS_LOCK:
+                    globals.SETTINGS_CHANGED = True
+
+            run_mode(camera, mode, target_id)
+
+            record = {
+                "type": "frame",
+                "seq": seq,
+                "timestamp": timestamp,
+                "mode": mode,
+                "dropped": camera.dropped_frames,
+                "reused": camera.reused_frames,
+                "frame_reused": camera.frame_reused,
+                "capture": camera.capture_state,
+                "april_tags": camera.detected_apriltags,
+                "objects": camera.detected_objects,
+                "field_pose": pose_to_tuple(camera.field_pose),
+                "robot_pose": pose_to_tuple(camera.robot_pose),
+                "overlay": camera.overlay if streaming else None,
+            }
+            try:
+                control.results.put_nowait(record)
+            except queue.Full:
+                dropped_records += 1
+                logging.debug(f"Camera process {camera.id}: main process behind, {dropped_records} records dropped")
+    finally:
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+
+
+def result_worker(camera: Camera, control: CameraProcessControl) -> None:
+    """
+    Apply the records of one camera process to its Camera object in the main process.
+
+    Also forwards the dashboard mode and settings changes to the camera process.
+
+    Args:
+        camera (Camera): Main-process stand-in for the camera.
+        control (CameraProcessControl): Shared state with the camera process.
+    """
+    ring = None
+
+    while True:
+        mode, target_id = get_current_mode()
+        control.mode.value = constants.MODES.index(mode) if mode in constants.MODES else 0
+        control.target_id.value = -1 if target_id is None else int(target_id)
+        control.streaming.value = camera.stream_clients > 0
+        if camera.pose_source is not None:
+            control.fused_pose.publish(camera.pose_source)
+
+        if mode in {"Calibration", "Settings"} and camera.id == target_id:
+            with globals.SETTINGS_LOCK:
+                changed = globals.SETTINGS_CHANGED
+            if changed:
+                camera.run_settings()
+                control.settings_changed.set()
+
+        try:
+            record = control.results.get(timeout=constants.FRAME_TIMEOUT)
+        except queue.Empty:
+            continue
+
+        if record["type"] == "closed":
+            logging.info(f"Camera process {camera.id} closed its input source.")
+            return
+
+        if record["type"] == "ring":
+            if ring is not None:
+                ring.close()
+            try:
+                ring = SharedFrameRing.attach(record["name"], record["shape"], record["dtype"])
+            except FileNotFoundError:
+                # Already replaced by a newer ring, its record follows.
+                ring = None
+            continue
+
+        camera.frame_slot.dropped = record["dropped"]
+        camera.reused_frames = record["reused"]
+        camera.capture_state = record["capture"]
+        camera.detected_apriltags = record["april_tags"]
+        camera.detected_objects = record["objects"]
+        camera.field_pose = tuple_to_pose(record["field_pose"])
+        if record["mode"] == "Detection":
+            camera.robot_pose = tuple_to_pose(record["robot_pose"])
+            camera.add_pose(camera.robot_pose, record["timestamp"], static=record["frame_reused"])
+
+        wants_frame = record["overlay"] is not None or (mode == "Calibration" and camera.id == target_id)
+        if wants_frame and ring is not None:
+            frame, timestamp, seq = ring.read(record["seq"])
+            if frame is not None:
+                camera.begin_frame(frame, timestamp, seq)
+                if record["overlay"] is not None:
+                    camera.overlay = record["overlay"]
+                camera.publish_display_frame()
+        else:
+            camera.frame_timestamp = record["timestamp"]
+            camera.frame_seq = record["seq"]
+
+
+def open_processes(data_fusion, camera_list, season):
+    """
+    Multiprocess counterpart of `open_threads`: one process per camera pipeline.
+
+    Args:
+        data_fusion (callable): Fusion loop, run on a thread of the main process.
+        camera_list (list[Camera]): Main-process Camera objects, kept up to date from the records.
+        season (int): Season identifier (unused, kept for parity with `open_threads`).
+    """
+    ctx = mp.get_context("spawn")
+    fusion_thread = Thread(target=data_fusion, args=(camera_list,))
+    fusion_thread.start()
+
+    for camera in camera_list:
+        control = CameraProcessControl(ctx)
+        ctx.Process(target=camera_process, args=(camera.id, camera.device, control), daemon=True).start()
+        Thread(target=result_worker, args=(camera, control), daemon=True).start()
+
+    fusion_thread.join()
@@ -0,0 +1,80 @@
+import numpy as np
+import cv2
+
+NO_DISTORTION = np.zeros(5, dtype=np.float64)
+
+
+class Undistorter:
+    """
+    Per-camera undistortion, built once from the calibration when settings load.
+
+    Detected points (tag corners, box corners) are undistorted in one bulk call,
+    after which every PnP stage runs on ideal pinhole coordinates with
+    NO_DISTORTION instead of re-solving the distortion model on each call.
+
+    Attributes:
+        matrix (np.ndarray): Intrinsic camera matrix.
+        dist_coeffs (np.ndarray): Distortion coefficients.
+        has_distortion (bool): False when every coefficient is zero (undistortion is skipped).
+    """
+
+    def __init__(self, matrix: np.ndarray, dist_coeffs: np.ndarray | None):
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.dist_coeffs = NO_DISTORTION if dist_coeffs is None else np.asarray(dist_coeffs, dtype=np.float64).ravel()
+        self.has_distortion = bool(np.any(self.dist_coeffs != 0))
+        self.__maps: dict = {}
+
+    def undistort_points(self, points: np.ndarray) -> np.ndarray:
+        """
+        Map distorted pixel coordinates to ideal pinhole pixel coordinates.
+
+        Args:
+            points (np.ndarray): Array of shape (..., 2), e.g. (N, 4, 2) corners of N tags.
+
+        Returns:
+            np.ndarray: float64 array of the same shape.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if not self.has_distortion or points.size == 0:
+            return points
+        undistorted = cv2.undistortPoints(points.reshape(-1, 1, 2), self.matrix, self.dist_coeffs, P=self.matrix)
+        return undistorted.reshape(points.shape)
+
+    def distort_points(self, points: np.ndarray) -> np.ndarray:
+        """
+        Map ideal pinhole pixel coordinates back to distorted pixel coordinates, the inverse of `undistort_points`.
+
+        Args:
+            points (np.ndarray): Array of shape (..., 2).
+
+        Returns:
+            np.ndarray: float64 array of the same shape.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if not self.has_distortion or points.size == 0:
+            return points
+        # back to normalized rays at z = 1, then through the full camera model
+        normalized = (points.reshape(-1, 2) - self.matrix[:2, 2]) / np.diag(self.matrix)[:2]
+        rays = np.concatenate([normalized, np.ones((len(normalized), 1))], axis=1)
+        distorted, _ = cv2.projectPoints(rays, np.zeros(3), np.zeros(3), self.matrix, self.dist_coeffs)
+        return distorted.reshape(points.shape)
+
+    def remap(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Undistort a whole frame using a remap table precomputed per image size.
+
+        Args:
+            frame (np.ndarray): Distorted frame.
+
+        Returns:
+            np.ndarray: Undistorted frame (the input itself if there is no distortion).
+        """
+        if not self.has_distortion:
+            return frame
+        size = (frame.shape[1], frame.shape[0])
+        if size not in self.__maps:
+            self.__maps[size] = cv2.initUndistortRectifyMap(
+                self.matrix, self.dist_coeffs, None, self.matrix, size, cv2.CV_16SC2
+            )
+        map1, map2 = self.__maps[size]
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
@@ -1,10 +1,17 @@
-from scipy.spatial.transform import Rotation as R
 from utils.pose3d import Pose3D
-from utils.json_utils import load_field
+from utils.field_layout import FieldLayout, get_field_layout
+from capture.frame_overlay import FrameOverlay
+from capture.undistortion import Undistorter, NO_DISTORTION
+from capture.frame_format import to_gray
+from detection.tag_tracker import TagTracker
+from detection.detector_tuning import AdaptiveDecimation, detector_params
+from detection.tag_pose_solver import SingleTagSolver
+from scipy.spatial.transform import Rotation as R
 import pyapriltags as apriltag
 from utils import constants
 import numpy as np
 import logging
+import time
 import cv2
 
 
@@ -14,12 +21,15 @@ class AprilTagDetector:
 
     Attributes:
         camera (Camera): The camera instance associated with the detector.
-        field_data (dict): Data about the field including tag poses.
+        field_layout (FieldLayout): Shared, precomputed tag layout of the season.
         camera_matrix (np.ndarray): Intrinsic camera matrix.
         dist_coeffs (np.ndarray): Camera distortion coefficients.
+        undistorter (Undistorter): Bulk point undistortion built from the intrinsics.
+        world_from_camera (np.ndarray | None): 4x4 field-from-camera transform (OpenCV camera
+            axes) of the last processed frame, None when no pose was found.
     """
 
-    def __init__(self, season: int, matrix, dist_coeffs, families: str = 'tag36h11'):
+    def __init__(self, season: int, matrix, dist_coeffs, families: str = 'tag36h11', settings: dict | None = None):
         """
         Initialize the AprilTag detector.
 
@@ -27,169 +37,340 @@ class AprilTagDetector:
             season (int): Season identifier used to load field data.
             camera (Camera): Camera instance.
             families (str): AprilTag families to detect (default: 'tag36h11').
+            settings (dict | None): The camera's "detector" settings (see constants.DEFAULT_DETECTOR).
         """
-        self.__detector = apriltag.Detector(families=families)
+        self.settings = {**constants.DEFAULT_DETECTOR, **(settings or {})}
+        self.__detector = apriltag.Detector(families=families, **detector_params(self.settings))
         self.camera_matrix = matrix
         self.dist_coeffs = dist_coeffs
-        self.field_data = load_field(season)
+        self.field_layout: FieldLayout = get_field_layout(season)
+        self.__tracker = TagTracker()
+        self.__frame_index = 0
+        self.__last_joint_solution = None
+        self.world_from_camera: np.ndarray | None = None
+        self.__tag_solver = SingleTagSolver()
+        self.__adaptive = AdaptiveDecimation(
+            levels=self.settings["decimationLevels"],
+            latency_budget=self.settings["latencyBudget"],
+            min_tag_pixels=self.settings["minTagPixels"],
+        )
+        self.configure(matrix, dist_coeffs, self.settings)
+
+    def configure(self, matrix, dist_coeffs, settings: dict) -> None:
+        """
+        Apply new intrinsics and detector settings without rebuilding the detector.
+
+        Args:
+            matrix (np.ndarray): Intrinsic camera matrix.
+            dist_coeffs (np.ndarray): Camera distortion coefficients.
+            settings (dict): The camera's "detector" settings.
+        """
+        self.camera_matrix = matrix
+        self.dist_coeffs = dist_coeffs
+        self.undistorter = Undistorter(matrix, dist_coeffs)
+        self.settings = {**constants.DEFAULT_DETECTOR, **settings}
+
+        self.__tracker.full_scan_interval = self.settings["fullScanInterval"]
+        self.__tracker.roi_padding = self.settings["roiPadding"]
+        self.__tracker.reset()
+
+        self.__adaptive.levels = sorted(self.settings["decimationLevels"])
+        self.__adaptive.latency_budget = self.settings["latencyBudget"]
+        self.__adaptive.min_tag_pixels = self.settings["minTagPixels"]
+        self.__adaptive.reset(self.settings["quadDecimate"])
+
+        self.__tag_solver.max_age = self.settings["tagPoseMaxAge"]
+        self.__tag_solver.max_reprojection_error = self.settings["maxReprojectionError"]
+        self.__tag_solver.max_rotation_jump = self.settings["maxRotationJump"]
+        self.__tag_solver.reset()
+        self.__last_joint_solution = None
+
+        self.__set_detector_params(detector_params(self.settings))
+
+    def __set_detector_params(self, params: dict) -> None:
+        """
+        Write detector parameters straight into the native apriltag_detector struct.
+
+        Args:
+            params (dict): pyapriltags keyword arguments, e.g. {"quad_decimate": 2.0}.
+        """
+        native = self.__detector.tag_detector_ptr.contents
+        for name, value in params.items():
+            self.__detector.params[name] = value
+            setattr(native, name, type(getattr(native, name))(value))
 
     def __detect(self, frame: np.ndarray) -> list:
         """
         Detect AprilTags in a frame.
 
+        In tracking mode only padded regions around the predicted tag positions are
+        searched, with a full-frame scan every `fullScanInterval` frames or as soon
+        as a tracked tag is lost.
+
         Args:
             frame (np.ndarray): The input video frame.
 
         Returns:
             list: Detected AprilTags.
         """
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        return self.__detector.detect(gray_frame)
+        gray_frame = to_gray(frame)
+
+        start_time = time.perf_counter()
+        detections = self.__detect_gray(gray_frame)
 
-    def get_detection_data(self, frame: np.ndarray) -> None:
+        if self.settings["adaptiveDecimation"]:
+            decimate = self.__adaptive.update(time.perf_counter() - start_time, detections)
+            if decimate is not None:
+                self.__set_detector_params({"quad_decimate": decimate})
+
+        return detections
+
+    def __detect_gray(self, gray_frame: np.ndarray) -> list:
+        """
+        Full-frame or ROI detection on a grayscale frame, depending on the tracking setting.
+        """
+        if not self.settings["tracking"]:
+            return self.__detector.detect(gray_frame)
+
+        self.__tracker.next_frame()
+
+        if not self.__tracker.needs_full_scan():
+            detections = self.__detect_rois(gray_frame, self.__tracker.predict_rois(gray_frame.shape))
+            if self.__tracker.tracked_ids.issubset(tag.tag_id for tag in detections):
+                self.__tracker.update(detections, full_scan=False)
+                return detections
+
+        detections = self.__detector.detect(gray_frame)
+        self.__tracker.update(detections, full_scan=True)
+        return detections
+
+    def __detect_rois(self, gray_frame: np.ndarray, rois: list) -> list:
+        """
+        Run the detector on each region and map the results back to frame coordinates.
+
+        Args:
+            gray_frame (np.ndarray): Grayscale frame.
+            rois (list): Regions as (x_min, y_min, x_max, y_max).
+
+        Returns:
+            list: Detected AprilTags, one per tag ID.
+        """
+        detections = {}
+        for x_min, y_min, x_max, y_max in rois:
+            roi = np.ascontiguousarray(gray_frame[y_min:y_max, x_min:x_max])
+            offset = np.array([x_min, y_min], dtype=np.float64)
+            for tag in self.__detector.detect(roi):
+                tag.corners = tag.corners + offset
+                tag.center = tag.center + offset
+                detections.setdefault(tag.tag_id, tag)
+        return list(detections.values())
+
+    def get_detection_data(self, frame: np.ndarray, overlay: FrameOverlay | None = None) -> tuple:
         """
         Process a frame to detect tags and compute camera pose.
 
+        The frame is only read, never modified; tag outlines go to `overlay`.
+
         Args:
             frame (np.ndarray): The input video frame.
+            overlay (FrameOverlay | None): Annotation overlay for the frame.
+
+        Returns:
+            tuple: Detected tag IDs and the camera pose (Pose3D | None).
         """
+        self.__frame_index += 1
+        self.__tag_solver.prune(self.__frame_index)
+        self.world_from_camera = None
         detected_apriltags = []
-        camera_poses = []
+        world_corners = []
+        image_corners = []
 
         detections = self.__detect(frame)
 
         for tag in detections:
             tag_id = tag.tag_id
-            try:
-                tag_pose = self.field_data["tags"][tag_id - 1]["pose"]
-            except IndexError:
-                logging.error(f"Error: tag_id {tag_id} is out of bounds.")
+            tag_world_corners = self.field_layout.get_tag_corners(tag_id)
+            if tag_world_corners is None:
+                logging.error(f"Error: tag_id {tag_id} is not on the field.")
                 continue
 
-            tag_image_corners = np.array(tag.corners, dtype=np.float32)
-            tag_world_corners = self.__get_tag_world_corners(tag_pose)
+            if overlay is not None:
+                overlay.add_polygon(tag.corners, color=constants.PURPLE, thickness=6)
+
+            detected_apriltags.append(tag_id)
+            world_corners.append(tag_world_corners)
+            image_corners.append(np.asarray(tag.corners, dtype=np.float64))
+
+        if image_corners:
+            # one bulk undistortion, every solve below uses ideal pinhole coordinates
+            image_corners = list(self.undistorter.undistort_points(np.stack(image_corners)))
+
+        if self.settings["multiTag"] and len(detected_apriltags) > 1:
+            try:
+                return detected_apriltags, self.__get_multi_tag_camera_pose(world_corners, image_corners)
+            except Exception as e:
+                # fall back to the per-tag estimates below
+                logging.error(f"Error: {e}. Exception during multi-tag solvePnP.")
 
+        camera_transforms = []
+        scores = []
+        for tag_id, tag_image_corners in zip(detected_apriltags, image_corners):
             try:
-                camera_position, euler_angles = self.__get_camera_pose(tag_world_corners, tag_image_corners)
+                world_from_camera = self.__get_camera_pose(tag_id, tag_image_corners)
             except Exception as e:
                 logging.error(f"Error: {e}. Exception during solvePnP.")
                 continue
+            camera_transforms.append(world_from_camera)
+            scores.append(1)  # Score placeholder: 1
 
-            corners_int = np.array(tag.corners, dtype=np.int32)
-            frame = cv2.polylines(
-                frame,
-                [corners_int.reshape((-1, 1, 2))],
-                isClosed=True,
-                color=constants.PURPLE,
-                thickness=6,
-            )
+        return detected_apriltags, self.__get_weighted_camera_pose(camera_transforms, scores)
 
-            detected_apriltags.append(tag_id)
-            camera_poses.append((camera_position, euler_angles, 1))  # Score placeholder: 1
-
-        camera_position = self.__get_weighted_camera_pose(camera_poses)
-
-        return detected_apriltags, camera_position
-
-    def __get_weighted_camera_pose(self, camera_positions: list) -> Pose3D | None:
+    def __get_weighted_camera_pose(self, camera_transforms: list, scores: list) -> Pose3D | None:
         """
-        Calculate the weighted average of camera poses based on tag scores.
+        Weighted average of per-tag camera poses based on tag scores.
+
+        Rotations are averaged as rotations (not Euler angles), so the pose and
+        `world_from_camera` come from the same average and stay consistent near +-pi.
 
         Args:
-            camera_positions (list): List of camera positions with scores.
+            camera_transforms (list): 4x4 world-from-camera transform per tag.
+            scores (list): Score per tag.
 
         Returns:
             Pose3D | None: Weighted average camera pose, or None if no valid poses.
         """
-        total_scores = sum(position[2] for position in camera_positions)
-        if total_scores == 0: # or not trusting the camera (tags too far / unclear / ...)
+        if sum(scores) == 0: # or not trusting the camera (tags too far / unclear / ...)
             return None
 
-        weighted_camera_position = np.zeros(3)
-        weighted_euler_angles = np.zeros(3)
-
-        for position in camera_positions:
-            camera_position, euler_angles, score = position
-            weight = score / total_scores
-            weighted_camera_position += np.array(camera_position) * weight
-            weighted_euler_angles += np.array(euler_angles) * weight
-
-        return Pose3D(
-            x=weighted_camera_position[0],
-            y=weighted_camera_position[1],
-            z=weighted_camera_position[2],
-            roll=weighted_euler_angles[0],
-            pitch=weighted_euler_angles[1],
-            yaw=weighted_euler_angles[2],
-        )
+        self.world_from_camera = average_transforms(camera_transforms, scores)
+        return pose_from_transform(self.world_from_camera)
 
-    def __get_camera_pose(self, tag_world_corners: np.ndarray, tag_image_corners: np.ndarray) -> tuple:
+    def __get_multi_tag_camera_pose(self, world_corners: list, image_corners: list) -> Pose3D:
         """
-        SolvePnP to estimate the camera pose based on tag corners.
+        Solve one PnP over the corners of every visible tag.
+
+        Seeded from the previous frame's joint solution with the iterative solver
+        when one exists, otherwise solved from scratch with SQPnP.
 
         Args:
-            tag_world_corners (np.ndarray): World coordinates of the tag corners.
-            tag_image_corners (np.ndarray): Image coordinates of the tag corners.
+            world_corners (list): (4, 3) world corners per tag.
+            image_corners (list): (4, 2) image corners per tag, same order.
 
         Returns:
-            tuple: Camera position and Euler angles.
+            Pose3D: The camera pose.
         """
-        success, rvec, tvec = cv2.solvePnP(tag_world_corners, tag_image_corners, self.camera_matrix, self.dist_coeffs)
+        object_points = np.concatenate(world_corners)
+        image_points = np.concatenate(image_corners)
+
+        previous = self.__last_joint_solution
+        if previous is not None and previous[2] == self.__frame_index - 1:
+            success, rvec, tvec = cv2.solvePnP(
+                object_points, image_points, self.camera_matrix, NO_DISTORTION,
+                rvec=previous[0].copy(), tvec=previous[1].copy(),
+                useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE,
+            )
+        else:
+            success, rvec, tvec = cv2.solvePnP(
+                object_points, image_points, self.camera_matrix, NO_DISTORTION, flags=cv2.SOLVEPNP_SQPNP
+            )
 
         if not success:
+            self.__last_joint_solution = None
             raise Exception("SolvePnP failed to find a solution.")
 
-        rotation_matrix, _ = cv2.Rodrigues(rvec)
-        rotation_matrix_inv = rotation_matrix.T
-        camera_position = -rotation_matrix_inv @ tvec
-
-        def rotation_matrix_to_euler_angles(R: np.ndarray) -> np.ndarray:
-            sy = np.sqrt(R[0, 0] ** 2 + R[1, 0] ** 2)
-            singular = sy < 1e-6
-            if not singular:
-                theta = np.arctan2(R[2, 1], R[2, 2]) + np.pi / 2
-                psi = np.arctan2(-R[2, 0], sy)
-                phi = np.arctan2(R[1, 0], R[0, 0]) + np.pi / 2
-            else:
-                theta = np.arctan2(-R[1, 2], R[1, 1]) + np.pi / 2
-                psi = np.arctan2(-R[2, 0], sy)
-                phi = np.pi / 2
-            return np.array([psi, theta, phi])
+        self.__last_joint_solution = (rvec, tvec, self.__frame_index)
 
-        euler_angles = rotation_matrix_to_euler_angles(rotation_matrix_inv)
-        return camera_position.flatten(), euler_angles
+        rotation_matrix, _ = cv2.Rodrigues(rvec)
+        self.world_from_camera = world_from_extrinsics(rotation_matrix, tvec)
+        return pose_from_transform(self.world_from_camera)
 
-    def __get_tag_world_corners(self, tag_pose: dict) -> np.ndarray:
+    def __get_camera_pose(self, tag_id: int, tag_image_corners: np.ndarray) -> tuple:
         """
-        Compute world coordinates of tag corners from the field data.
+        SolvePnP to estimate the camera pose from a single tag.
+
+        Solved in the tag's square frame by SingleTagSolver (warm-started from the
+        previous frame, IPPE_SQUARE with flip disambiguation otherwise), then moved
+        to field coordinates with the precomputed square-from-world transform.
 
         Args:
-            tag_pose (dict): Tag pose from field data.
+            tag_id (int): ID of the tag.
+            tag_image_corners (np.ndarray): Image coordinates of the tag corners.
 
         Returns:
-            np.ndarray: World coordinates of the tag corners.
-        """
-        tag_half_size = constants.TAG_HALF_SIZE
-        tag_translation = np.array(
-            [
-                tag_pose["translation"]["x"],
-                tag_pose["translation"]["y"],
-                tag_pose["translation"]["z"],
-            ]
+            np.ndarray: The 4x4 world-from-camera transform.
+        """
+        rvec, tvec = self.__tag_solver.solve(
+            tag_id, tag_image_corners, self.camera_matrix, NO_DISTORTION, self.__frame_index
         )
+        rotation_matrix, tvec = square_to_world_extrinsics(rvec, tvec, self.field_layout.square_from_world[tag_id])
+        return world_from_extrinsics(rotation_matrix, tvec)
+
+
+def square_to_world_extrinsics(rvec: np.ndarray, tvec: np.ndarray, square_from_world: np.ndarray) -> tuple:
+    """
+    Turn a camera-from-square solution into camera-from-world extrinsics.
+
+    Returns:
+        tuple: (3x3 rotation matrix, (3, 1) translation).
+    """
+    rotation_matrix, _ = cv2.Rodrigues(rvec)
+    world_rotation = rotation_matrix @ square_from_world[:3, :3]
+    world_translation = rotation_matrix @ square_from_world[:3, 3:] + tvec.reshape(3, 1)
+    return world_rotation, world_translation
+
+
+def world_from_extrinsics(rotation_matrix: np.ndarray, tvec: np.ndarray) -> np.ndarray:
+    """
+    4x4 world-from-camera transform (OpenCV camera axes) from camera-from-world extrinsics.
+    """
+    transform = np.eye(4)
+    transform[:3, :3] = rotation_matrix.T
+    transform[:3, 3] = -rotation_matrix.T @ np.asarray(tvec).reshape(3)
+    return transform
 
-        tag_quaternion = tag_pose["rotation"]["quaternion"]
-        w, x, y, z = tag_quaternion["W"], tag_quaternion["X"], tag_quaternion["Y"], tag_quaternion["Z"]
-        rotation = R.from_quat([x, y, z, w])
-
-        tag_corners_local = np.array(
-            [
-                [0, -tag_half_size, -tag_half_size],
-                [0, tag_half_size, -tag_half_size],
-                [0, tag_half_size, tag_half_size],
-                [0, -tag_half_size, tag_half_size],
-            ]
-        )
 
-        tag_corners_world = rotation.apply(tag_corners_local) + tag_translation
-        return tag_corners_world.astype(np.float64)
+def average_transforms(transforms: list, weights: list) -> np.ndarray:
+    """
+    Weighted average of rigid transforms: mean translation and chordal mean rotation.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    transforms = np.asarray(transforms)
+    average = np.eye(4)
+    average[:3, :3] = R.from_matrix(transforms[:, :3, :3]).mean(weights).as_matrix()
+    average[:3, 3] = weights @ transforms[:, :3, 3] / weights.sum()
+    return average
+
+
+def pose_from_transform(world_from_camera: np.ndarray) -> Pose3D:
+    """
+    Camera pose in field coordinates from a 4x4 world-from-camera transform.
+    """
+    x, y, z = world_from_camera[:3, 3]
+    roll, pitch, yaw = rotation_matrix_to_euler_angles(world_from_camera[:3, :3])
+    return Pose3D(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw)
+
+
+def transform_from_pose(camera_pose: Pose3D) -> np.ndarray:
+    """
+    4x4 world-from-camera transform (OpenCV camera axes) of a camera pose, the inverse of `pose_from_transform`.
+    """
+    # undo the axis offsets of rotation_matrix_to_euler_angles, then R = Rz(yaw) Ry(pitch) Rx(roll)
+    yaw, pitch, roll = camera_pose.yaw - np.pi / 2, camera_pose.roll, camera_pose.pitch - np.pi / 2
+    transform = np.eye(4)
+    transform[:3, :3] = R.from_euler('ZYX', [yaw, pitch, roll]).as_matrix()
+    transform[:3, 3] = [camera_pose.x, camera_pose.y, camera_pose.z]
+    return transform
+
+
+def rotation_matrix_to_euler_angles(R: np.ndarray) -> np.ndarray:
+    sy = np.sqrt(R[0, 0] ** 2 + R[1, 0] ** 2)
+    singular = sy < 1e-6
+    if not singular:
+        theta = np.arctan2(R[2, 1], R[2, 2]) + np.pi / 2
+        psi = np.arctan2(-R[2, 0], sy)
+        phi = np.arctan2(R[1, 0], R[0, 0]) + np.pi / 2
+    else:
+        theta = np.arctan2(-R[1, 2], R[1, 1]) + np.pi / 2
+        psi = np.arctan2(-R[2, 0], sy)
+        phi = np.pi / 2
+    return np.array([psi, theta, phi])
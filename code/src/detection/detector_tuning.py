@@ -0,0 +1,92 @@
+import numpy as np
+
+# pyapriltags constructor argument -> detector setting key
+DETECTOR_PARAMS = {
+    "nthreads": "nthreads",
+    "quad_decimate": "quadDecimate",
+    "quad_sigma": "quadSigma",
+    "refine_edges": "refineEdges",
+    "decode_sharpening": "decodeSharpening",
+}
+
+
+def detector_params(settings: dict) -> dict:
+    """
+    Translate detector settings into pyapriltags.Detector keyword arguments.
+    """
+    return {param: settings[key] for param, key in DETECTOR_PARAMS.items() if key in settings}
+
+
+def tag_side_length(corners: np.ndarray) -> float:
+    """
+    Mean side length of a tag in pixels.
+    """
+    return float(np.linalg.norm(corners - np.roll(corners, 1, axis=0), axis=1).mean())
+
+
+class AdaptiveDecimation:
+    """
+    Chooses `quad_decimate` per frame from tag size and detection latency.
+
+    Large (close) tags survive heavy decimation, so decimation goes up when the
+    smallest visible tag would still be big enough or when the frame took longer
+    than the latency budget. It goes down when the farthest tag gets small and
+    there is budget left to pay for the finer search.
+
+    Attributes:
+        levels (list): Allowed decimation factors, ascending.
+        latency_budget (float): Target detection time per frame in seconds.
+        min_tag_pixels (float): Smallest tag side (after decimation) that is still reliable.
+        cooldown (int): Frames to wait between two changes.
+    """
+
+    def __init__(self, levels: list, latency_budget: float, min_tag_pixels: float, cooldown: int = 5):
+        self.levels = sorted(levels)
+        self.latency_budget = latency_budget
+        self.min_tag_pixels = min_tag_pixels
+        self.cooldown = cooldown
+        self.__index = 0
+        self.__frames_since_change = 0
+
+    @property
+    def decimate(self) -> float:
+        return self.levels[self.__index]
+
+    def reset(self, decimate: float) -> None:
+        self.__index = int(np.argmin([abs(level - decimate) for level in self.levels]))
+        self.__frames_since_change = 0
+
+    def update(self, latency: float, detections: list) -> float | None:
+        """
+        Feed the result of one frame.
+
+        Args:
+            latency (float): Time the detection took in seconds.
+            detections (list): Detected tags.
+
+        Returns:
+            float | None: New decimation factor, or None if it should stay.
+        """
+        self.__frames_since_change += 1
+        if self.__frames_since_change < self.cooldown:
+            return None
+
+        index = self.__index
+        smallest = min((tag_side_length(np.asarray(tag.corners)) for tag in detections), default=None)
+
+        if latency > self.latency_budget:
+            index += 1
+        elif smallest is None or smallest / self.decimate < self.min_tag_pixels:
+            # far or no tags: search finer if the budget allows it (cost ~ 1 / decimate^2)
+            if index > 0 and latency * (self.decimate / self.levels[index - 1]) ** 2 <= self.latency_budget:
+                index -= 1
+        elif index + 1 < len(self.levels) and smallest / self.levels[index + 1] >= 2 * self.min_tag_pixels:
+            index += 1
+
+        index = min(max(index, 0), len(self.levels) - 1)
+        if index == self.__index:
+            return None
+
+        self.__index = index
+        self.__frames_since_change = 0
+        return self.decimate
@@ -0,0 +1,245 @@
+from abc import ABC, abstractmethod
+from utils import constants
+import numpy as np
+import logging
+import time
+import ast
+import cv2
+
+ULTRALYTICS = "ultralytics"
+ONNXRUNTIME = "onnxruntime"
+OPENCV = "opencv"
+BACKENDS = (ULTRALYTICS, ONNXRUNTIME, OPENCV)
+
+
+def decode_yolo_output(output: np.ndarray, confidence_threshold: float, iou_threshold: float) -> list:
+    """
+    Decode raw YOLOv8 head output and apply per-class non-maximum suppression.
+
+    Args:
+        output (np.ndarray): (batch, 4 + classes, anchors) with boxes as (cx, cy, w, h) in input pixels.
+        confidence_threshold (float): Lowest class score kept.
+        iou_threshold (float): Overlap above which the weaker of two same-class boxes is dropped.
+
+    Returns:
+        list: Per image, (boxes (N, 4) xyxy, class_ids (N,), confidences (N,)).
+    """
+    decoded = []
+    for prediction in output:
+        scores = prediction[4:]
+        class_ids = scores.argmax(axis=0)
+        confidences = scores[class_ids, np.arange(scores.shape[1])]
+        keep = confidences >= confidence_threshold
+
+        cx, cy, w, h = prediction[:4, keep]
+        class_ids, confidences = class_ids[keep], confidences[keep]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        if len(boxes):
+            # NMSBoxesBatched takes (x, y, w, h) and only suppresses within a class
+            indices = cv2.dnn.NMSBoxesBatched(
+                np.stack([boxes[:, 0], boxes[:, 1], w, h], axis=1).tolist(),
+                confidences.tolist(), class_ids.tolist(), confidence_threshold, iou_threshold,
+            )
+            indices = np.asarray(indices, dtype=int).reshape(-1)
+            boxes, class_ids, confidences = boxes[indices], class_ids[indices], confidences[indices]
+
+        decoded.append((boxes.reshape(-1, 4), class_ids.astype(int), confidences.astype(float)))
+    return decoded
+
+
+def class_names(model_path: str, names: list | dict | None = None, metadata: dict | None = None) -> dict:
+    """
+    Class index -> name of an exported ONNX model.
+
+    The order is fixed by training, so it is never guessed: it comes from the
+    "names" inference setting, or else from the model metadata ultralytics
+    writes on export (and quantize_model.py keeps).
+
+    Args:
+        model_path (str): The ONNX model.
+        names (list | dict | None): Names from the settings, in class index order.
+        metadata (dict | None): The model's metadata map, read from the file if not given.
+
+    Returns:
+        dict: Class index -> class name.
+
+    Raises:
+        ValueError: If the names are neither given nor stored in the model.
+    """
+    if names:
+        return {int(index): name for index, name in (names.items() if isinstance(names, dict) else enumerate(names))}
+    if metadata is None:
+        try:
+            import onnx
+            metadata = {prop.key: prop.value for prop in onnx.load(model_path, load_external_data=False).metadata_props}
+        except ImportError:
+            metadata = {}
+    if "names" in metadata:
+        # ultralytics stores the class names in the model metadata as a dict literal
+        return ast.literal_eval(metadata["names"])
+    raise ValueError(f"The class names of {model_path} are unknown: export it with ultralytics, "
+                     f"or list them in class order in the \"names\" inference setting.")
+
+
+class InferenceBackend(ABC):
+    """
+    Runs a YOLOv8 detection model on a preprocessed batch.
+
+    Attributes:
+        names (dict): Class index -> class name.
+        confidence (float): Lowest confidence reported.
+        iou (float): Non-maximum suppression overlap threshold.
+    """
+
+    name = ""
+
+    def __init__(self, names: dict, confidence: float, iou: float):
+        self.names = names
+        self.confidence = confidence
+        self.iou = iou
+
+    @abstractmethod
+    def forward(self, batch: np.ndarray) -> list:
+        """
+        Args:
+            batch (np.ndarray): (N, 3, size, size) float32 RGB in [0, 1].
+
+        Returns:
+            list: Per image, (boxes (N, 4) xyxy in input pixels, class_ids, confidences).
+        """
+
+    def warmup(self, input_size: int, runs: int) -> float:
+        """
+        Run the model on blank input so lazy initialisation (allocations, kernel
+        selection, JIT) happens at startup rather than on the first real frame.
+
+        Returns:
+            float: Latency of the last warm-up run in seconds.
+        """
+        batch = np.zeros((1, 3, input_size, input_size), dtype=np.float32)
+        latency = 0.0
+        for _ in range(runs):
+            start = time.perf_counter()
+            self.forward(batch)
+            latency = time.perf_counter() - start
+        return latency
+
+
+class UltralyticsBackend(InferenceBackend):
+    """
+    The ultralytics YOLO wrapper on torch, on the GPU when one is available.
+    """
+
+    name = ULTRALYTICS
+
+    def __init__(self, model_path: str, confidence: float, iou: float):
+        # heavy imports, only paid for when this backend is selected
+        from ultralytics import YOLO
+        import torch
+
+        self.torch = torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = YOLO(model_path)
+        self.model.to(self.device)
+        super().__init__(self.model.names, confidence, iou)
+
+    def forward(self, batch: np.ndarray) -> list:
+        tensor = self.torch.from_numpy(batch).to(self.device)
+        results = self.model(tensor, conf=self.confidence, iou=self.iou, verbose=False)
+        return [
+            (
+                result.boxes.xyxy.cpu().numpy(),
+                result.boxes.cls.cpu().numpy().astype(int),
+                result.boxes.conf.cpu().numpy(),
+            )
+            for result in results
+        ]
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    ONNX Runtime on the CPU, for the exported (optionally INT8-quantized) model.
+    """
+
+    name = ONNXRUNTIME
+
+    def __init__(self, model_path: str, confidence: float, iou: float, threads: int = 0,
+                 names: list | dict | None = None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads  # 0 lets onnxruntime use every core
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        super().__init__(class_names(model_path, names, metadata), confidence, iou)
+
+    def forward(self, batch: np.ndarray) -> list:
+        output = self.session.run(None, {self.input_name: batch})[0]
+        return decode_yolo_output(output, self.confidence, self.iou)
+
+
+class OpenCVDnnBackend(InferenceBackend):
+    """
+    OpenCV's DNN module running the ONNX model; needs nothing beyond cv2.
+
+    The net has no thread setting of its own: it runs on OpenCV's process-wide
+    thread pool, which also serves tag undistortion and frame conversion on the
+    camera threads. `threads` is therefore not applied here; cap that pool with
+    cv2.setNumThreads at startup if inference has to leave cores free.
+    """
+
+    name = OPENCV
+
+    def __init__(self, model_path: str, confidence: float, iou: float, threads: int = 0,
+                 names: list | dict | None = None):
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        if threads > 0:
+            logging.warning("The OpenCV DNN backend ignores the \"threads\" setting, it uses OpenCV's global thread pool.")
+        super().__init__(class_names(model_path, names), confidence, iou)
+
+    def forward(self, batch: np.ndarray) -> list:
+        self.net.setInput(batch)
+        return decode_yolo_output(self.net.forward(), self.confidence, self.iou)
+
+
+def create_backend(settings: dict) -> InferenceBackend:
+    """
+    Build the inference backend described by the inference settings.
+
+    Args:
+        settings (dict): See constants.DEFAULT_INFERENCE: backend, model, names, threads, confidence, iou.
+
+    Returns:
+        InferenceBackend: The loaded model.
+    """
+    settings = {**constants.DEFAULT_INFERENCE, **settings}
+    backend = settings["backend"]
+
+    if backend == ULTRALYTICS:
+        return UltralyticsBackend(settings["model"], settings["confidence"], settings["iou"])
+    if backend == ONNXRUNTIME:
+        return OnnxRuntimeBackend(settings["model"], settings["confidence"], settings["iou"], settings["threads"],
+                                  settings["names"])
+    if backend == OPENCV:
+        return OpenCVDnnBackend(settings["model"], settings["confidence"], settings["iou"], settings["threads"],
+                                settings["names"])
+
+    raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}.")
+
+
+def load_backend(settings: dict) -> InferenceBackend:
+    """
+    Create a backend and warm it up.
+    """
+    settings = {**constants.DEFAULT_INFERENCE, **settings}
+    backend = create_backend(settings)
+    if settings["warmupRuns"] > 0:
+        latency = backend.warmup(settings["inputSize"], settings["warmupRuns"])
+        logging.info(f"{backend.name} backend ready ({settings['model']}), warm latency {1000 * latency:.1f} ms")
+    return backend
@@ -0,0 +1,194 @@
+from detection.inference_backends import InferenceBackend, load_backend
+from utils import constants
+from threading import Thread, Condition, Lock
+import numpy as np
+import logging
+import time
+import cv2
+
+LETTERBOX_COLOR = 114
+
+
+def letterbox(frame: np.ndarray, size: int) -> tuple:
+    """
+    Scale a frame into a size x size square, keeping its aspect ratio and padding the rest.
+
+    Args:
+        frame (np.ndarray): BGR frame.
+        size (int): Side of the network input in pixels.
+
+    Returns:
+        tuple: (square image, scale, (pad_x, pad_y)) where image = frame * scale + pad.
+    """
+    height, width = frame.shape[:2]
+    scale = min(size / height, size / width)
+    resized_width, resized_height = round(width * scale), round(height * scale)
+    pad_x, pad_y = (size - resized_width) // 2, (size - resized_height) // 2
+
+    square = np.full((size, size, 3), LETTERBOX_COLOR, dtype=np.uint8)
+    square[pad_y:pad_y + resized_height, pad_x:pad_x + resized_width] = cv2.resize(
+        frame, (resized_width, resized_height), interpolation=cv2.INTER_LINEAR
+    )
+    return square, scale, (pad_x, pad_y)
+
+
+class InferenceService:
+    """
+    A single detection model shared by all cameras.
+
+    Cameras submit their latest frame with a callback. A worker thread waits
+    until every registered camera has a frame pending, or until `max_wait`
+    seconds after the first submission, letterboxes the pending frames into one
+    batch, runs one forward pass and hands each camera its boxes in original
+    frame coordinates. A newer frame from the same camera replaces the pending
+    one, so a slow consumer never builds a backlog.
+
+    Attributes:
+        backend (InferenceBackend): The model runner (ultralytics, onnxruntime or OpenCV DNN).
+        input_size (int): Side of the square network input.
+        max_wait (float): Longest time a submitted frame waits for the rest of the batch.
+        names (dict): Class index -> class name of the model.
+        batches (int): Forward passes run so far.
+        frames (int): Frames processed so far.
+    """
+
+    def __init__(self, backend: InferenceBackend, input_size: int = 640, max_wait: float = 0.02):
+        self.backend = backend
+        self.names = backend.names
+        self.input_size = input_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.frames = 0
+
+        self.__cameras: set = set()
+        self.__pending: dict = {}
+        self.__first_submit = 0.0
+        self.__running = True
+        self.__condition = Condition()
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def register(self, camera_id: int) -> None:
+        """
+        Add a camera to the set the batch waits for.
+        """
+        with self.__condition:
+            self.__cameras.add(camera_id)
+
+    def unregister(self, camera_id: int) -> None:
+        with self.__condition:
+            self.__cameras.discard(camera_id)
+            self.__pending.pop(camera_id, None)
+            self.__condition.notify_all()
+
+    def submit(self, camera_id: int, frame: np.ndarray, callback) -> None:
+        """
+        Queue a camera's latest frame for the next batch.
+
+        Args:
+            camera_id (int): The submitting camera.
+            frame (np.ndarray): BGR frame, treated as read-only.
+            callback: Called from the worker thread with the detections of the frame as
+                {"boxes": (N, 4) x_min, y_min, x_max, y_max, "class_ids": (N,), "confidences": (N,)}.
+        """
+        with self.__condition:
+            if not self.__pending:
+                self.__first_submit = time.monotonic()
+            self.__pending[camera_id] = (frame, callback)
+            self.__condition.notify_all()
+
+    def close(self) -> None:
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    def __next_batch(self) -> dict | None:
+        with self.__condition:
+            while self.__running and not self.__pending:
+                self.__condition.wait()
+
+            # wait for the other cameras, but never past the deadline of the oldest frame
+            deadline = self.__first_submit + self.max_wait
+            while self.__running and not self.__cameras.issubset(self.__pending):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.__condition.wait(remaining)
+
+            if not self.__running:
+                return None
+            batch, self.__pending = self.__pending, {}
+            return batch
+
+    def __run(self) -> None:
+        while True:
+            batch = self.__next_batch()
+            if batch is None:
+                return
+
+            try:
+                detections = self.infer([frame for frame, _ in batch.values()])
+            except Exception as e:
+                logging.error(f"Batched inference failed: {e}")
+                continue
+
+            for (_, callback), frame_detections in zip(batch.values(), detections):
+                try:
+                    callback(frame_detections)
+                except Exception as e:
+                    logging.error(f"Object detection callback failed: {e}")
+
+    def infer(self, frames: list) -> list:
+        """
+        Run one forward pass over a list of frames.
+
+        Args:
+            frames (list): BGR frames of any size.
+
+        Returns:
+            list: Per frame, the list of detections (see `submit`).
+        """
+        squares, transforms = [], []
+        for frame in frames:
+            square, scale, pad = letterbox(frame, self.input_size)
+            squares.append(square)
+            transforms.append((scale, pad))
+
+        # BGR HWC uint8 -> RGB NCHW float32 in [0, 1], the input every backend takes
+        batch = np.stack(squares)[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        results = self.backend.forward(np.ascontiguousarray(batch))
+
+        self.batches += 1
+        self.frames += len(frames)
+
+        detections = []
+        for (boxes, class_ids, confidences), (scale, (pad_x, pad_y)), frame in zip(results, transforms, frames):
+            height, width = frame.shape[:2]
+            boxes = (boxes - [pad_x, pad_y, pad_x, pad_y]) / scale
+            boxes = np.clip(boxes, 0, [width, height, width, height])
+
+            detections.append({"boxes": boxes, "class_ids": class_ids, "confidences": confidences})
+        return detections
+
+
+_services: dict = {}
+_services_lock = Lock()
+
+
+def get_inference_service(settings: dict | None = None) -> InferenceService:
+    """
+    Shared InferenceService of a backend and model, created (and warmed up) once per process.
+
+    Args:
+        settings (dict | None): Inference settings, see constants.DEFAULT_INFERENCE.
+
+    Returns:
+        InferenceService: The service every ObjectDetector with these settings submits to.
+    """
+    settings = {**constants.DEFAULT_INFERENCE, **(settings or {})}
+    key = (settings["backend"], settings["model"])
+    with _services_lock:
+        if key not in _services:
+            _services[key] = InferenceService(load_backend(settings), settings["inputSize"], settings["maxWait"])
+        return _services[key]
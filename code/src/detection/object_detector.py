@@ -1,150 +1,212 @@
-from capture.camera import Camera, Pose3D
-from ultralytics import YOLO
+from capture.frame_overlay import FrameOverlay
+from capture.frame_format import to_bgr
+from detection.inference_service import InferenceService, get_inference_service
+from detection.apriltag_detector import transform_from_pose
+from detection.object_tracker import ObjectTracker
+from functools import partial
+from typing import Callable
 from utils import constants
 import numpy as np
 import logging
-import torch
-import cv2
+
+
+def bbox_corners(boxes: np.ndarray) -> np.ndarray:
+    """
+    Corners of (x_min, y_min, x_max, y_max) boxes, clockwise from the top left.
+
+    Args:
+        boxes (np.ndarray): (N, 4) boxes.
+
+    Returns:
+        np.ndarray: (N, 4, 2) corners.
+    """
+    x_min, y_min, x_max, y_max = np.asarray(boxes, dtype=np.float64).reshape(-1, 4).T
+    return np.stack([
+        np.stack([x_min, y_min], axis=1),
+        np.stack([x_max, y_min], axis=1),
+        np.stack([x_max, y_max], axis=1),
+        np.stack([x_min, y_max], axis=1),
+    ], axis=1)
+
+
+def pinhole_positions(boxes: np.ndarray, sizes: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Closed-form camera-frame positions of objects of known size from their boxes.
+
+    The range follows from the pinhole model, z = f * size / pixels, averaged
+    over the width and height estimates; the box center is then back-projected
+    to that range.
+
+    Args:
+        boxes (np.ndarray): (N, 4) undistorted boxes (x_min, y_min, x_max, y_max).
+        sizes (np.ndarray): (N, 2) real-world (width, height) in meters.
+        matrix (np.ndarray): Intrinsic camera matrix.
+
+    Returns:
+        np.ndarray: (N, 3) positions in OpenCV camera axes (x right, y down, z forward).
+    """
+    fx, fy = matrix[0, 0], matrix[1, 1]
+    cx, cy = matrix[0, 2], matrix[1, 2]
+
+    pixels = np.maximum(boxes[:, 2:] - boxes[:, :2], 1.0)
+    z = 0.5 * (fx * sizes[:, 0] / pixels[:, 0] + fy * sizes[:, 1] / pixels[:, 1])
+
+    centers = 0.5 * (boxes[:, :2] + boxes[:, 2:])
+    x = (centers[:, 0] - cx) * z / fx
+    y = (centers[:, 1] - cy) * z / fy
+    return np.stack([x, y, z], axis=1)
 
 
 class ObjectDetector:
     """
-    Detects objects using YOLOv8 and estimates their positions in the robot's coordinate system.
+    Detects objects using a YOLOv8 model and estimates their positions in field coordinates.
+
+    Frames are sent to a shared InferenceService, which batches them with the
+    other cameras' frames. All boxes of a frame are localized together with
+    array operations. Inference only runs every `detection_interval` frames
+    (or sooner while new tracks wait for confirmation, or on request); the
+    ObjectTracker fills in the frames in between, so `detect_objects` reports
+    ID-stable positions at the camera's frame rate. Detections are placed with
+    the fused robot pose at the frame time, so a camera that sees no tags still
+    places objects; the frame's own tag solve is only the fallback.
     """
-    
-    def __init__(self, camera: Camera, model_path: str = "yolov8n.pt"):
+
+    def __init__(self, camera: "Camera", service: InferenceService | None = None, settings: dict | None = None):
         """
         Initialize the object detector.
-        
+
         Args:
             camera (Camera): The camera instance associated with the detector.
-            model_path (str): Path to the YOLOv8 model file.
+            service (InferenceService | None): Inference service to use, the shared one of `settings` by default.
+            settings (dict | None): Inference settings (backend, model, threads, ...), see constants.DEFAULT_INFERENCE.
         """
+        settings = {**constants.DEFAULT_INFERENCE, **(settings or {})}
         self.camera = camera
-        self.camera_matrix = camera.matrix
-        self.dist_coeffs = camera.dist_coeffs
-        
-        # Check for CUDA availability and use GPU if possible
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = YOLO(model_path).to(self.device)
+        self.service = service if service is not None else get_inference_service(settings)
+        self.service.register(camera.id)
         self.object_sizes = constants.OBJECT_SIZES  # Dictionary of real-world object sizes
-        
-    def detect_objects(self, frame: np.ndarray):
+        self.detection_interval = settings["detectionInterval"]
+        self.tracker = ObjectTracker()
+        self.__frames_since_inference = self.detection_interval
+        self.__detection_requested = False
+
+        # class id -> name and (width, height), NaN for classes without a known size
+        class_count = max(self.service.names) + 1 if self.service.names else 0
+        self.__class_names = np.array([self.service.names.get(i, constants.UNKNOWN) for i in range(class_count)], dtype=object)
+        self.__class_sizes = np.array([self.object_sizes.get(name, (np.nan, np.nan)) for name in self.__class_names],
+                                      dtype=np.float64).reshape(-1, 2)
+        unknown = [name for name in self.__class_names if name not in self.object_sizes]
+        if unknown:
+            logging.warning(f"No size known for {unknown}, these objects are ignored.")
+
+    def detect_objects(self, frame: np.ndarray | Callable[[], np.ndarray], overlay: FrameOverlay | None = None,
+                       timestamp: float | None = None):
         """
-        Detect objects in a frame and estimate their positions.
-        
+        Track objects on a frame, submitting it for detection when inference is due.
+
         Args:
-            frame (np.ndarray): The input video frame.
-        
+            frame (np.ndarray | Callable[[], np.ndarray]): The input video frame (read-only, BGR or grayscale),
+                or a function returning it, called only when the frame is submitted for inference.
+            overlay (FrameOverlay | None): Annotation overlay for the frame.
+            timestamp (float | None): Capture time of the frame, the camera's frame_timestamp by default.
+
         Returns:
-            list: Detected objects with positions in real-world coordinates.
+            list: Tracked objects as {"id", "name", "confidence", "x", "y", "z", "vx", "vy"} in field coordinates.
         """
-        frame_tensor = torch.from_numpy(frame).to(self.device)
-        results = self.model(frame_tensor)
-        detected_objects = []
+        timestamp = self.camera.frame_timestamp if timestamp is None else timestamp
+        field_transform = self.__field_transform(timestamp)
+
+        # without a camera pose detections can't be placed on the field
+        self.__frames_since_inference += 1
+        if field_transform is not None and (
+            self.__frames_since_inference >= self.detection_interval
+            or self.__detection_requested
+            or self.tracker.needs_detection()
+        ):
+            callback = partial(self.__on_detections, field_transform=field_transform, timestamp=timestamp)
+            if callable(frame):
+                frame = frame()
+            # no-op for frames that already are BGR
+            self.service.submit(self.camera.id, to_bgr(frame), callback)
+            self.__frames_since_inference = 0
+            self.__detection_requested = False
+
+        objects, boxes = self.tracker.get_tracks(timestamp, field_transform, self.camera.matrix)
+        if overlay is not None and boxes is not None:
+            drawn = ~np.any(np.isnan(boxes), axis=1)
+            # track boxes are in ideal pinhole coordinates, the overlay is drawn on the raw frame
+            corners = self.camera.undistorter.distort_points(bbox_corners(boxes[drawn]))
+            frame_boxes = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+            labels = [f"{tracked['name']} {tracked['id']}" for tracked, keep in zip(objects, drawn) if keep]
+            for label, bbox in zip(labels, frame_boxes):
+                overlay.add_box(bbox, label, constants.PURPLE)
+        return objects
+
+    def __field_transform(self, timestamp: float) -> np.ndarray | None:
+        """
+        Field-from-camera transform at `timestamp`: the fused robot pose composed with the
+        camera's pose on the robot, or this frame's own tag solve while there is no fused pose.
+        """
+        pose_source = self.camera.pose_source
+        robot_pose = pose_source.robot_pose_at(timestamp) if pose_source is not None else None
+        if robot_pose is None:
+            return self.camera.field_transform
+        return transform_from_pose(self.camera.get_field_pose(robot_pose))
 
-        for result in results:
-            for box in result.boxes:
-                class_id = int(box.cls)
-                object_name = result.names[class_id]
-                bbox = box.xyxy[0].cpu().numpy()  # Bounding box (x_min, y_min, x_max, y_max)
-                
-                if object_name not in self.object_sizes:
-                    logging.warning(f"Unknown object '{object_name}', skipping.")
-                    continue
-                
-                object_position = self.__estimate_object_position(bbox, object_name)
-                real_world_position = self.__transform_to_world_coords(object_position)
-                
-                detected_objects.append({
-                    "name": object_name,
-                    "position": real_world_position
-                })
-                
-                # Draw bounding box
-                x_min, y_min, x_max, y_max = bbox.astype(int)
-                cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), constants.PURPLE, 2)
-                cv2.putText(frame, object_name, (x_min, y_min - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, constants.PURPLE, 2)
-        
-        return detected_objects
-    
-    def __estimate_object_position(self, bbox: np.ndarray, object_name: str) -> Pose3D:
+    def request_detection(self) -> None:
         """
-        Estimate the camera-relative position of an object using SolvePnP.
-        
+        Run inference on the next frame instead of waiting for the schedule.
+        """
+        self.__detection_requested = True
+
+    def close(self) -> None:
+        self.service.unregister(self.camera.id)
+
+    def __on_detections(self, detections: dict, field_transform: np.ndarray, timestamp: float) -> None:
+        """
+        Turn the boxes of one inference result into field positions and feed the tracker.
+
         Args:
-            bbox (np.ndarray): Bounding box (x_min, y_min, x_max, y_max).
-            object_name (str): Name of the detected object.
-        
-        Returns:
-            Pose3D: Estimated position of the object in the camera's coordinate system.
+            detections (dict): Detections of one frame from the InferenceService, in frame coordinates.
+            field_transform (np.ndarray): Field-from-camera transform of that frame.
+            timestamp (float): Capture time of that frame.
         """
-        x_min, y_min, x_max, y_max = bbox
-        object_width, object_height = self.object_sizes[object_name]
-        
-        object_world_corners = np.array([
-            [-object_width / 2, -object_height / 2, 0],
-            [object_width / 2, -object_height / 2, 0],
-            [object_width / 2, object_height / 2, 0],
-            [-object_width / 2, object_height / 2, 0]
-        ], dtype=np.float32)
-        
-        image_corners = np.array([
-            [x_min, y_min],
-            [x_max, y_min],
-            [x_max, y_max],
-            [x_min, y_max]
-        ], dtype=np.float32)
-        
-        success, rvec, tvec = cv2.solvePnP(object_world_corners, image_corners, 
-                                           self.camera_matrix, self.dist_coeffs)
-        
-        if not success:
-            raise Exception(f"SolvePnP failed for object: {object_name}")
-        
-        rotation_matrix, _ = cv2.Rodrigues(rvec)
-        camera_position = -rotation_matrix.T @ tvec
-        
-        return Pose3D(
-            x=camera_position[0, 0],
-            y=camera_position[1, 0],
-            z=camera_position[2, 0],
-            roll=rvec[0, 0],
-            pitch=rvec[1, 0],
-            yaw=rvec[2, 0]
-        )
-    
-    def __transform_to_world_coords(self, object_pose: Pose3D) -> Pose3D:
+        class_ids = detections["class_ids"]
+        known = class_ids < len(self.__class_sizes)
+        known[known] = ~np.isnan(self.__class_sizes[class_ids[known], 0])
+
+        boxes = detections["boxes"][known]
+        class_ids = class_ids[known]
+        confidences = detections["confidences"][known]
+        names = self.__class_names[class_ids]
+        sizes = self.__class_sizes[class_ids]
+
+        detected_objects = []
+        if len(boxes):
+            # undistort the corners of every box at once, then localize on ideal coordinates
+            corners = self.camera.undistorter.undistort_points(bbox_corners(boxes))
+            ideal_boxes = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+
+            camera_points = pinhole_positions(ideal_boxes, sizes, self.camera.matrix)
+            world_points = self.__transform_to_world_coords(camera_points, field_transform)
+
+            detected_objects = [
+                {"name": name, "confidence": confidence, "x": x, "y": y, "z": z, "box": box}
+                for name, confidence, (x, y, z), box in zip(
+                    names.tolist(), confidences.tolist(), world_points.tolist(), ideal_boxes.tolist())
+            ]
+
+        self.tracker.update(detected_objects, sizes, timestamp, field_transform, self.camera.matrix)
+
+    def __transform_to_world_coords(self, camera_points: np.ndarray, field_transform: np.ndarray) -> np.ndarray:
         """
-        Transform object coordinates from the camera frame to the real-world frame.
-        
+        Transform object positions from the camera frame to the field frame.
+
         Args:
-            object_pose (Pose3D): Object position relative to the camera.
-        
+            camera_points (np.ndarray): (N, 3) positions in OpenCV camera axes.
+            field_transform (np.ndarray): 4x4 field-from-camera transform.
+
         Returns:
-            Pose3D: Object position in the real-world coordinate system.
+            np.ndarray: (N, 3) positions in field coordinates.
         """
-        camera_pose = self.camera.field_pose
-        
-        object_position_camera = np.array([object_pose.x, object_pose.y, object_pose.z, 1])
-        
-        # Convert camera pose to transformation matrix
-        camera_rotation = camera_pose.get_rotation_matrix()
-        camera_translation = np.array([camera_pose.x, camera_pose.y, camera_pose.z]).reshape((3, 1))
-        
-        transformation_matrix = np.eye(4)
-        transformation_matrix[:3, :3] = camera_rotation
-        transformation_matrix[:3, 3] = camera_translation.flatten()
-        
-        # Transform object position
-        object_position_world = transformation_matrix @ object_position_camera
-        
-        return Pose3D(
-            x=object_position_world[0],
-            y=object_position_world[1],
-            z=object_position_world[2],
-            roll=object_pose.roll,
-            pitch=object_pose.pitch,
-            yaw=object_pose.yaw
-        )
+        return camera_points @ field_transform[:3, :3].T + field_transform[:3, 3]
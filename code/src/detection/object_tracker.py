@@ -0,0 +1,292 @@
+from scipy.optimize import linear_sum_assignment
+from threading import Lock
+import numpy as np
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise intersection over union of (x_min, y_min, x_max, y_max) boxes.
+
+    Returns:
+        np.ndarray: (len(boxes_a), len(boxes_b)) IoU matrix.
+    """
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def project_boxes(positions: np.ndarray, sizes: np.ndarray, field_transform: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Image boxes (ideal pinhole pixels) of objects of known size at field positions.
+
+    Inverse of `pinhole_positions`: the box is centered on the projected position
+    and scaled by focal length over range. Objects behind the camera get NaN boxes.
+
+    Args:
+        positions (np.ndarray): (N, 3) field positions.
+        sizes (np.ndarray): (N, 2) real-world (width, height) in meters.
+        field_transform (np.ndarray): 4x4 field-from-camera transform of the frame.
+        matrix (np.ndarray): Intrinsic camera matrix.
+
+    Returns:
+        np.ndarray: (N, 4) boxes.
+    """
+    rotation, translation = field_transform[:3, :3], field_transform[:3, 3]
+    camera_points = (positions - translation) @ rotation
+    z = camera_points[:, 2]
+    z = np.where(z > 1e-3, z, np.nan)
+
+    fx, fy = matrix[0, 0], matrix[1, 1]
+    u = matrix[0, 2] + fx * camera_points[:, 0] / z
+    v = matrix[1, 2] + fy * camera_points[:, 1] / z
+    half_width = 0.5 * fx * sizes[:, 0] / z
+    half_height = 0.5 * fy * sizes[:, 1] / z
+    return np.stack([u - half_width, v - half_height, u + half_width, v + half_height], axis=1)
+
+
+class ObjectTracker:
+    """
+    Multi-object tracker for game pieces in field coordinates.
+
+    Every track is a constant-velocity Kalman filter over (x, y, vx, vy) on the
+    field plane. Tracks live in field coordinates, so robot motion between
+    detections is accounted for by projecting them through the camera pose of
+    each frame: detections are associated with the projected track boxes by IoU
+    with the Hungarian algorithm, and between inference runs the tracks are
+    simply predicted forward and re-projected with the new pose. Tracks not
+    matched for `max_age` seconds are dropped even when inference stops (e.g.
+    while the camera sees no tags), and prediction goes at most
+    `max_prediction` seconds past the last inference run.
+
+    Attributes:
+        iou_threshold (float): Smallest IoU accepted for an association.
+        max_misses (int): Inference runs a track may go unmatched before it is dropped.
+        min_hits (int): Matches needed before a track is published.
+        process_noise (float): Acceleration noise of the motion model, in m/s^2.
+        measurement_noise (float): Standard deviation of a detected position, in meters.
+        max_age (float): Seconds a track may go unmatched before it is dropped.
+        max_prediction (float): Longest extrapolation in seconds past the last inference run.
+    """
+
+    def __init__(self, iou_threshold: float = 0.2, max_misses: int = 3, min_hits: int = 2,
+                 process_noise: float = 1.0, measurement_noise: float = 0.15,
+                 max_age: float = 1.0, max_prediction: float = 0.25):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.max_age = max_age
+        self.max_prediction = max_prediction
+        self.min_hits = min_hits
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+
+        # per-track arrays, one row per track
+        self.__ids = np.zeros(0, dtype=np.int64)
+        self.__names = np.zeros(0, dtype=object)
+        self.__states = np.zeros((0, 4))
+        self.__covariances = np.zeros((0, 4, 4))
+        self.__heights = np.zeros(0)
+        self.__sizes = np.zeros((0, 2))
+        self.__confidences = np.zeros(0)
+        self.__hits = np.zeros(0, dtype=np.int64)
+        self.__misses = np.zeros(0, dtype=np.int64)
+        self.__last_seen = np.zeros(0)
+        self.__timestamp: float | None = None
+        self.__next_id = 1
+        self.__lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __predict(self, timestamp: float) -> None:
+        """
+        Advance every track to `timestamp` (all tracks share one clock).
+        """
+        if self.__timestamp is None:
+            self.__timestamp = timestamp
+            return
+        if timestamp <= self.__timestamp:
+            return
+
+        dt = timestamp - self.__timestamp
+        self.__timestamp = timestamp
+
+        transition = np.eye(4)
+        transition[0, 2] = transition[1, 3] = dt
+        # white-noise acceleration, per axis [[dt^4/4, dt^3/2], [dt^3/2, dt^2]]
+        q = self.process_noise ** 2
+        noise = np.zeros((4, 4))
+        noise[[0, 1], [0, 1]] = q * dt ** 4 / 4
+        noise[[0, 1, 2, 3], [2, 3, 0, 1]] = q * dt ** 3 / 2
+        noise[[2, 3], [2, 3]] = q * dt ** 2
+
+        self.__states = self.__states @ transition.T
+        self.__covariances = transition @ self.__covariances @ transition.T + noise
+
+    def update(self, detections: list, sizes: np.ndarray, timestamp: float,
+               field_transform: np.ndarray, matrix: np.ndarray) -> None:
+        """
+        Feed the result of one inference run.
+
+        Args:
+            detections (list): {"name", "confidence", "x", "y", "z", "box"} per detection,
+                box in ideal pinhole pixels of the frame.
+            sizes (np.ndarray): (N, 2) real-world (width, height) of each detection.
+            timestamp (float): Capture time of the frame the detections come from.
+            field_transform (np.ndarray): Field-from-camera transform of that frame.
+            matrix (np.ndarray): Intrinsic camera matrix.
+        """
+        with self.__lock:
+            self.__predict(timestamp)
+
+            names = np.array([d["name"] for d in detections], dtype=object)
+            positions = np.array([[d["x"], d["y"], d["z"]] for d in detections], dtype=np.float64).reshape(-1, 3)
+            boxes = np.array([d["box"] for d in detections], dtype=np.float64).reshape(-1, 4)
+            confidences = np.array([d["confidence"] for d in detections], dtype=np.float64)
+
+            matches = self.__associate(names, boxes, field_transform, matrix)
+            matched_tracks = np.array([t for t, _ in matches], dtype=np.int64)
+            matched_detections = np.array([d for _, d in matches], dtype=np.int64)
+
+            if len(matches):
+                self.__correct(matched_tracks, positions[matched_detections])
+                self.__heights[matched_tracks] = positions[matched_detections, 2]
+                self.__confidences[matched_tracks] = confidences[matched_detections]
+                self.__hits[matched_tracks] += 1
+                self.__misses[matched_tracks] = 0
+                self.__last_seen[matched_tracks] = timestamp
+
+            unmatched_tracks = np.setdiff1d(np.arange(len(self.__ids)), matched_tracks)
+            self.__misses[unmatched_tracks] += 1
+
+            keep = (self.__misses <= self.max_misses) & (timestamp - self.__last_seen <= self.max_age)
+            self.__select(keep)
+
+            new = np.setdiff1d(np.arange(len(detections)), matched_detections)
+            self.__spawn(names[new], positions[new], sizes[new], confidences[new], timestamp)
+
+    def __associate(self, names: np.ndarray, boxes: np.ndarray, field_transform: np.ndarray, matrix: np.ndarray) -> list:
+        """
+        Hungarian assignment on IoU between projected tracks and detections of the same class.
+
+        Returns:
+            list: (track index, detection index) pairs.
+        """
+        if not len(self.__ids) or not len(boxes):
+            return []
+
+        positions = np.column_stack([self.__states[:, :2], self.__heights])
+        track_boxes = project_boxes(positions, self.__sizes, field_transform, matrix)
+        iou = np.nan_to_num(box_iou(track_boxes, boxes))
+        iou[self.__names[:, None] != names[None, :]] = 0.0
+
+        rows, columns = linear_sum_assignment(-iou)
+        accepted = iou[rows, columns] >= self.iou_threshold
+        return list(zip(rows[accepted].tolist(), columns[accepted].tolist()))
+
+    def __correct(self, tracks: np.ndarray, positions: np.ndarray) -> None:
+        """
+        Kalman update of the matched tracks with measured (x, y) positions.
+        """
+        states = self.__states[tracks]
+        covariances = self.__covariances[tracks]
+
+        # H selects (x, y); S = H P H^T + R, K = P H^T S^-1
+        innovation = positions[:, :2] - states[:, :2]
+        innovation_covariance = covariances[:, :2, :2] + np.eye(2) * self.measurement_noise ** 2
+        gain = np.linalg.solve(innovation_covariance, covariances[:, :2, :]).transpose(0, 2, 1)
+
+        self.__states[tracks] = states + np.einsum("nij,nj->ni", gain, innovation)
+        identity_minus_kh = np.eye(4) - np.concatenate([gain, np.zeros((len(tracks), 4, 2))], axis=2)
+        self.__covariances[tracks] = identity_minus_kh @ covariances
+
+    def __spawn(self, names: np.ndarray, positions: np.ndarray, sizes: np.ndarray, confidences: np.ndarray,
+                timestamp: float) -> None:
+        count = len(names)
+        if not count:
+            return
+
+        states = np.zeros((count, 4))
+        states[:, :2] = positions[:, :2]
+        covariance = np.diag([self.measurement_noise ** 2] * 2 + [1.0, 1.0])
+
+        self.__ids = np.concatenate([self.__ids, np.arange(self.__next_id, self.__next_id + count)])
+        self.__next_id += count
+        self.__names = np.concatenate([self.__names, names])
+        self.__states = np.concatenate([self.__states, states])
+        self.__covariances = np.concatenate([self.__covariances, np.tile(covariance, (count, 1, 1))])
+        self.__heights = np.concatenate([self.__heights, positions[:, 2]])
+        self.__sizes = np.concatenate([self.__sizes, sizes.reshape(-1, 2)])
+        self.__confidences = np.concatenate([self.__confidences, confidences])
+        self.__hits = np.concatenate([self.__hits, np.ones(count, dtype=np.int64)])
+        self.__misses = np.concatenate([self.__misses, np.zeros(count, dtype=np.int64)])
+        self.__last_seen = np.concatenate([self.__last_seen, np.full(count, timestamp)])
+
+    def __select(self, mask: np.ndarray) -> None:
+        self.__ids = self.__ids[mask]
+        self.__names = self.__names[mask]
+        self.__states = self.__states[mask]
+        self.__covariances = self.__covariances[mask]
+        self.__heights = self.__heights[mask]
+        self.__sizes = self.__sizes[mask]
+        self.__confidences = self.__confidences[mask]
+        self.__hits = self.__hits[mask]
+        self.__misses = self.__misses[mask]
+        self.__last_seen = self.__last_seen[mask]
+
+    def get_tracks(self, timestamp: float, field_transform: np.ndarray | None = None, matrix: np.ndarray | None = None) -> tuple:
+        """
+        Confirmed tracks predicted to `timestamp`.
+
+        Args:
+            timestamp (float): Time to predict the tracks to, e.g. the current frame's capture time.
+            field_transform (np.ndarray | None): Camera pose of that frame, to project the track boxes.
+            matrix (np.ndarray | None): Intrinsic camera matrix, needed with `field_transform`.
+
+        Returns:
+            tuple: (objects as {"id", "name", "confidence", "x", "y", "z", "vx", "vy"},
+                (N, 4) projected boxes or None).
+        """
+        with self.__lock:
+            # inference may have stopped altogether, so expiry can't wait for `update`
+            expired = timestamp - self.__last_seen > self.max_age
+            if np.any(expired):
+                self.__select(~expired)
+
+            if self.__timestamp is not None and timestamp > self.__timestamp:
+                dt = min(timestamp - self.__timestamp, self.max_prediction)
+                positions = self.__states[:, :2] + dt * self.__states[:, 2:]
+            else:
+                positions = self.__states[:, :2]
+
+            confirmed = self.__hits >= self.min_hits
+            positions = np.column_stack([positions, self.__heights])[confirmed]
+            velocities = self.__states[confirmed, 2:]
+
+            objects = [
+                {"id": track_id, "name": name, "confidence": confidence,
+                 "x": x, "y": y, "z": z, "vx": vx, "vy": vy}
+                for track_id, name, confidence, (x, y, z), (vx, vy) in zip(
+                    self.__ids[confirmed].tolist(), self.__names[confirmed].tolist(),
+                    self.__confidences[confirmed].tolist(), positions.tolist(), velocities.tolist())
+            ]
+
+            boxes = None
+            if field_transform is not None and matrix is not None:
+                boxes = project_boxes(positions, self.__sizes[confirmed], field_transform, matrix)
+            return objects, boxes
+
+    def needs_detection(self) -> bool:
+        """
+        Whether an inference run is due regardless of the schedule, because
+        some tracks are still waiting for confirmation.
+        """
+        with self.__lock:
+            return bool(np.any(self.__hits < self.min_hits))
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__select(np.zeros(len(self.__ids), dtype=bool))
+            self.__timestamp = None
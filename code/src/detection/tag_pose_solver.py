@@ -0,0 +1,107 @@
+from utils.field_layout import SQUARE_CORNERS
+import numpy as np
+import cv2
+
+
+def rotation_angle(rvec_a: np.ndarray, rvec_b: np.ndarray) -> float:
+    """
+    Angle in radians of the rotation between two Rodrigues vectors.
+    """
+    rotation_a, _ = cv2.Rodrigues(rvec_a)
+    rotation_b, _ = cv2.Rodrigues(rvec_b)
+    cos_angle = (np.trace(rotation_a @ rotation_b.T) - 1) / 2
+    return float(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+
+def reprojection_error(rvec: np.ndarray, tvec: np.ndarray, image_corners: np.ndarray, matrix, dist_coeffs) -> float:
+    """
+    RMS distance in pixels between the tag's projected and detected corners.
+    """
+    projected, _ = cv2.projectPoints(SQUARE_CORNERS, rvec, tvec, matrix, dist_coeffs)
+    return float(np.sqrt(np.mean(np.sum((projected.reshape(-1, 2) - image_corners.reshape(-1, 2)) ** 2, axis=1))))
+
+
+class SingleTagSolver:
+    """
+    Per-tag PnP in the tag's square frame, warm-started from the previous frame.
+
+    A planar square has two valid-looking poses (the flip ambiguity). Cold tags
+    are solved with the analytic IPPE_SQUARE solver, keeping both solutions and
+    choosing the one with the lower reprojection error. Tags seen recently are
+    refined with the iterative solver from last frame's pose; if that result
+    jumps or reprojects badly, both IPPE solutions are computed again and the
+    one closest to the previous pose wins.
+
+    Attributes:
+        max_age (int): Frames a cached pose stays usable as a seed.
+        max_reprojection_error (float): Largest accepted RMS error of a warm solve, in pixels.
+        max_rotation_jump (float): Largest accepted rotation change of a warm solve, in radians.
+    """
+
+    def __init__(self, max_age: int = 5, max_reprojection_error: float = 2.0, max_rotation_jump: float = 0.35):
+        self.max_age = max_age
+        self.max_reprojection_error = max_reprojection_error
+        self.max_rotation_jump = max_rotation_jump
+        self.__cache: dict = {}
+
+    def solve(self, tag_id: int, image_corners: np.ndarray, matrix, dist_coeffs, frame_index: int) -> tuple:
+        """
+        Camera-from-square pose of one tag.
+
+        Args:
+            tag_id (int): ID of the tag.
+            image_corners (np.ndarray): (4, 2) detected corners.
+            matrix (np.ndarray): Intrinsic camera matrix.
+            dist_coeffs (np.ndarray): Distortion coefficients.
+            frame_index (int): Index of the current frame, used for cache ageing.
+
+        Returns:
+            tuple: (rvec, tvec).
+        """
+        cached = self.__cache.get(tag_id)
+        prior = cached if cached is not None and frame_index - cached[2] <= self.max_age else None
+
+        solution = None
+        if prior is not None:
+            solution = self.__refine(prior, image_corners, matrix, dist_coeffs)
+        if solution is None:
+            solution = self.__solve_ippe(prior, image_corners, matrix, dist_coeffs)
+
+        self.__cache[tag_id] = (solution[0], solution[1], frame_index)
+        return solution
+
+    def __refine(self, prior: tuple, image_corners: np.ndarray, matrix, dist_coeffs) -> tuple | None:
+        success, rvec, tvec = cv2.solvePnP(
+            SQUARE_CORNERS, image_corners, matrix, dist_coeffs,
+            rvec=prior[0].copy(), tvec=prior[1].copy(),
+            useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE,
+        )
+        if not success:
+            return None
+        if rotation_angle(rvec, prior[0]) > self.max_rotation_jump:
+            return None
+        if reprojection_error(rvec, tvec, image_corners, matrix, dist_coeffs) > self.max_reprojection_error:
+            return None
+        return rvec, tvec
+
+    def __solve_ippe(self, prior: tuple | None, image_corners: np.ndarray, matrix, dist_coeffs) -> tuple:
+        count, rvecs, tvecs, _ = cv2.solvePnPGeneric(
+            SQUARE_CORNERS, image_corners, matrix, dist_coeffs, flags=cv2.SOLVEPNP_IPPE_SQUARE
+        )
+        if count == 0:
+            raise Exception("SolvePnP failed to find a solution.")
+
+        # solutions come sorted by reprojection error
+        best = 0
+        if prior is not None and count > 1:
+            best = int(np.argmin([rotation_angle(rvec, prior[0]) for rvec in rvecs]))
+        return rvecs[best], tvecs[best]
+
+    def prune(self, frame_index: int) -> None:
+        """
+        Drop tags that have not been seen for longer than `max_age` frames.
+        """
+        self.__cache = {tag_id: entry for tag_id, entry in self.__cache.items() if frame_index - entry[2] <= self.max_age}
+
+    def reset(self) -> None:
+        self.__cache = {}
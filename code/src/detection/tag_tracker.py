@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class TagTracker:
+    """
+    Predicts where previously detected AprilTags will be in the next frame.
+
+    Each track keeps the last image corners of a tag and their per-frame velocity,
+    so the detector can search small padded regions instead of the whole frame.
+
+    Attributes:
+        full_scan_interval (int): Force a full-frame scan at least every N frames.
+        roi_padding (float): Padding around a predicted tag, relative to its size.
+        min_roi_size (int): Smallest ROI side in pixels.
+    """
+
+    def __init__(self, full_scan_interval: int = 10, roi_padding: float = 0.5, min_roi_size: int = 48):
+        self.full_scan_interval = full_scan_interval
+        self.roi_padding = roi_padding
+        self.min_roi_size = min_roi_size
+        self.__tracks: dict = {}
+        self.__frame_index = 0
+        self.__last_full_scan = None
+
+    def next_frame(self) -> None:
+        self.__frame_index += 1
+
+    def needs_full_scan(self) -> bool:
+        """
+        Whether the current frame should be scanned in full.
+        """
+        return (
+            not self.__tracks
+            or self.__last_full_scan is None
+            or self.__frame_index - self.__last_full_scan >= self.full_scan_interval
+        )
+
+    @property
+    def tracked_ids(self) -> set:
+        return set(self.__tracks)
+
+    def predict_rois(self, frame_shape: tuple) -> list:
+        """
+        Padded search regions around the predicted position of every tracked tag.
+
+        Overlapping regions are merged so a tag is never searched twice.
+
+        Args:
+            frame_shape (tuple): Shape of the grayscale frame (height, width).
+
+        Returns:
+            list: ROIs as (x_min, y_min, x_max, y_max) integer tuples.
+        """
+        height, width = frame_shape[:2]
+        boxes = []
+
+        for corners, velocity, frame_index in self.__tracks.values():
+            predicted = corners + velocity * (self.__frame_index - frame_index)
+            x_min, y_min = predicted.min(axis=0)
+            x_max, y_max = predicted.max(axis=0)
+            pad = max(self.roi_padding * max(x_max - x_min, y_max - y_min), self.min_roi_size / 2)
+            boxes.append([
+                max(0, int(x_min - pad)),
+                max(0, int(y_min - pad)),
+                min(width, int(np.ceil(x_max + pad))),
+                min(height, int(np.ceil(y_max + pad))),
+            ])
+
+        merged = []
+        for box in sorted(boxes):
+            for other in merged:
+                if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                    other[0], other[1] = min(other[0], box[0]), min(other[1], box[1])
+                    other[2], other[3] = max(other[2], box[2]), max(other[3], box[3])
+                    break
+            else:
+                merged.append(box)
+
+        return [tuple(box) for box in merged if box[2] > box[0] and box[3] > box[1]]
+
+    def update(self, detections: list, full_scan: bool) -> None:
+        """
+        Refresh the tracks from this frame's detections.
+
+        Args:
+            detections (list): pyapriltags detections (full-frame corner coordinates).
+            full_scan (bool): Whether the detections come from a full-frame scan.
+        """
+        tracks = {}
+        for tag in detections:
+            corners = np.asarray(tag.corners, dtype=np.float64)
+            velocity = np.zeros(2)
+            previous = self.__tracks.get(tag.tag_id)
+            if previous is not None:
+                previous_corners, _, frame_index = previous
+                elapsed = max(1, self.__frame_index - frame_index)
+                velocity = (corners - previous_corners).mean(axis=0) / elapsed
+            tracks[tag.tag_id] = (corners, velocity, self.__frame_index)
+
+        self.__tracks = tracks
+        if full_scan:
+            self.__last_full_scan = self.__frame_index
+
+    def reset(self) -> None:
+        self.__tracks = {}
+        self.__last_full_scan = None
@@ -1,5 +1,6 @@
 import threading
 from utils import constants
+from utils.notifier import UpdateNotifier
 
 MODE_LOCK = threading.Lock()
 CURRENT_MODE = {
@@ -24,4 +25,7 @@ CAMERA_SETTINGS = {
 
 SETTINGS_CHANGED = False
 
-SEASON = constants.REEFSCAPE
\ No newline at end of file
+SEASON = constants.REEFSCAPE
+
+# signalled for every new robot pose measurement, wakes the fusion loop
+POSE_UPDATES = UpdateNotifier()
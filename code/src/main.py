@@ -8,13 +8,18 @@ import cv2
 import os
 from pathlib import Path
 import json
-import socket
+import copy
 import logging
-from capture.camera_manager import open_threads, count_connected_cameras
+from capture.camera_manager import open_threads
+from capture.camera_enumeration import enumerate_cameras
+from capture.process_backend import open_processes
 from capture.camera import Camera
 from capture.camera_calibration import calibrate_camera, delete_image, save_image
-from slam.sensor_fusion import average_pose3d
-from utils.output_formats import data_format
+from slam.fusion_engine import FusionEngine
+from slam.pose_history import PoseHistory
+from slam.object_fusion import ObjectFusion
+from networking.robot_link import RobotLink, message_float, message_timestamp
+from utils.output_formats import data_format, robot_message_format, pose3d_format
 from utils import constants
 import globals
 import sys
@@ -22,12 +27,14 @@ from datetime import datetime
 
 app = Flask(__name__, static_folder="networking/dist", static_url_path="")
 
-HOST = "192.168.0.224"
-PORT = 5000
+# the robot's address, overridable to test against a local mock robot (mock_robot.py)
+HOST = os.environ.get("AURORA_ROBOT_HOST", "192.168.0.224")
+PORT = int(os.environ.get("AURORA_ROBOT_PORT", 5000))
 
 data_lock = threading.Lock()
 output = {}
 camera_list = []
+pose_history = PoseHistory(constants.POSE_HISTORY_SIZE)
 CALIBRATION_BASE_PATH = "src/capture/calibration_images"
 
 
@@ -52,102 +59,141 @@ def validate_camera_id(camera_id, settings):
     return 0 <= camera_id < len(settings)
 
 
-def stream_generator(camera):
-    while True:
-        frame = camera.display_frame
-        if frame is None:
-            break
-        ret, jpeg = cv2.imencode('.jpg', frame)
-        if not ret:
-            break
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
+def get_camera(camera_id):
+    return next((cam for cam in camera_list if cam.id == camera_id), None)
 
 
-def update_output(cameras, avg_pose):
+def stream_generator(camera):
+    camera.add_stream_client()
+    last_seq = -1
+    try:
+        while True:
+            if camera.display_seq == last_seq:
+                time.sleep(constants.STREAM_POLL_INTERVAL)
+                continue
+            last_seq = camera.display_seq
+            frame = camera.get_display_frame()
+            if frame is None:
+                break
+            ret, jpeg = cv2.imencode('.jpg', frame)
+            if not ret:
+                break
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
+    finally:
+        camera.remove_stream_client()
+
+
+def update_output(cameras, avg_pose, objects=None):
     global output
     with data_lock:
-        output = data_format(cameras, {}, avg_pose)
+        output = data_format(cameras, {"objects": objects or []}, avg_pose)
 
 
-import json
+def handle_robot_message(fusion: FusionEngine, message: dict, received_at: float) -> dict | None:
+    """
+    Feed robot odometry into the fusion and answer pose queries.
+    """
+    timestamp = message_timestamp(message, received_at)
+
+    if message["type"] == "odometry":
+        velocity = (message_float(message, "vx"), message_float(message, "vy"), message_float(message, "omega"))
+        fusion.add_odometry(velocity, timestamp, bool(message.get("field_relative", False)))
+        # publish at odometry rate
+        globals.POSE_UPDATES.notify()
+        return None
+
+    if message["type"] == "pose_query":
+        # recorded poses for the past, the prediction beyond the newest one
+        pose = pose_history.pose_at(timestamp)
+        if pose is None and fusion.initialized and timestamp >= (fusion.timestamp or 0.0):
+            pose = fusion.pose_at(timestamp)
+        return {"type": "pose", "id": message.get("id"), "timestamp": timestamp,
+                "pose": None if pose is None else pose3d_format(pose)}
+
+    return None
+
 
 def data_fusion(cameras):
     global output
-    sock = None
-    last_socket_attempt = 0
+    fusion = FusionEngine(cameras, pose_history)
+    object_fusion = ObjectFusion(constants.OBJECT_MERGE_RADIUS)
+    for camera in cameras:
+        # object detection places what a camera sees with the fused robot pose of the frame
+        camera.pose_source = fusion
+    robot = RobotLink(HOST, PORT, lambda message, received_at: handle_robot_message(fusion, message, received_at))
+    robot.start()
+    pose_version = 0
 
     while True:
-        start_time = time.time()
-        avg_poses = Queue()
-
-        for camera in cameras:
-            avg_poses.put(average_pose3d(camera.robot_pose_queue))
-
-        avg_pose = average_pose3d(avg_poses)
-        update_output(cameras, avg_pose)
-
-        if sock:
-            try:
-                # Example: generate some dummy corals (replace with real detections later)
-                corals = [{"x": 1.0, "y": 2.0}, {"x": 2.5, "y": 3.5}]
-
-                message = {
-                    "pose": {
-                        "x": avg_pose.x,
-                        "y": avg_pose.y,
-                        "z": avg_pose.z,
-                        "roll": avg_pose.roll,
-                        "pitch": avg_pose.pitch,
-                        "yaw": avg_pose.yaw
-                    },
-                    "corals": corals
-                }
-
-                data = json.dumps(message).encode("utf-8") + b"\n"  # newline-delimited JSON
-                sock.sendall(data)
-
-            except (socket.error, ConnectionResetError, BrokenPipeError):
-                print("Lost connection to the server. Closing socket.")
-                sock.close()
-                sock = None
-
-        if not sock and (time.time() - last_socket_attempt) > 3:
-            last_socket_attempt = time.time()
-            try:
-                print("Attempting to connect to the server...")
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(0.05)
-                sock.connect((HOST, PORT))
-                print("Connected to the server.")
-            except (socket.error, ConnectionResetError):
-                print("Connection failed. Will retry in 3 seconds.")
-                sock = None
-
-        print((time.time() - start_time))
-        time.sleep(max(0, constants.UPDATE_INTERVAL - (time.time() - start_time)))
+        # fuse as soon as cameras report new poses or the robot new odometry; the heartbeat keeps publishing otherwise
+        pose_version = globals.POSE_UPDATES.wait(
+            pose_version, timeout=constants.FUSION_HEARTBEAT, coalesce=constants.FUSION_COALESCE_WINDOW
+        )
+
+        now = time.time()
+        fusion.step(now)
+        # the newest measurement is already a frame latency old, publish the pose predicted to now
+        avg_pose = fusion.pose_at(now)
+        objects = object_fusion.fuse(cameras)
+        update_output(cameras, avg_pose, objects)
+
+        if robot.connected:
+            robot.send(robot_message_format(
+                cameras, avg_pose, now, fusion.is_stale(now), fusion.get_pose(), fusion.timestamp, objects
+            ))
+
+
+def assign_devices(camera_settings, devices):
+    """
+    Match connected devices to camera settings entries by their stable identifier.
+
+    Entries remember their device in "device_id", so a camera keeps its calibration
+    and mounting pose regardless of enumeration order. Unknown devices take a free
+    entry or get a new default one. Entries for disconnected devices are kept.
+
+    Returns:
+        tuple: ([(settings index, device path or index)], settings changed)
+    """
+    changed = False
+    by_id = {device["id"]: device for device in devices}
+    assignments = []
+
+    for index, entry in enumerate(camera_settings):
+        source_type = entry.get("source", constants.DEFAULT_SOURCE).get("type", "device")
+        if source_type != "device":
+            assignments.append((index, index))
+        elif entry.get("device_id") in by_id:
+            assignments.append((index, by_id.pop(entry["device_id"])["device"]))
+
+    for device in list(by_id.values()):
+        free = next((index for index, entry in enumerate(camera_settings)
+                     if "device_id" not in entry and entry.get("source", constants.DEFAULT_SOURCE).get("type", "device") == "device"), None)
+        if free is None:
+            camera_settings.append(copy.deepcopy(constants.DEFAULT_CAMERA))
+            free = len(camera_settings) - 1
+        camera_settings[free]["device_id"] = device["id"]
+        assignments.append((free, device["device"]))
+        changed = True
+
+    return sorted(assignments), changed
 
 
 def start_system():
     global camera_list
 
-    num_of_cams = count_connected_cameras()
+    devices = enumerate_cameras()
     camera_settings, json_path = load_camera_settings()
-    num_of_cams_in_file = len(camera_settings)
-    
-    camera_list = [Camera(cam_id) for cam_id in range(min(num_of_cams_in_file, num_of_cams))]
-    
-    if num_of_cams < num_of_cams_in_file:
-        camera_settings = camera_settings[:num_of_cams]
+
+    assignments, changed = assign_devices(camera_settings, devices)
+    if changed:
         save_camera_settings(camera_settings, json_path)
-    elif num_of_cams > num_of_cams_in_file:
-        for cam_id in range(num_of_cams_in_file, num_of_cams):
-            camera_settings.append(constants.DEFAULT_CAMERA)
-            save_camera_settings(camera_settings, json_path)
-            camera_list.append(Camera(cam_id))
 
+    camera_list = [Camera(cam_id, device) for cam_id, device in assignments]
+
+    backend = open_processes if constants.CAPTURE_BACKEND == "processes" else open_threads
     threading.Thread(
-        target=open_threads,
+        target=backend,
         args=(data_fusion, camera_list, constants.REEFSCAPE),
         daemon=True
     ).start()
@@ -181,6 +227,25 @@ def get_fused_detection():
         return jsonify(output["fused_data"])
 
 
+@app.route("/api/pose_at", methods=["GET"])
+def get_pose_at():
+    time_range = pose_history.time_range()
+    if time_range is None:
+        return jsonify({"error": "No poses recorded yet"}), 404
+
+    # unix time in seconds, the newest recorded pose by default
+    try:
+        timestamp = float(request.args.get("t", time_range[1]))
+    except ValueError:
+        return jsonify({"error": "Invalid timestamp"}), 400
+
+    pose = pose_history.pose_at(timestamp)
+    if pose is None:
+        return jsonify({"error": "Timestamp outside the pose history", "range": time_range}), 404
+
+    return jsonify({"timestamp": timestamp, "pose": pose3d_format(pose)})
+
+
 @app.route("/api/mode", methods=["GET", "POST"])
 def handle_mode():
     if request.method == "GET":
@@ -191,7 +256,7 @@ def handle_mode():
     mode = mode_data.get("mode")
     camera_id = mode_data.get("camera_id", None)
 
-    if mode not in {"Detection", "Calibration", "Lighting", "Settings"}:
+    if mode not in constants.MODES:
         return jsonify({"error": "Invalid mode"}), 400
 
     with globals.MODE_LOCK:
@@ -207,12 +272,15 @@ def handle_camera_settings(camera_id):
 
     if request.method == "GET":
         if validate_camera_id(camera_id, camera_settings):
-            return jsonify(camera_settings[camera_id]["settings"])
+            camera = get_camera(camera_id)
+            achieved = camera.capture_state if camera else {}
+            return jsonify({**camera_settings[camera_id]["settings"], "achieved": achieved})
         return jsonify({"error": "Invalid camera ID"}), 404
 
     new_settings = request.get_json()
     if not new_settings:
         return jsonify({"error": "Missing settings data"}), 400
+    new_settings.pop("achieved", None)
 
     required_keys = {"fps", "name", "pitch", "roll", "x", "y", "yaw", "z"}
     if not required_keys.issubset(new_settings):
@@ -258,7 +326,7 @@ def handle_calibration_settings():
 
 @app.route("/api/stream_<int:camera_id>")
 def stream(camera_id):
-    camera = next((cam for cam in camera_list if cam.id == camera_id), None)
+    camera = get_camera(camera_id)
     if not camera:
         return "Camera not found", 404
     return Response(stream_generator(camera), mimetype='multipart/x-mixed-replace; boundary=frame')
@@ -273,8 +341,12 @@ def handle_calibration_operation():
     with globals.MODE_LOCK:
         camera_id = globals.CURRENT_MODE["camera_id"]
 
-    frame = camera_list[camera_id].frame
-    display_frame = camera_list[camera_id].display_frame
+    camera = get_camera(camera_id)
+    if camera is None:
+        return jsonify({"error": "Invalid camera ID"}), 404
+
+    frame = camera.frame
+    display_frame = camera.get_display_frame()
 
     if operation == "Delete":
         index = request.get_json().get("index")
@@ -289,7 +361,7 @@ def handle_calibration_operation():
 
     if operation == "Calibration":
         dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'capture', 'calibration_images')
-        calibration_settings = camera_list[camera_id].calibration
+        calibration_settings = camera.calibration
         result = calibrate_camera(image_dir=dir_path, calibration_settings=calibration_settings)
         num_files = len([f for f in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, f))])
         for i in range (0, num_files):
@@ -0,0 +1,98 @@
+"""
+Stand-in for the robot end of the robot link, for testing Aurora on one machine.
+
+Listens where Aurora expects the robot, streams odometry of a robot driving a
+circle and periodically asks for the pose a moment ago, printing what Aurora
+sends back:
+
+    python mock_robot.py --port 5000 --rate 200
+    AURORA_ROBOT_HOST=127.0.0.1 python main.py
+
+Pass --binary to send packed packets instead of newline-delimited JSON.
+"""
+from networking.robot_link import encode_odometry, encode_pose_query, split_messages
+import argparse
+import socket
+import json
+import time
+
+
+def serve_robot(port: int, rate: float, speed: float, turn_rate: float, binary: bool, query_interval: float) -> None:
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("0.0.0.0", port))
+    server.listen(1)
+
+    while True:
+        print(f"Waiting for Aurora on port {port}...")
+        conn, address = server.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.setblocking(False)
+        print(f"Aurora connected from {address[0]}")
+
+        buffer = bytearray()
+        period = 1.0 / rate
+        next_send = time.monotonic()
+        next_query = next_send + query_interval
+        query_id = 0
+        poses = 0
+        last_report = time.monotonic()
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= next_send:
+                    if binary:
+                        conn.sendall(encode_odometry(speed, 0.0, turn_rate))
+                    else:
+                        message = {"type": "odometry", "vx": speed, "vy": 0.0, "omega": turn_rate, "age": 0.0}
+                        conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+                    next_send += period
+
+                if now >= next_query:
+                    query_id += 1
+                    if binary:
+                        conn.sendall(encode_pose_query(query_id, age=0.1))
+                    else:
+                        message = {"type": "pose_query", "id": query_id, "age": 0.1}
+                        conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+                    next_query += query_interval
+
+                try:
+                    data = conn.recv(65536)
+                    if not data:
+                        break
+                    buffer.extend(data)
+                except BlockingIOError:
+                    pass
+
+                for message in split_messages(buffer):
+                    if message.get("type") == "pose":
+                        print(f"pose query {message['id']}: {message['pose']}")
+                    else:
+                        poses += 1
+
+                if now - last_report >= 1.0:
+                    print(f"{poses / (now - last_report):.0f} poses/s received")
+                    poses = 0
+                    last_report = now
+
+                time.sleep(max(0.0, min(next_send, next_query) - time.monotonic()))
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            conn.close()
+            print("Aurora disconnected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock robot for the Aurora robot link")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=200.0, help="odometry messages per second")
+    parser.add_argument("--speed", type=float, default=1.0, help="forward speed in m/s")
+    parser.add_argument("--turn-rate", type=float, default=0.5, help="yaw rate in rad/s")
+    parser.add_argument("--query-interval", type=float, default=1.0, help="seconds between pose queries")
+    parser.add_argument("--binary", action="store_true", help="send packed binary messages instead of JSON")
+    args = parser.parse_args()
+
+    serve_robot(args.port, args.rate, args.speed, args.turn_rate, args.binary, args.query_interval)
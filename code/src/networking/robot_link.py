@@ -0,0 +1,229 @@
+"""
+Bidirectional TCP link to the robot.
+
+Aurora connects to the robot and sends newline-delimited JSON. The robot may
+send messages back, either as newline-delimited JSON or as fixed-size binary
+packets that start with `MAGIC` (a byte that never starts a JSON line):
+
+    odometry    {"type": "odometry", "vx": m/s, "vy": m/s, "omega": rad/s,
+                 "field_relative": false, "age": s}
+                binary ODOMETRY_PACKET: magic, ODOMETRY, flags (bit 0 = field relative), age, vx, vy, omega
+
+    pose_query  {"type": "pose_query", "id": n, "age": s}
+                binary POSE_QUERY_PACKET: magic, POSE_QUERY, id, age
+
+"age" is how long ago the sample was taken (or the pose is wanted), so the two
+machines need no common clock; JSON messages may give an absolute "timestamp"
+in Aurora's clock instead. Binary packets are decoded into the same dicts.
+"""
+from typing import Callable
+from utils import constants
+import threading
+import logging
+import socket
+import struct
+import json
+import math
+import time
+
+MAGIC = 0xA5
+
+# binary message types
+ODOMETRY = 1
+POSE_QUERY = 2
+
+ODOMETRY_PACKET = struct.Struct("<BBBffff")
+POSE_QUERY_PACKET = struct.Struct("<BBIf")
+PACKETS = {ODOMETRY: ODOMETRY_PACKET, POSE_QUERY: POSE_QUERY_PACKET}
+
+FIELD_RELATIVE = 0x01
+
+
+def encode_odometry(vx: float, vy: float, omega: float, age: float = 0.0, field_relative: bool = False) -> bytes:
+    return ODOMETRY_PACKET.pack(MAGIC, ODOMETRY, FIELD_RELATIVE if field_relative else 0, age, vx, vy, omega)
+
+
+def encode_pose_query(query_id: int, age: float = 0.0) -> bytes:
+    return POSE_QUERY_PACKET.pack(MAGIC, POSE_QUERY, query_id, age)
+
+
+def decode_packet(packet: bytes) -> dict:
+    message_type = packet[1]
+    if message_type == ODOMETRY:
+        _, _, flags, age, vx, vy, omega = ODOMETRY_PACKET.unpack(packet)
+        return {"type": "odometry", "vx": vx, "vy": vy, "omega": omega,
+                "field_relative": bool(flags & FIELD_RELATIVE), "age": age}
+    _, _, query_id, age = POSE_QUERY_PACKET.unpack(packet)
+    return {"type": "pose_query", "id": query_id, "age": age}
+
+
+def split_messages(buffer: bytearray) -> list:
+    """
+    Remove every complete message from the front of `buffer`.
+
+    Returns:
+        list: Decoded messages, in arrival order; malformed ones are dropped.
+    """
+    messages = []
+    while buffer:
+        if buffer[0] == MAGIC:
+            if len(buffer) < 2:
+                break
+            packet = PACKETS.get(buffer[1])
+            if packet is None:
+                logging.warning(f"Unknown robot packet type {buffer[1]}, dropping the byte")
+                del buffer[0]
+                continue
+            if len(buffer) < packet.size:
+                break
+            messages.append(decode_packet(bytes(buffer[:packet.size])))
+            del buffer[:packet.size]
+            continue
+
+        end = buffer.find(b"\n")
+        if end < 0:
+            break
+        line = bytes(buffer[:end]).strip()
+        del buffer[:end + 1]
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+        except ValueError:
+            logging.warning(f"Malformed robot message: {line[:80]!r}")
+            continue
+        if isinstance(message, dict):
+            messages.append(message)
+    return messages
+
+
+def message_float(message: dict, key: str, default: float | None = None) -> float:
+    """
+    Numeric field of a robot message. NaN and infinity (which JSON and binary
+    floats can both carry) raise ValueError, so they never reach the filter.
+    """
+    value = float(message[key]) if default is None or key in message else default
+    if not math.isfinite(value):
+        raise ValueError(f"{key} is not finite: {value}")
+    return value
+
+
+def message_timestamp(message: dict, received_at: float) -> float:
+    """
+    Time a robot message refers to, in Aurora's clock.
+    """
+    if "timestamp" in message:
+        return message_float(message, "timestamp")
+    return received_at - message_float(message, "age", 0.0)
+
+
+class RobotLink:
+    """
+    Keeps a connection to the robot open, sends it messages and handles what it sends back.
+
+    A daemon thread connects (retrying every ROBOT_RECONNECT_INTERVAL seconds),
+    reads incoming messages and passes each one, with its arrival time, to
+    `handler`; a dict returned by the handler is sent back as the reply.
+    `send` may be called from any thread and drops the message while disconnected.
+
+    Attributes:
+        host (str): Robot address.
+        port (int): Robot port.
+        handler (Callable[[dict, float], dict | None]): Called for every incoming message.
+    """
+
+    def __init__(self, host: str, port: int, handler: Callable[[dict, float], dict | None]):
+        self.host = host
+        self.port = port
+        self.handler = handler
+        self.__sock: socket.socket | None = None
+        self.__send_lock = threading.Lock()
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self.__sock is not None
+
+    def start(self) -> None:
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+
+    def send(self, message: dict) -> bool:
+        """
+        Send one newline-delimited JSON message.
+
+        Returns:
+            bool: Whether the message was sent.
+        """
+        sock = self.__sock
+        if sock is None:
+            return False
+        data = json.dumps(message).encode("utf-8") + b"\n"
+        try:
+            with self.__send_lock:
+                sock.sendall(data)
+            return True
+        except OSError:
+            logging.warning("Lost connection to the robot.")
+            self.__close(sock)
+            return False
+
+    def __close(self, sock: socket.socket) -> None:
+        with self.__send_lock:
+            if self.__sock is sock:
+                self.__sock = None
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def __connect(self) -> socket.socket | None:
+        logging.info(f"Connecting to the robot at {self.host}:{self.port}...")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(constants.ROBOT_SOCKET_TIMEOUT)
+        try:
+            sock.connect((self.host, self.port))
+        except OSError:
+            sock.close()
+            logging.info(f"Robot connection failed, retrying in {constants.ROBOT_RECONNECT_INTERVAL} seconds.")
+            return None
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # reads block briefly so a connection closed by `send` is noticed
+        sock.settimeout(constants.FUSION_HEARTBEAT)
+        logging.info("Connected to the robot.")
+        return sock
+
+    def __run(self) -> None:
+        while True:
+            sock = self.__connect()
+            if sock is None:
+                time.sleep(constants.ROBOT_RECONNECT_INTERVAL)
+                continue
+            with self.__send_lock:
+                self.__sock = sock
+
+            buffer = bytearray()
+            while self.__sock is sock:
+                try:
+                    data = sock.recv(4096)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not data:
+                    break
+                received_at = time.time()
+                buffer.extend(data)
+                for message in split_messages(buffer):
+                    try:
+                        reply = self.handler(message, received_at)
+                    except (KeyError, TypeError, ValueError) as e:
+                        logging.warning(f"Invalid robot message {message}: {e}")
+                        continue
+                    if reply is not None:
+                        self.send(reply)
+
+            logging.warning("Robot connection closed.")
+            self.__close(sock)
+            time.sleep(constants.ROBOT_RECONNECT_INTERVAL)
@@ -0,0 +1,118 @@
+"""
+Produce an INT8 version of an exported ONNX detection model for the CPU backends.
+
+Static quantization calibrates activation ranges on real frames, so point it at
+recorded camera images (e.g. a session bundle written with the "record" source
+setting). Without calibration images the weights alone are quantized:
+
+    python quantize_model.py best.onnx best_int8.onnx --calibration ../data/sessions/match1
+    python quantize_model.py best.onnx best_int8.onnx
+"""
+from detection.inference_service import letterbox
+from capture.frame_format import to_bgr
+from utils import constants
+from pathlib import Path
+import numpy as np
+import onnxruntime
+import onnx
+import argparse
+import cv2
+
+from onnxruntime.quantization import (
+    CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static, shape_inference
+)
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """
+    Feeds letterboxed frames to the calibrator, preprocessed exactly like InferenceService does.
+    """
+
+    def __init__(self, input_name: str, image_paths: list, input_size: int):
+        self.input_name = input_name
+        self.image_paths = iter(image_paths)
+        self.input_size = input_size
+
+    def get_next(self) -> dict | None:
+        for path in self.image_paths:
+            frame = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+            if frame is None:
+                continue
+            square, _, _ = letterbox(to_bgr(frame), self.input_size)
+            batch = square[None, ..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+            return {self.input_name: np.ascontiguousarray(batch)}
+        return None
+
+
+def copy_metadata(source_path: str, target_path: str) -> None:
+    """
+    Copy the model metadata (the class names ultralytics stores there) onto the quantized model.
+    """
+    source = onnx.load(source_path, load_external_data=False)
+    target = onnx.load(target_path)
+    existing = {prop.key for prop in target.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            target.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(target, target_path)
+
+
+def quantize_model(model_path: str, output_path: str, calibration_dir: str | None = None,
+                   input_size: int = 640, max_images: int = 200) -> str:
+    """
+    Quantize an ONNX model to INT8.
+
+    Args:
+        model_path (str): FP32 ONNX model, e.g. the best.onnx exported by train_export_mac.py.
+        output_path (str): Where to write the INT8 model.
+        calibration_dir (str | None): Directory of recorded frames for static quantization.
+        input_size (int): Network input side the frames are letterboxed to.
+        max_images (int): Calibration frames to use at most.
+
+    Returns:
+        str: "static" or "dynamic", the quantization that was applied.
+    """
+    # shape inference and graph cleanup make the quantizer place Q/DQ nodes correctly
+    prepared_path = str(Path(output_path).with_suffix(".prep.onnx"))
+    shape_inference.quant_pre_process(model_path, prepared_path)
+
+    images = []
+    if calibration_dir:
+        images = sorted(p for p in Path(calibration_dir).iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg"))
+        # spread the calibration frames over the whole recording
+        images = images[::max(1, len(images) // max_images)][:max_images]
+
+    try:
+        if images:
+            input_name = onnxruntime.InferenceSession(prepared_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            quantize_static(
+                prepared_path, output_path, FrameCalibrationReader(input_name, images, input_size),
+                quant_format=QuantFormat.QDQ, per_channel=True,
+                activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+            )
+            mode = "static"
+        else:
+            quantize_dynamic(prepared_path, output_path, weight_type=QuantType.QInt8)
+            mode = "dynamic"
+        # the inference backends read the class order from there
+        copy_metadata(model_path, output_path)
+        return mode
+    finally:
+        Path(prepared_path).unlink(missing_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize an ONNX detection model to INT8.")
+    parser.add_argument("model", help="FP32 ONNX model")
+    parser.add_argument("output", help="INT8 ONNX model to write")
+    parser.add_argument("--calibration", help="directory of recorded frames for static quantization")
+    parser.add_argument("--input-size", type=int, default=constants.DEFAULT_INFERENCE["inputSize"])
+    parser.add_argument("--max-images", type=int, default=200)
+
+    args = parser.parse_args()
+    mode = quantize_model(args.model, args.output, args.calibration, args.input_size, args.max_images)
+    print(f"Wrote {args.output} ({mode} INT8 quantization)")
+
+
+if __name__ == "__main__":
+    main()
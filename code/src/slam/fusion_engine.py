@@ -0,0 +1,257 @@
+from typing import List
+from threading import Lock
+import logging
+import time
+import numpy as np
+from capture.camera import Camera
+from slam.kalman_filter import KalmanFilter, POSE_DIM, VELOCITY_STATES
+from slam.pose_buffer import array_to_pose
+from slam.pose_history import PoseHistory
+from utils.pose3d import Pose3D
+from utils import constants
+
+# event kinds, in the order they are applied at equal timestamps
+ODOMETRY = 0
+VISION = 1
+STANDSTILL = 2
+
+
+class FusionEngine:
+    """
+    Fuses the timestamped robot poses of all cameras with a constant-velocity Kalman filter.
+
+    Each `step` drains the measurements the cameras recorded since the previous
+    step, orders them by capture time and applies them one by one, so every
+    frame counts once and cameras running at different rates are weighted by
+    how often they actually see tags. Measurements far from the prediction are
+    gated out; if they keep being rejected the filter restarts from them. The
+    filtered pose after every measurement is recorded in `history`, if given.
+
+    Camera poses are a pipeline latency old and cameras differ in latency, while
+    robot odometry (`add_odometry`) arrives with little delay. So unless there is
+    a single camera and no odometry, events are held back by the largest camera
+    latency and applied in time order; the published pose is predicted forward
+    from there. A camera pose that still arrives older than the filter state
+    (latency jitter beyond FUSION_REORDER_MARGIN) is dropped rather than fused
+    at the wrong time.
+
+    Frames that reused the previous detection result because the scene did not
+    change are no new pose measurement, but they show the robot standing still:
+    they are fused as a zero-velocity observation, which keeps the filter current
+    (and the pose fresh) while an idle robot skips detection.
+
+    Attributes:
+        cameras (List[Camera]): Cameras whose pose buffers are fused.
+        measurement_noise (np.ndarray): (6, 6) covariance of a single camera pose.
+        odometry_noise (np.ndarray): (3, 3) covariance of an odometry sample.
+        standstill_noise (np.ndarray): (6, 6) velocity covariance of a frame with an unchanged scene.
+        gate (float): Squared Mahalanobis distance above which a measurement is rejected.
+        max_rejections (int): Consecutive rejections after which the filter is reset.
+        history (PoseHistory | None): Time-indexed record of the fused poses.
+    """
+
+    def __init__(self, cameras: List[Camera], history: PoseHistory | None = None):
+        self.cameras = cameras
+        self.history = history
+        self.filter = KalmanFilter(constants.FUSION_LINEAR_ACCELERATION, constants.FUSION_ANGULAR_ACCELERATION)
+        self.measurement_noise = np.diag(
+            [constants.FUSION_POSITION_NOISE ** 2] * 3 + [constants.FUSION_ANGLE_NOISE ** 2] * 3
+        )
+        self.odometry_noise = np.diag(
+            [constants.ODOMETRY_VELOCITY_NOISE ** 2] * 2 + [constants.ODOMETRY_YAW_RATE_NOISE ** 2]
+        )
+        self.standstill_noise = np.eye(POSE_DIM) * constants.FUSION_STANDSTILL_NOISE ** 2
+        self.gate = constants.FUSION_GATE
+        self.max_rejections = constants.FUSION_MAX_REJECTIONS
+
+        self.__consumed = {}  # camera id -> timestamp of the newest measurement taken from it
+        self.__pending: list = []  # (timestamp, kind, values) not applied yet
+        self.__last_odometry = -np.inf
+        self.__rejections = 0
+        self.__lock = Lock()
+
+    def __drain(self) -> None:
+        """
+        Queue the new valid measurements and standstill frames of every camera.
+        """
+        for camera in self.cameras:
+            camera_poses, camera_timestamps, valid, static = camera.robot_pose_buffer.snapshot()
+            if len(camera_timestamps) == 0:
+                continue
+            last = self.__consumed.get(camera.id, -np.inf)
+            new = valid & (camera_timestamps > last)
+            self.__consumed[camera.id] = max(last, camera_timestamps[-1])
+            measured = new & ~static
+            self.__pending.extend(
+                (float(timestamp), VISION, pose)
+                for pose, timestamp in zip(camera_poses[measured], camera_timestamps[measured])
+            )
+            self.__pending.extend((float(timestamp), STANDSTILL, None) for timestamp in camera_timestamps[new & static])
+
+    def add_odometry(self, velocity: np.ndarray, timestamp: float, field_relative: bool = False) -> None:
+        """
+        Queue a robot odometry sample.
+
+        Args:
+            velocity (np.ndarray): (3,) vx, vy in m/s and yaw rate in rad/s.
+            timestamp (float): Time the sample was taken, in this machine's clock.
+            field_relative (bool): Whether vx, vy are in field axes rather than robot axes.
+        """
+        with self.__lock:
+            self.__pending.append((timestamp, ODOMETRY, (np.asarray(velocity, dtype=np.float64), field_relative)))
+            self.__last_odometry = max(self.__last_odometry, timestamp)
+
+    def __horizon(self, now: float) -> float:
+        # a single camera without odometry delivers its events in time order, nothing has to wait
+        if len(self.cameras) <= 1 and now - self.__last_odometry > constants.ODOMETRY_TIMEOUT:
+            return np.inf
+        latency = max((camera.latency for camera in self.cameras), default=0.0)
+        return now - latency - constants.FUSION_REORDER_MARGIN
+
+    def __apply_pose(self, pose: np.ndarray, timestamp: float) -> bool:
+        if self.filter.initialized:
+            if timestamp < self.filter.timestamp:
+                # arrived after newer events were applied, the filter cannot go back to its time
+                return False
+            self.filter.predict(timestamp)
+            y, S = self.filter.innovation(pose, self.measurement_noise)
+            if y @ np.linalg.solve(S, y) > self.gate:
+                self.__rejections += 1
+                if self.__rejections < self.max_rejections:
+                    return False
+                logging.warning("Pose fusion diverged from the cameras, restarting the filter")
+                self.filter.reset(pose, self.measurement_noise, timestamp)
+                self.__rejections = 0
+                return True
+
+        self.filter.update(pose, self.measurement_noise, timestamp)
+        self.__rejections = 0
+        return True
+
+    def __apply_odometry(self, velocity: np.ndarray, field_relative: bool, timestamp: float) -> bool:
+        if not self.filter.initialized:
+            return False
+        if not field_relative:
+            yaw = self.filter.predict_pose(timestamp)[5]
+            cos, sin = np.cos(yaw), np.sin(yaw)
+            velocity = np.array([cos * velocity[0] - sin * velocity[1], sin * velocity[0] + cos * velocity[1], velocity[2]])
+        self.filter.update_velocity(velocity, self.odometry_noise, timestamp)
+        return True
+
+    def __apply_standstill(self, timestamp: float) -> bool:
+        if not self.filter.initialized:
+            return False
+        self.filter.update_velocity(np.zeros(POSE_DIM), self.standstill_noise, timestamp, VELOCITY_STATES)
+        return True
+
+    def step(self, now: float | None = None) -> int:
+        """
+        Apply every queued measurement that is old enough to be in time order.
+
+        Args:
+            now (float | None): Current time, time.time() by default.
+
+        Returns:
+            int: Number of measurements fused.
+        """
+        now = time.time() if now is None else now
+        with self.__lock:
+            self.__drain()
+            horizon = self.__horizon(now)
+            self.__pending.sort(key=lambda event: event[:2])
+            ready = next((index for index, event in enumerate(self.__pending) if event[0] > horizon), len(self.__pending))
+            events, self.__pending = self.__pending[:ready], self.__pending[ready:]
+
+            fused = 0
+            for timestamp, kind, values in events:
+                if kind == VISION:
+                    applied = self.__apply_pose(values, timestamp)
+                elif kind == STANDSTILL:
+                    applied = self.__apply_standstill(timestamp)
+                else:
+                    applied = self.__apply_odometry(*values, timestamp)
+                if not applied:
+                    continue
+                fused += 1
+                if self.history is not None:
+                    self.history.append(self.filter.get_state(), self.filter.timestamp)
+            return fused
+
+    @property
+    def initialized(self) -> bool:
+        return self.filter.initialized
+
+    @property
+    def timestamp(self) -> float | None:
+        """
+        Time of the newest fused measurement.
+        """
+        return self.filter.timestamp
+
+    def prediction_horizon(self) -> float:
+        """
+        Longest time in seconds the pose is extrapolated past the newest measurement:
+        the largest camera latency plus FUSION_PREDICTION_MARGIN.
+        """
+        latency = max((camera.latency for camera in self.cameras), default=0.0)
+        return latency + constants.FUSION_PREDICTION_MARGIN
+
+    def is_stale(self, timestamp: float) -> bool:
+        """
+        Whether `timestamp` is beyond the prediction horizon (or nothing was measured yet).
+        """
+        return not self.filter.initialized or timestamp - self.filter.timestamp > self.prediction_horizon()
+
+    def pose_at(self, timestamp: float) -> Pose3D:
+        """
+        Robot pose predicted to `timestamp` (default pose before the first measurement).
+
+        Past the prediction horizon the pose is held at the horizon instead of
+        drifting along the last velocity; `is_stale` tells when that happens.
+        """
+        with self.__lock:
+            if not self.filter.initialized:
+                return Pose3D()
+            return array_to_pose(self.filter.predict_pose(timestamp, self.prediction_horizon()))
+
+    def robot_pose_at(self, timestamp: float) -> Pose3D | None:
+        """
+        Fused robot pose at `timestamp`, for placing what a camera saw at that time.
+
+        Returns:
+            Pose3D | None: The recorded pose for the past, the prediction up to the
+                prediction horizon beyond it, None if neither is available.
+        """
+        with self.__lock:
+            if not self.filter.initialized:
+                return None
+            if timestamp <= self.filter.timestamp:
+                return None if self.history is None else self.history.pose_at(timestamp)
+            if timestamp - self.filter.timestamp > self.prediction_horizon():
+                return None
+            return array_to_pose(self.filter.predict_pose(timestamp))
+
+    def state(self) -> tuple | None:
+        """
+        Copy of the filter state, for processes that predict the pose themselves.
+
+        Returns:
+            tuple | None: (timestamp, (12,) pose and velocity, prediction horizon), None before the first measurement.
+        """
+        with self.__lock:
+            if not self.filter.initialized:
+                return None
+            return self.filter.timestamp, self.filter.x.copy(), self.prediction_horizon()
+
+    def get_pose(self) -> Pose3D:
+        """
+        Robot pose at the time of the newest fused measurement.
+        """
+        with self.__lock:
+            return self.filter.get_state() if self.filter.initialized else Pose3D()
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.filter = KalmanFilter(self.filter.linear_acceleration, self.filter.angular_acceleration)
+            self.__pending = []
+            self.__rejections = 0
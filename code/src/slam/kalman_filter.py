@@ -1,47 +1,170 @@
 import numpy as np
-from math import radians, degrees, pi
+from math import pi
 from utils.pose3d import Pose3D
 
+POSE_DIM = 6  # [x, y, z, roll, pitch, yaw]
+STATE_DIM = 2 * POSE_DIM  # pose followed by its rate of change
+ANGLES = slice(3, 6)
+# velocity states observed by robot odometry: vx, vy and yaw rate
+ODOMETRY_STATES = np.array([6, 7, 11])
+VELOCITY_STATES = np.arange(POSE_DIM, STATE_DIM)
+
+
+def wrap_angles(angles: np.ndarray) -> np.ndarray:
+    # Normalize angles to [-pi, pi)
+    return (angles + pi) % (2 * pi) - pi
+
+
+def extrapolate(state: np.ndarray, dt: float) -> np.ndarray:
+    """
+    Pose of a (12,) pose-and-velocity state `dt` seconds later at constant velocity.
+    """
+    pose = state[:POSE_DIM] + dt * state[POSE_DIM:]
+    pose[ANGLES] = wrap_angles(pose[ANGLES])
+    return pose
+
+
 class KalmanFilter:
-    def __init__(self, process_noise=0.01, measurement_noise=0.1, num_cameras=1):
-        self.state_dim = 6  # [x, y, z, roll, pitch, yaw]
-        self.num_cameras = num_cameras
+    """
+    Constant-velocity Kalman filter over a 6-DoF pose.
+
+    The state is [x, y, z, roll, pitch, yaw] followed by their velocities, so the
+    pose can be predicted to any time between measurements. Measurements are
+    full poses, applied one at a time as they arrive (sequential updates keep
+    the cost per measurement constant however many cameras there are), with the
+    Joseph-form covariance update and angle wrapping on the innovation. Robot
+    odometry observes the planar velocities, steering the prediction between
+    camera frames.
+
+    Attributes:
+        linear_acceleration (float): Process noise, standard deviation of the linear acceleration in m/s^2.
+        angular_acceleration (float): Process noise, standard deviation of the angular acceleration in rad/s^2.
+        timestamp (float | None): Time the state refers to, None before the first measurement.
+    """
+
+    def __init__(self, linear_acceleration: float = 2.0, angular_acceleration: float = 3.0):
+        self.linear_acceleration = linear_acceleration
+        self.angular_acceleration = angular_acceleration
+
+        self.x = np.zeros(STATE_DIM)
+        self.P = np.eye(STATE_DIM)
+        self.timestamp: float | None = None
+
+    @property
+    def initialized(self) -> bool:
+        return self.timestamp is not None
+
+    def reset(self, measurement: np.ndarray, measurement_noise: np.ndarray, timestamp: float) -> None:
+        """
+        Start over from a single measurement with unknown velocity.
+        """
+        self.x = np.zeros(STATE_DIM)
+        self.x[:POSE_DIM] = measurement
+        self.x[ANGLES] = wrap_angles(self.x[ANGLES])
+        self.P = np.zeros((STATE_DIM, STATE_DIM))
+        self.P[:POSE_DIM, :POSE_DIM] = measurement_noise
+        self.P[POSE_DIM:, POSE_DIM:] = np.eye(POSE_DIM)
+        self.timestamp = timestamp
+
+    def __transition(self, dt: float) -> tuple:
+        F = np.eye(STATE_DIM)
+        F[:POSE_DIM, POSE_DIM:] = np.eye(POSE_DIM) * dt
+
+        # white-noise acceleration per axis: [[dt^4/4, dt^3/2], [dt^3/2, dt^2]] * sigma^2
+        sigma2 = np.array([self.linear_acceleration] * 3 + [self.angular_acceleration] * 3) ** 2
+        Q = np.zeros((STATE_DIM, STATE_DIM))
+        Q[:POSE_DIM, :POSE_DIM] = np.diag(sigma2 * dt ** 4 / 4)
+        Q[:POSE_DIM, POSE_DIM:] = Q[POSE_DIM:, :POSE_DIM] = np.diag(sigma2 * dt ** 3 / 2)
+        Q[POSE_DIM:, POSE_DIM:] = np.diag(sigma2 * dt ** 2)
+        return F, Q
+
+    def predict(self, timestamp: float) -> None:
+        """
+        Advance the state to `timestamp`. Earlier timestamps leave the state untouched.
+        """
+        if self.timestamp is None or timestamp <= self.timestamp:
+            return
+        F, Q = self.__transition(timestamp - self.timestamp)
+        self.x = F @ self.x
+        self.x[ANGLES] = wrap_angles(self.x[ANGLES])
+        self.P = F @ self.P @ F.T + Q
+        self.timestamp = timestamp
+
+    def predict_pose(self, timestamp: float, max_horizon: float | None = None) -> np.ndarray:
+        """
+        Pose extrapolated to `timestamp` without changing the filter.
+
+        Args:
+            timestamp (float): Time to predict to.
+            max_horizon (float | None): Longest extrapolation in seconds; later times get the pose at this horizon.
+        """
+        dt = max(0.0, timestamp - self.timestamp) if self.timestamp is not None else 0.0
+        if max_horizon is not None:
+            dt = min(dt, max_horizon)
+        return extrapolate(self.x, dt)
+
+    def innovation(self, measurement: np.ndarray, measurement_noise: np.ndarray) -> tuple:
+        """
+        Returns:
+            tuple: (innovation y, innovation covariance S) of a pose measurement at the current state time.
+        """
+        y = measurement - self.x[:POSE_DIM]
+        y[ANGLES] = wrap_angles(y[ANGLES])
+        S = self.P[:POSE_DIM, :POSE_DIM] + measurement_noise
+        return y, S
 
-        # Initial state and covariance
-        self.x = np.zeros((self.state_dim, 1))  # [x, y, z, roll, pitch, yaw]
-        self.P = np.eye(self.state_dim)  # Covariance
+    def update(self, measurement: np.ndarray, measurement_noise: np.ndarray, timestamp: float) -> float:
+        """
+        Fuse one pose measurement, predicting the state to its timestamp first.
 
-        # Process and measurement noise
-        self.Q = np.eye(self.state_dim) * process_noise
-        self.R = np.eye(self.state_dim * num_cameras) * measurement_noise
+        Args:
+            measurement (np.ndarray): (6,) measured pose.
+            measurement_noise (np.ndarray): (6, 6) measurement covariance R.
+            timestamp (float): Capture time of the measurement.
 
-    def normalize_angles(self):
-        # Normalize roll, pitch, yaw to [-pi, pi]
-        for i in range(3, 6):  # Indices of roll, pitch, yaw
-            self.x[i, 0] = (self.x[i, 0] + pi) % (2 * pi) - pi
+        Returns:
+            float: Squared Mahalanobis distance of the innovation.
+        """
+        if self.timestamp is None:
+            self.reset(measurement, measurement_noise, timestamp)
+            return 0.0
 
-    def predict(self):
-        # State prediction
-        self.x = self.x  # No motion model, state stays the same
-        self.P = self.P + self.Q
+        self.predict(timestamp)
+        y, S = self.innovation(measurement, measurement_noise)
+        self.__correct(np.arange(POSE_DIM), y, S, measurement_noise)
+        return float(y @ np.linalg.solve(S, y))
 
-    def update(self, measurements):
-        # Stack measurements and build H matrix
-        Z = np.vstack(measurements)  # [z1, z2, ..., zN]
-        H = np.eye(self.state_dim * self.num_cameras, self.state_dim)
+    def update_velocity(self, velocity: np.ndarray, measurement_noise: np.ndarray, timestamp: float,
+                        states: np.ndarray = ODOMETRY_STATES) -> None:
+        """
+        Fuse a velocity observation, predicting the state to its timestamp first.
 
-        # Kalman gain
-        S = H @ self.P @ H.T + self.R
-        K = self.P @ H.T @ np.linalg.inv(S)
+        Args:
+            velocity (np.ndarray): Observed velocities, by default field-relative vx, vy in m/s and yaw rate in rad/s.
+            measurement_noise (np.ndarray): Observation covariance.
+            timestamp (float): Time of the sample.
+            states (np.ndarray): State indices observed, ODOMETRY_STATES or VELOCITY_STATES for all six.
+        """
+        if self.timestamp is None:
+            return
+        self.predict(timestamp)
+        y = velocity - self.x[states]
+        S = self.P[np.ix_(states, states)] + measurement_noise
+        self.__correct(states, y, S, measurement_noise)
 
-        # Update state and covariance
-        self.x = self.x + K @ (Z - H @ self.x)
-        self.P = (np.eye(self.state_dim) - K @ H) @ self.P
+    def __correct(self, states: np.ndarray, y: np.ndarray, S: np.ndarray, measurement_noise: np.ndarray) -> None:
+        # H selects `states`, so P H^T is those columns of P; K = P H^T S^-1 via a solve
+        PHt = self.P[:, states]
+        K = np.linalg.solve(S, PHt.T).T
+        self.x = self.x + K @ y
+        self.x[ANGLES] = wrap_angles(self.x[ANGLES])
 
-        # Normalize angles after update
-        self.normalize_angles()
+        # Joseph form keeps P symmetric positive definite
+        I_KH = np.eye(STATE_DIM)
+        I_KH[:, states] -= K
+        self.P = I_KH @ self.P @ I_KH.T + K @ measurement_noise @ K.T
 
-    def get_state(self):
+    def get_state(self) -> Pose3D:
         # Convert state to Pose3D
-        x, y, z, roll, pitch, yaw = self.x.flatten()
-        return Pose3D(x, y, z, degrees(roll), degrees(pitch), degrees(yaw))
+        x, y, z, roll, pitch, yaw = self.x[:POSE_DIM]
+        return Pose3D(x, y, z, roll, pitch, yaw)
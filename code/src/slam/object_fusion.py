@@ -0,0 +1,122 @@
+from collections import defaultdict
+from typing import List
+import numpy as np
+
+# neighbour offsets of a grid cell, itself included
+NEIGHBOUR_CELLS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class ObjectFusion:
+    """
+    Merges the tracked objects of all cameras into one field-level object list.
+
+    Each fusion tick, every camera's objects are hashed into a grid of
+    `radius`-sized cells on the field plane. Same-class objects of different
+    cameras closer than `radius` are merged (through the 3x3 neighbouring
+    cells only), so the cost stays linear in the number of objects. Merging
+    goes closest pair first and a fused object takes at most one object per
+    camera. Fused IDs are kept stable by remembering which (camera, track)
+    pairs formed them.
+
+    Attributes:
+        radius (float): Largest distance in meters between two views of the same object.
+    """
+
+    def __init__(self, radius: float = 0.3):
+        self.radius = radius
+        self.__fused_ids: dict = {}
+        self.__next_id = 1
+
+    def fuse(self, cameras: List["Camera"]) -> list:
+        """
+        Fuse the current objects of every camera.
+
+        Args:
+            cameras (List[Camera]): Cameras whose `detected_objects` are merged.
+
+        Returns:
+            list: Fused objects as {"id", "name", "confidence", "x", "y", "z", "cameras"}, where
+                confidence combines the views (1 - prod(1 - c)) and cameras lists the contributing camera ids.
+        """
+        sources = [(camera.id, obj) for camera in cameras for obj in camera.detected_objects]
+        if not sources:
+            self.__fused_ids = {}
+            return []
+
+        camera_ids = np.array([camera_id for camera_id, _ in sources])
+        names = np.array([obj["name"] for _, obj in sources], dtype=object)
+        positions = np.array([[obj["x"], obj["y"], obj["z"]] for _, obj in sources], dtype=np.float64)
+        confidences = np.array([obj.get("confidence", 1.0) for _, obj in sources], dtype=np.float64)
+
+        clusters = self.__cluster(camera_ids, names, positions)
+
+        fused = []
+        fused_ids = {}
+        for members in clusters:
+            keys = [(int(camera_ids[i]), sources[i][1].get("id")) for i in members]
+            fused_id = min((self.__fused_ids[key] for key in keys if key in self.__fused_ids), default=None)
+            if fused_id is None or fused_id in fused_ids.values():
+                fused_id = self.__next_id
+                self.__next_id += 1
+            fused_ids.update({key: fused_id for key in keys})
+
+            weights = np.maximum(confidences[members], 1e-6)
+            x, y, z = (weights @ positions[members] / weights.sum()).tolist()
+            fused.append({
+                "id": fused_id,
+                "name": names[members[0]],
+                "confidence": float(1.0 - np.prod(1.0 - np.clip(confidences[members], 0.0, 1.0))),
+                "x": x,
+                "y": y,
+                "z": z,
+                "cameras": sorted(set(camera_ids[members].tolist())),
+            })
+
+        self.__fused_ids = fused_ids
+        return fused
+
+    def __cluster(self, camera_ids: np.ndarray, names: np.ndarray, positions: np.ndarray) -> list:
+        """
+        Group same-class objects of different cameras within `radius` of each other.
+
+        Returns:
+            list: Clusters as lists of object indices.
+        """
+        cells = np.floor(positions[:, :2] / self.radius).astype(np.int64)
+        grid = defaultdict(list)
+        for index, (cell_x, cell_y) in enumerate(cells.tolist()):
+            grid[(cell_x, cell_y)].append(index)
+
+        parents = list(range(len(positions)))
+
+        def find(index: int) -> int:
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        radius_squared = self.radius ** 2
+        pairs = []
+        for index, (cell_x, cell_y) in enumerate(cells.tolist()):
+            for dx, dy in NEIGHBOUR_CELLS:
+                for other in grid.get((cell_x + dx, cell_y + dy), ()):
+                    if other <= index or names[other] != names[index] or camera_ids[other] == camera_ids[index]:
+                        continue
+                    distance_squared = np.sum((positions[other, :2] - positions[index, :2]) ** 2)
+                    if distance_squared <= radius_squared:
+                        pairs.append((distance_squared, index, other))
+
+        # closest pairs first; a cluster holds at most one object per camera, so two
+        # objects of one camera are never chained together through another camera's view
+        cluster_cameras = {index: {camera_ids[index]} for index in range(len(positions))}
+        for _, index, other in sorted(pairs):
+            root, other_root = find(index), find(other)
+            if root == other_root or cluster_cameras[root] & cluster_cameras[other_root]:
+                continue
+            parents[other_root] = root
+            cluster_cameras[root] |= cluster_cameras.pop(other_root)
+
+        clusters = defaultdict(list)
+        for index in range(len(positions)):
+            clusters[find(index)].append(index)
+        return list(clusters.values())
@@ -0,0 +1,114 @@
+from utils.pose3d import Pose3D
+from threading import Lock
+import numpy as np
+
+# columns of a pose row
+POSE_FIELDS = ("x", "y", "z", "roll", "pitch", "yaw")
+
+
+def pose_to_array(pose: Pose3D) -> np.ndarray:
+    return np.array([pose.x, pose.y, pose.z, pose.roll, pose.pitch, pose.yaw], dtype=np.float64)
+
+
+def array_to_pose(values: np.ndarray) -> Pose3D:
+    return Pose3D(*(float(value) for value in values))
+
+
+def circular_mean(poses: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray | None:
+    """
+    Mean of (N, 6) pose rows: arithmetic for x, y, z and circular for roll, pitch, yaw.
+
+    Args:
+        poses (np.ndarray): (N, 6) rows of x, y, z, roll, pitch, yaw.
+        weights (np.ndarray | None): (N,) non-negative weights, uniform by default.
+
+    Returns:
+        np.ndarray | None: (6,) mean pose, or None for an empty input.
+    """
+    if len(poses) == 0:
+        return None
+    if weights is None:
+        weights = np.ones(len(poses))
+    weights = weights / weights.sum()
+
+    position = weights @ poses[:, :3]
+    angles = np.arctan2(weights @ np.sin(poses[:, 3:]), weights @ np.cos(poses[:, 3:]))
+    return np.concatenate([position, angles])
+
+
+class PoseRingBuffer:
+    """
+    Fixed-size, timestamped history of poses backed by preallocated arrays.
+
+    Appending overwrites the oldest row, so it never allocates. Rows carry an
+    explicit validity flag: a frame without a pose is recorded as invalid
+    instead of being stood in for by a default pose. Frames that reused the
+    previous detection result because the scene did not change are flagged
+    static: they carry the previous pose but are no new measurement of it.
+
+    Attributes:
+        capacity (int): Number of poses kept.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.__poses = np.zeros((capacity, 6), dtype=np.float64)
+        self.__timestamps = np.zeros(capacity, dtype=np.float64)
+        self.__valid = np.zeros(capacity, dtype=bool)
+        self.__static = np.zeros(capacity, dtype=bool)
+        self.__next = 0
+        self.__count = 0
+        self.__lock = Lock()
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def append(self, pose: Pose3D | None, timestamp: float, static: bool = False) -> None:
+        """
+        Record the pose of one frame (None if the frame gave no pose).
+
+        Args:
+            pose (Pose3D | None): The robot pose.
+            timestamp (float): Capture time of the frame.
+            static (bool): Whether the frame reused the previous detection result.
+        """
+        with self.__lock:
+            index = self.__next
+            if pose is None:
+                self.__valid[index] = False
+            else:
+                self.__poses[index] = (pose.x, pose.y, pose.z, pose.roll, pose.pitch, pose.yaw)
+                self.__valid[index] = True
+            self.__timestamps[index] = timestamp
+            self.__static[index] = static
+            self.__next = (index + 1) % self.capacity
+            self.__count = min(self.__count + 1, self.capacity)
+
+    def snapshot(self) -> tuple:
+        """
+        Copy of the buffer, oldest row first.
+
+        Returns:
+            tuple: (poses (N, 6), timestamps (N,), valid (N,), static (N,)).
+        """
+        with self.__lock:
+            order = (np.arange(self.__count) + self.__next - self.__count) % self.capacity
+            return self.__poses[order], self.__timestamps[order], self.__valid[order], self.__static[order]
+
+    def mean(self, since: float | None = None) -> np.ndarray | None:
+        """
+        Circular mean of the valid poses, optionally only those recorded at or after `since`.
+
+        Returns:
+            np.ndarray | None: (6,) mean pose, or None if there is no valid pose.
+        """
+        poses, timestamps, valid, _ = self.snapshot()
+        if since is not None:
+            valid &= timestamps >= since
+        return circular_mean(poses[valid])
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__valid[:] = False
+            self.__next = 0
+            self.__count = 0
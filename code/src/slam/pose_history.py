@@ -0,0 +1,123 @@
+from utils.pose3d import Pose3D
+from scipy.spatial.transform import Rotation as R
+from threading import Lock
+import numpy as np
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, fraction: float) -> np.ndarray:
+    """
+    Spherical linear interpolation between two unit quaternions (x, y, z, w).
+    """
+    dot = float(q0 @ q1)
+    if dot < 0:
+        # take the short way around
+        q1, dot = -q1, -dot
+    if dot > 0.9995:
+        q = q0 + fraction * (q1 - q0)
+        return q / np.linalg.norm(q)
+    theta = np.arccos(dot)
+    return (np.sin((1 - fraction) * theta) * q0 + np.sin(fraction * theta) * q1) / np.sin(theta)
+
+
+class PoseHistory:
+    """
+    Bounded, time-indexed history of robot poses.
+
+    Poses are kept in preallocated ring arrays (position and orientation
+    quaternion) in increasing timestamp order, so a lookup is a binary search
+    over the ring. Between two samples the position is interpolated linearly and
+    the orientation along the great arc (slerp), which at the sample spacing
+    used here is indistinguishable from the SE(3) geodesic.
+
+    Attributes:
+        capacity (int): Number of poses kept.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.__timestamps = np.zeros(capacity, dtype=np.float64)
+        self.__positions = np.zeros((capacity, 3), dtype=np.float64)
+        self.__quaternions = np.zeros((capacity, 4), dtype=np.float64)
+        self.__next = 0
+        self.__count = 0
+        self.__lock = Lock()
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __physical(self, index: int) -> int:
+        # ring slot of the index-th oldest sample
+        return (self.__next - self.__count + index) % self.capacity
+
+    def append(self, pose: Pose3D, timestamp: float) -> bool:
+        """
+        Record a pose. Samples must arrive in time order; older ones are ignored.
+
+        Returns:
+            bool: Whether the sample was recorded.
+        """
+        quaternion = R.from_euler('zyx', [pose.yaw, pose.pitch, pose.roll]).as_quat()
+        with self.__lock:
+            if self.__count and timestamp <= self.__timestamps[self.__physical(self.__count - 1)]:
+                return False
+            index = self.__next
+            self.__timestamps[index] = timestamp
+            self.__positions[index] = (pose.x, pose.y, pose.z)
+            self.__quaternions[index] = quaternion
+            self.__next = (index + 1) % self.capacity
+            self.__count = min(self.__count + 1, self.capacity)
+            return True
+
+    def time_range(self) -> tuple | None:
+        """
+        Returns:
+            tuple | None: (oldest, newest) timestamp, or None while empty.
+        """
+        with self.__lock:
+            if not self.__count:
+                return None
+            return (float(self.__timestamps[self.__physical(0)]),
+                    float(self.__timestamps[self.__physical(self.__count - 1)]))
+
+    def pose_at(self, timestamp: float) -> Pose3D | None:
+        """
+        Robot pose at `timestamp`, interpolated between the surrounding samples.
+
+        Returns:
+            Pose3D | None: The pose, or None if `timestamp` is outside the recorded range.
+        """
+        with self.__lock:
+            if not self.__count:
+                return None
+            oldest = self.__physical(0)
+            newest = self.__physical(self.__count - 1)
+            if not self.__timestamps[oldest] <= timestamp <= self.__timestamps[newest]:
+                return None
+
+            # first sample at or after timestamp
+            low, high = 0, self.__count - 1
+            while low < high:
+                middle = (low + high) // 2
+                if self.__timestamps[self.__physical(middle)] < timestamp:
+                    low = middle + 1
+                else:
+                    high = middle
+
+            after = self.__physical(low)
+            if low == 0 or self.__timestamps[after] == timestamp:
+                position, quaternion = self.__positions[after].copy(), self.__quaternions[after].copy()
+            else:
+                before = self.__physical(low - 1)
+                t0, t1 = self.__timestamps[before], self.__timestamps[after]
+                fraction = (timestamp - t0) / (t1 - t0)
+                position = self.__positions[before] + fraction * (self.__positions[after] - self.__positions[before])
+                quaternion = slerp(self.__quaternions[before], self.__quaternions[after], fraction)
+
+        yaw, pitch, roll = R.from_quat(quaternion).as_euler('zyx')
+        x, y, z = position
+        return Pose3D(float(x), float(y), float(z), float(roll), float(pitch), float(yaw))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__next = 0
+            self.__count = 0
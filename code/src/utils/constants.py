@@ -11,11 +11,62 @@ PURPLE = (255, 110, 200)
 
 # networking
 DASHBOARD_PORT = 5800
+ROBOT_RECONNECT_INTERVAL = 3.0
+ROBOT_SOCKET_TIMEOUT = 0.05
 
 # metrics
 QUEUE_SIZE = 5
 TAG_HALF_SIZE = 0.5 * ((6.5 * 2.54) / 100)
-UPDATE_INTERVAL = 0.015
+FUSION_COALESCE_WINDOW = 0.002
+FUSION_HEARTBEAT = 0.1
+FRAME_TIMEOUT = 1.0
+STREAM_POLL_INTERVAL = 0.005
+# weight of the newest sample in the per-camera pipeline latency average
+LATENCY_SMOOTHING = 0.1
+
+# pose fusion (Kalman filter, SI units and radians)
+FUSION_LINEAR_ACCELERATION = 2.0
+FUSION_ANGULAR_ACCELERATION = 3.0
+FUSION_POSITION_NOISE = 0.05
+FUSION_ANGLE_NOISE = 0.05
+# squared Mahalanobis distance above which a camera measurement is rejected (chi-square, 6 DoF)
+FUSION_GATE = 25.0
+# consecutive rejections after which the filter restarts from the measurements
+FUSION_MAX_REJECTIONS = 10
+# robot odometry (field- or robot-relative vx, vy in m/s, yaw rate in rad/s)
+ODOMETRY_VELOCITY_NOISE = 0.05
+ODOMETRY_YAW_RATE_NOISE = 0.02
+# velocity standard deviation (m/s and rad/s) of a frame that reused the previous result because the scene did not change
+FUSION_STANDSTILL_NOISE = 0.02
+# odometry older than this (seconds) counts as stopped; a single camera's poses are then fused without delay
+ODOMETRY_TIMEOUT = 0.5
+# extra hold-back (seconds) on top of the largest camera latency when ordering events by capture time
+FUSION_REORDER_MARGIN = 0.01
+# the pose is extrapolated at most this long (seconds) beyond the largest camera latency, then held
+FUSION_PREDICTION_MARGIN = 0.05
+# fused poses kept for time lookups, about 4 s at 250 Hz
+POSE_HISTORY_SIZE = 1000
+
+# capture
+ZERO_COPY_FRAMES = True
+CAPTURE_BACKEND = "threads"  # "threads" or "processes"
+SHARED_RING_SLOTS = 3
+# per-frame records a camera process may have queued for the main process; newer ones are dropped beyond that
+PROCESS_RESULT_QUEUE_SIZE = 8
+# frames waiting to be written by a session recorder before new ones are dropped
+RECORDER_QUEUE_SIZE = 64
+MODES = ("Detection", "Calibration", "Lighting", "Settings")
+THROUGHPUT_LOG_INTERVAL = 5.0
+
+# object detection
+OBJECT_DETECTION_ENABLED = False
+# views of the same object from different cameras closer than this (meters) are merged
+OBJECT_MERGE_RADIUS = 0.3
+# real-world (width, height) in meters of each detectable object
+OBJECT_SIZES = {
+    "coral": (0.3016, 0.1143),
+    "algae": (0.4064, 0.4064),
+}
 
 # default values
 
@@ -36,9 +87,68 @@ DEFAULT_CALIBRATION = {
                         "sideLength": -1
                     }
 
+DEFAULT_CAPTURE = {
+                    "fourcc": "MJPG",
+                    "fps": 60,
+                    "bufferSize": 1,
+                    "autoExposure": True,
+                    "exposure": None,
+                    "gain": None,
+                    "grayscale": False
+                }
+
+DEFAULT_DETECTOR = {
+                    "nthreads": 2,
+                    "quadDecimate": 2.0,
+                    "quadSigma": 0.0,
+                    "refineEdges": 1,
+                    "decodeSharpening": 0.25,
+                    "adaptiveDecimation": False,
+                    "decimationLevels": [1.0, 1.5, 2.0, 3.0, 4.0],
+                    "latencyBudget": 0.010,
+                    "minTagPixels": 12,
+                    "multiTag": True,
+                    "tagPoseMaxAge": 5,
+                    "maxReprojectionError": 2.0,
+                    "maxRotationJump": 0.35,
+                    "tracking": True,
+                    "fullScanInterval": 10,
+                    "roiPadding": 0.5,
+                    "skipUnchanged": True,
+                    "changeThreshold": 2.0,
+                    "maxReuseAge": 0.5
+                }
+
+DEFAULT_INFERENCE = {
+                    # "ultralytics", "onnxruntime" or "opencv"
+                    "backend": "ultralytics",
+                    "model": "yolov8n.pt",
+                    # class names in model order, for ONNX models exported without them in the metadata
+                    "names": None,
+                    "inputSize": 640,
+                    "maxWait": 0.02,
+                    # run inference every N frames, tracks fill in the rest
+                    "detectionInterval": 4,
+                    "threads": 0,
+                    "confidence": 0.25,
+                    "iou": 0.45,
+                    "warmupRuns": 3
+                }
+
+DEFAULT_SOURCE = {
+                    "type": "device"
+                }
+
 DEFAULT_CAMERA = {
                     "settings": {
                         "fps": 60,
+                        "fourcc": "MJPG",
+                        "bufferSize": 1,
+                        "autoExposure": True,
+                        "exposure": None,
+                        "gain": None,
+                        "grayscale": False,
+                        "undistortStream": False,
                         "name": "Default Camera",
                         "pitch": 0,
                         "roll": 0,
@@ -48,6 +158,8 @@ DEFAULT_CAMERA = {
                         "z": 0
                     },
                     "lighting": {},
+                    "source": DEFAULT_SOURCE,
+                    "detector": DEFAULT_DETECTOR,
                     "calibration": DEFAULT_CALIBRATION,
                     "matrix": DEDAULT_MATRIX,
                     "distortion": DEFAULT_DIST
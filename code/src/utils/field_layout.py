@@ -0,0 +1,162 @@
+from scipy.spatial.transform import Rotation as R
+from utils.json_utils import load_field, field_path
+from utils import constants
+from threading import Lock
+import numpy as np
+import tempfile
+import logging
+import zipfile
+import os
+
+
+# Tag corners in the frame cv2.SOLVEPNP_IPPE_SQUARE expects, same order as the detector's corners
+SQUARE_CORNERS = np.array([
+    [-constants.TAG_HALF_SIZE, constants.TAG_HALF_SIZE, 0],
+    [constants.TAG_HALF_SIZE, constants.TAG_HALF_SIZE, 0],
+    [constants.TAG_HALF_SIZE, -constants.TAG_HALF_SIZE, 0],
+    [-constants.TAG_HALF_SIZE, -constants.TAG_HALF_SIZE, 0],
+], dtype=np.float64)
+
+# Maps the square frame onto the field JSON's tag frame (x out of the tag, corners in y/z)
+TAG_FROM_SQUARE = np.array([
+    [0, 0, -1, 0],
+    [1, 0, 0, 0],
+    [0, -1, 0, 0],
+    [0, 0, 0, 1],
+], dtype=np.float64)
+
+
+class FieldLayout:
+    """
+    Precomputed, read-only AprilTag layout of a season.
+
+    Tag data is stored in dense arrays indexed directly by tag ID, so looking up
+    the world corners of a detected tag is a single array index.
+
+    Attributes:
+        season (int): Season identifier.
+        corners (np.ndarray): (max_id + 1, 4, 3) world coordinates of each tag's corners.
+        poses (np.ndarray): (max_id + 1, 4, 4) world-from-tag transforms.
+        square_from_world (np.ndarray): (max_id + 1, 4, 4) transforms from world to the
+            tag's IPPE square frame (corners at SQUARE_CORNERS, z = 0 on the tag plane).
+        valid (np.ndarray): (max_id + 1,) True where a tag with that ID exists.
+        length (float): Field length in meters.
+        width (float): Field width in meters.
+    """
+
+    def __init__(self, season: int, corners: np.ndarray, poses: np.ndarray, valid: np.ndarray, length: float, width: float):
+        self.season = season
+        self.corners = corners
+        self.poses = poses
+        self.valid = valid
+        self.length = length
+        self.width = width
+        self.square_from_world = np.linalg.inv(poses @ TAG_FROM_SQUARE)
+
+        for array in (self.corners, self.poses, self.valid, self.square_from_world):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_field_data(cls, season: int, field_data: dict) -> "FieldLayout":
+        """
+        Build the layout from the parsed {season}_field.json.
+        """
+        tags = field_data["tags"]
+        size = max(tag["ID"] for tag in tags) + 1
+        half = constants.TAG_HALF_SIZE
+
+        corners = np.zeros((size, 4, 3), dtype=np.float64)
+        poses = np.tile(np.eye(4), (size, 1, 1))
+        valid = np.zeros(size, dtype=bool)
+
+        tag_corners_local = np.array([
+            [0, -half, -half],
+            [0, half, -half],
+            [0, half, half],
+            [0, -half, half],
+        ])
+
+        for tag in tags:
+            translation = tag["pose"]["translation"]
+            quaternion = tag["pose"]["rotation"]["quaternion"]
+            rotation = R.from_quat([quaternion["X"], quaternion["Y"], quaternion["Z"], quaternion["W"]]).as_matrix()
+            position = np.array([translation["x"], translation["y"], translation["z"]])
+
+            tag_id = tag["ID"]
+            corners[tag_id] = tag_corners_local @ rotation.T + position
+            poses[tag_id, :3, :3] = rotation
+            poses[tag_id, :3, 3] = position
+            valid[tag_id] = True
+
+        field = field_data.get("field", {})
+        return cls(season, corners, poses, valid, field.get("length", 0.0), field.get("width", 0.0))
+
+    @classmethod
+    def load(cls, season: int) -> "FieldLayout":
+        """
+        Load a season, using the .npz cache next to the JSON when it is up to date.
+        """
+        json_path = field_path(season)
+        cache_path = json_path.with_suffix(".npz")
+
+        if cache_path.exists() and cache_path.stat().st_mtime >= json_path.stat().st_mtime:
+            try:
+                with np.load(cache_path) as cache:
+                    if float(cache["half_size"]) != constants.TAG_HALF_SIZE:
+                        raise ValueError("tag size changed")
+                    return cls(season, cache["corners"], cache["poses"], cache["valid"],
+                               float(cache["length"]), float(cache["width"]))
+            except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile) as e:
+                logging.warning(f"Ignoring field layout cache {cache_path}: {e}")
+
+        layout = cls.from_field_data(season, load_field(season))
+        temp_path = None
+        try:
+            # camera processes load the layout concurrently: write aside, then swap the finished file in
+            with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".npz.tmp", delete=False) as temp_file:
+                temp_path = temp_file.name
+                np.savez(temp_file, corners=layout.corners, poses=layout.poses, valid=layout.valid,
+                         length=layout.length, width=layout.width, half_size=constants.TAG_HALF_SIZE)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logging.warning(f"Could not write field layout cache {cache_path}: {e}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+        return layout
+
+    def has_tag(self, tag_id: int) -> bool:
+        return 0 <= tag_id < len(self.valid) and bool(self.valid[tag_id])
+
+    def get_tag_corners(self, tag_id: int) -> np.ndarray | None:
+        """
+        World coordinates of a tag's corners.
+
+        Args:
+            tag_id (int): AprilTag ID.
+
+        Returns:
+            np.ndarray | None: (4, 3) read-only corner array, or None for unknown IDs.
+        """
+        if not self.has_tag(tag_id):
+            return None
+        return self.corners[tag_id]
+
+
+_layouts: dict = {}
+_layouts_lock = Lock()
+
+
+def get_field_layout(season: int) -> FieldLayout:
+    """
+    Shared FieldLayout of a season, loaded once per process.
+
+    Args:
+        season (int): Season identifier.
+
+    Returns:
+        FieldLayout: The read-only layout, shared by every detector.
+    """
+    with _layouts_lock:
+        if season not in _layouts:
+            _layouts[season] = FieldLayout.load(season)
+        return _layouts[season]
@@ -15,6 +15,9 @@ def dict_to_json(path: Path, data):
         json.dump(data, json_file, indent=constants.TAB)
 
 
+def field_path(season: int) -> Path:
+    return (Path(__file__).parent / Path(f"../../data/apriltag_data/{season}_field.json")).resolve()
+
+
 def load_field(season: int):
-    path = Path(__file__).parent / Path(f"../../data/apriltag_data/{season}_field.json")
-    return json_to_dict(path)
\ No newline at end of file
+    return json_to_dict(field_path(season))
\ No newline at end of file
@@ -0,0 +1,49 @@
+import threading
+import time
+
+
+class UpdateNotifier:
+    """
+    Update counter a consumer thread can block on.
+
+    Producers call `notify` whenever they have new data; the consumer keeps the
+    last version it handled and `wait`s for a newer one, so no update is missed
+    even if it arrives while the consumer is busy.
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__version = 0
+
+    @property
+    def version(self) -> int:
+        return self.__version
+
+    def notify(self) -> None:
+        with self.__condition:
+            self.__version += 1
+            self.__condition.notify_all()
+
+    def wait(self, last_version: int, timeout: float | None = None, coalesce: float = 0.0) -> int:
+        """
+        Block until there is an update newer than `last_version`, or until `timeout`.
+
+        Args:
+            last_version (int): Version the caller has already handled.
+            timeout (float | None): Longest wait in seconds (None waits forever).
+            coalesce (float): After the first new update, keep collecting updates for this many
+                seconds so measurements arriving together are handled in one pass.
+
+        Returns:
+            int: The current version (equal to `last_version` on timeout).
+        """
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__version != last_version, timeout):
+                return self.__version
+
+            deadline = time.monotonic() + coalesce
+            remaining = coalesce
+            while remaining > 0:
+                self.__condition.wait(remaining)
+                remaining = deadline - time.monotonic()
+            return self.__version
@@ -5,7 +5,7 @@ import math
 
 def data_format(cameras: List[Camera], targets_dict, robot_position):
 
-    targets_dict["april_tags"] = cameras[0].detected_apriltags # patch - fix later
+    targets_dict["april_tags"] = cameras[0].detected_apriltags if cameras else [] # patch - fix later
 
     return {"cameras": [camera_format(camera) for camera in cameras],
             "fused_data": fused_format(targets_dict, robot_position)}
@@ -14,13 +14,18 @@ def data_format(cameras: List[Camera], targets_dict, robot_position):
 def camera_format(camera: Camera):
 
     return {"camera_id": camera.id,
-            "targets": {"april_tags": apriltags_format(camera.detected_apriltags)},
-            "camera_position": pose3d_format(camera.field_pose, degrees=True)}
+            "targets": {"april_tags": apriltags_format(camera.detected_apriltags),
+                        "objects": objects_format(camera.detected_objects)},
+            "camera_position": pose3d_format(camera.field_pose, degrees=True),
+            "dropped_frames": camera.dropped_frames,
+            "reused_frames": camera.reused_frames,
+            "latency": camera.latency}
 
 
 def fused_format(targets_dict, robot_position):
 
-    return {"targets": {"april_tags": apriltags_format(targets_dict["april_tags"])},
+    return {"targets": {"april_tags": apriltags_format(targets_dict["april_tags"]),
+                        "objects": fused_objects_format(targets_dict.get("objects", []))},
             "robot_position": pose3d_format(robot_position)}
 
 
@@ -51,3 +56,39 @@ def pose3d_format(pose: Pose3D, degrees=False):
 def apriltags_format(apriltag_ids: list):
     return [{"id": tag_id, "distance": 0} 
              for tag_id in apriltag_ids]
+
+
+def objects_format(objects: list):
+    return [{"id": obj["id"], "name": obj["name"], "x": obj["x"], "y": obj["y"], "z": obj["z"]}
+            for obj in objects]
+
+
+def fused_objects_format(objects: list):
+    return [{"id": obj["id"], "name": obj["name"], "confidence": obj["confidence"],
+             "x": obj["x"], "y": obj["y"], "z": obj["z"], "cameras": obj["cameras"]}
+            for obj in objects]
+
+
+def corals_format(objects: list):
+    return [{"id": obj["id"], "x": obj["x"], "y": obj["y"]}
+            for obj in objects if obj["name"] == "coral"]
+
+
+def robot_message_format(cameras: List[Camera], pose: Pose3D, sent_at: float, stale: bool,
+                         measured_pose: Pose3D, measured_at: float | None, objects: list):
+    """
+    Message sent to the robot: the fused pose predicted to the send time, together with
+    the pose at the capture time of the newest measurement and each camera's pipeline latency.
+
+    "age" is how far the pose is extrapolated beyond the newest measurement (None before
+    the first one); "stale" is set when that is past the prediction horizon and the pose
+    is only held, not predicted, so it should not be trusted as a fix.
+    """
+    return {"timestamp": sent_at,
+            "pose": pose3d_format(pose),
+            "age": None if measured_at is None else sent_at - measured_at,
+            "stale": stale,
+            "measurement": {"timestamp": measured_at,
+                            "pose": pose3d_format(measured_pose)},
+            "latency": {str(camera.id): camera.latency for camera in cameras},
+            "corals": corals_format(objects)}
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the application imports its modules relative to src, as when run from there
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+from slam.fusion_engine import FusionEngine
+from slam.pose_buffer import PoseRingBuffer
+from slam.pose_history import PoseHistory
+from utils.pose3d import Pose3D
+import pytest
+
+FAST_LATENCY = 0.02
+SLOW_LATENCY = 0.1
+
+
+def make_camera(camera_id: int, latency: float) -> SimpleNamespace:
+    # the part of Camera that FusionEngine reads
+    return SimpleNamespace(id=camera_id, latency=latency, robot_pose_buffer=PoseRingBuffer(32))
+
+
+def robot_pose(timestamp: float) -> Pose3D:
+    # robot driving along x at 1 m/s
+    return Pose3D(x=timestamp, y=0.0)
+
+
+def test_slow_camera_frame_is_fused_in_capture_order():
+    fast, slow = make_camera(0, FAST_LATENCY), make_camera(1, SLOW_LATENCY)
+    history = PoseHistory(64)
+    fusion = FusionEngine([fast, slow], history)
+
+    fast.robot_pose_buffer.append(robot_pose(1.0), 1.0)
+    fusion.step(now=1.0 + SLOW_LATENCY + 0.05)
+
+    # the fast camera's newer frame arrives before the slow camera's older one
+    fast.robot_pose_buffer.append(robot_pose(1.2), 1.2)
+    assert fusion.step(now=1.2 + FAST_LATENCY) == 0
+
+    slow.robot_pose_buffer.append(robot_pose(1.15), 1.15)
+    assert fusion.step(now=1.15 + SLOW_LATENCY) == 0
+    assert fusion.step(now=1.2 + SLOW_LATENCY + 0.05) == 2
+
+    assert fusion.timestamp == 1.2
+    assert history.time_range() == (1.0, 1.2)
+    assert history.pose_at(1.15) is not None
+
+
+def test_frame_older_than_the_filter_is_dropped():
+    fast, slow = make_camera(0, FAST_LATENCY), make_camera(1, SLOW_LATENCY)
+    fusion = FusionEngine([fast, slow])
+
+    fast.robot_pose_buffer.append(robot_pose(1.0), 1.0)
+    fast.robot_pose_buffer.append(robot_pose(1.2), 1.2)
+    assert fusion.step(now=2.0) == 2
+    x = fusion.get_pose().x
+
+    # later than every hold-back: fusing it would treat a 1.05 s pose as one taken at 1.2 s
+    slow.robot_pose_buffer.append(Pose3D(x=0.5), 1.05)
+    assert fusion.step(now=2.5) == 0
+    assert fusion.timestamp == 1.2
+    assert fusion.get_pose().x == pytest.approx(x)